@@ -0,0 +1,26 @@
+"""Add oauth_tokens.client_id (Spotify app that issued the tokens)
+
+Revision ID: 20261019_07
+Revises: 20261019_06
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_07"
+down_revision: Union[str, None] = "20261019_06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("oauth_tokens", sa.Column("client_id", sa.String(length=255), nullable=True))
+    op.create_index("ix_oauth_tokens_client_id", "oauth_tokens", ["client_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_oauth_tokens_client_id", table_name="oauth_tokens")
+    op.drop_column("oauth_tokens", "client_id")
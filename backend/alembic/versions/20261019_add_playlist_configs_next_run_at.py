@@ -0,0 +1,37 @@
+"""Add playlist_configs.next_run_at and a partial due index (scheduler claims due configs)
+
+Revision ID: 20261019_06
+Revises: 20261019_05
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_06"
+down_revision: Union[str, None] = "20261019_05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing configs are due right away; the scheduler spreads them out batch by batch.
+    op.add_column(
+        "playlist_configs",
+        sa.Column("next_run_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_playlist_configs_due",
+        "playlist_configs",
+        ["next_run_at"],
+        unique=False,
+        postgresql_where=sa.text("is_enabled"),
+        sqlite_where=sa.text("is_enabled"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_playlist_configs_due", table_name="playlist_configs")
+    op.drop_column("playlist_configs", "next_run_at")
@@ -0,0 +1,24 @@
+"""Add playlist_configs.source_snapshot_id (skip syncs while the source is unchanged)
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_03"
+down_revision: Union[str, None] = "20261019_02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("playlist_configs", sa.Column("source_snapshot_id", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("playlist_configs", "source_snapshot_id")
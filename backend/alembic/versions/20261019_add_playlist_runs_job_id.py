@@ -0,0 +1,26 @@
+"""Add playlist_runs.job_id (Celery task id) for DB-backed job status
+
+Revision ID: 20261019_01
+Revises: 20250206_01
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_01"
+down_revision: Union[str, None] = "20250206_01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("playlist_runs", sa.Column("job_id", sa.String(155), nullable=True))
+    op.create_index("ix_playlist_runs_job_id", "playlist_runs", ["job_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_playlist_runs_job_id", table_name="playlist_runs")
+    op.drop_column("playlist_runs", "job_id")
@@ -0,0 +1,24 @@
+"""Add playlist_runs.profile_json (per-sync phase timings and call counters)
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_02"
+down_revision: Union[str, None] = "20261019_01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("playlist_runs", sa.Column("profile_json", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("playlist_runs", "profile_json")
@@ -0,0 +1,29 @@
+"""Add playlist_runs.updated_at (monotonic change time for HTTP validators)
+
+Revision ID: 20261019_08
+Revises: 20261019_07
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_08"
+down_revision: Union[str, None] = "20261019_07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "playlist_runs",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # Existing rows: their last known change.
+    op.execute("UPDATE playlist_runs SET updated_at = COALESCE(finished_at, started_at)")
+
+
+def downgrade() -> None:
+    op.drop_column("playlist_runs", "updated_at")
@@ -0,0 +1,39 @@
+"""Create discover_weekly_weeks (per-user weekly Discover Weekly archive)
+
+Revision ID: 20261019_05
+Revises: 20261019_04
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_05"
+down_revision: Union[str, None] = "20261019_04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "discover_weekly_weeks",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("source_snapshot_id", sa.String(255), nullable=True),
+        sa.Column("track_count", sa.Integer(), nullable=False),
+        sa.Column("track_keys", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_discover_weekly_weeks_user_week", "discover_weekly_weeks", ["user_id", "week_start"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_discover_weekly_weeks_user_week", table_name="discover_weekly_weeks")
+    op.drop_table("discover_weekly_weeks")
@@ -0,0 +1,43 @@
+"""Create tracks (shared catalog) and playlist_run_tracks (tracks added per run)
+
+Revision ID: 20261019_04
+Revises: 20261019_03
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20261019_04"
+down_revision: Union[str, None] = "20261019_03"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tracks",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("spotify_id", sa.String(32), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tracks_spotify_id", "tracks", ["spotify_id"], unique=True)
+
+    op.create_table(
+        "playlist_run_tracks",
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("track_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["run_id"], ["playlist_runs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["track_id"], ["tracks.id"]),
+        sa.PrimaryKeyConstraint("run_id", "track_id"),
+    )
+    op.create_index("ix_playlist_run_tracks_track_id", "playlist_run_tracks", ["track_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_playlist_run_tracks_track_id", table_name="playlist_run_tracks")
+    op.drop_table("playlist_run_tracks")
+    op.drop_index("ix_tracks_spotify_id", table_name="tracks")
+    op.drop_table("tracks")
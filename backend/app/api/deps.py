@@ -1,7 +1,7 @@
 """Shared API dependencies (DB session, rate limit hooks)."""
 from fastapi import Request
 
-from app.config import get_settings
+from app.core.config import get_settings
 
 
 def get_settings_dep():
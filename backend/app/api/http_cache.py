@@ -0,0 +1,166 @@
+"""Conditional GETs for per-user dashboard endpoints (``/auth/me``, ``/playlists/runs``).
+
+A user's cached views can only change when their user row or one of their runs changes, so
+one ``UserValidator`` (latest run id and last change time) drives:
+
+- ``ETag`` / ``Last-Modified`` on responses, and ``304 Not Modified`` for matching
+  ``If-None-Match`` / ``If-Modified-Since``;
+- a short-TTL Redis cache of the validator and of rendered bodies (keyed by ETag), so
+  repeat loads skip the DB entirely.
+
+``RunRecorder`` calls ``invalidate_user`` after committing run changes. Responses are
+``Cache-Control: private, no-cache``: browsers keep them but revalidate every time. If Redis
+is unavailable everything falls back to the DB.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable
+
+import redis
+# Starlette's classes (what FastAPI re-exports): workers import this module without FastAPI.
+from starlette.requests import Request
+from starlette.responses import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.redis_client import get_redis
+from app.db.models import PlaylistConfig, PlaylistRun, User
+
+logger = logging.getLogger(__name__)
+
+VALIDATOR_PREFIX = "http:validator:user:"
+BODY_PREFIX = "http:body:"
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class UserValidator:
+    user_id: int
+    spotify_user_id: str
+    last_run_id: int | None
+    last_modified: float  # epoch seconds
+
+    def etag(self, view: str) -> str:
+        digest = hashlib.sha1(
+            f"{view}|{self.user_id}|{self.last_run_id}|{self.last_modified}".encode()
+        ).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+
+def _ts(value: datetime | None) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _load_validator(db: Session, user_id: int) -> UserValidator | None:
+    # updated_at only moves forward; finished_at is cleared again when a run is resumed.
+    last_change = func.max(PlaylistRun.updated_at)
+    row = db.execute(
+        select(User.spotify_user_id, User.created_at, func.max(PlaylistRun.id), last_change)
+        .select_from(User)
+        .outerjoin(PlaylistConfig, PlaylistConfig.user_id == User.id)
+        .outerjoin(PlaylistRun, PlaylistRun.playlist_config_id == PlaylistConfig.id)
+        .where(User.id == user_id)
+        .group_by(User.id, User.spotify_user_id, User.created_at)
+    ).first()
+    if row is None:
+        return None
+    spotify_user_id, created_at, last_run_id, changed_at = row
+    return UserValidator(user_id, spotify_user_id, last_run_id, max(_ts(created_at), _ts(changed_at)))
+
+
+def _ttl() -> int:
+    return get_settings().http_cache_ttl_seconds
+
+
+def get_user_validator(db: Session, user_id: int) -> UserValidator | None:
+    """Validator from Redis (short TTL) or one aggregate query; None if the user doesn't exist."""
+    ttl = _ttl()
+    key = f"{VALIDATOR_PREFIX}{user_id}"
+    if ttl:
+        try:
+            raw = get_redis().get(key)
+            if raw:
+                return UserValidator(**json.loads(raw))
+        except redis.RedisError:
+            logger.debug("HTTP cache read failed", exc_info=True)
+    validator = _load_validator(db, user_id)
+    if validator is not None and ttl:
+        try:
+            get_redis().set(key, json.dumps(asdict(validator)), ex=ttl)
+        except redis.RedisError:
+            logger.debug("HTTP cache write failed", exc_info=True)
+    return validator
+
+
+def invalidate_user(user_ids: Iterable[int]) -> None:
+    """Drop cached validators (bodies are keyed by ETag and simply stop being referenced)."""
+    keys = [f"{VALIDATOR_PREFIX}{uid}" for uid in set(user_ids)]
+    if not keys or not _ttl():
+        return
+    try:
+        get_redis().delete(*keys)
+    except redis.RedisError:
+        logger.warning("Could not invalidate HTTP cache for %d user(s)", len(keys))
+
+
+def not_modified(request: Request, etag: str, validator: UserValidator) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            # HTTP dates have one-second resolution.
+            return int(validator.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _headers(etag: str, validator: UserValidator) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(
+            datetime.fromtimestamp(int(validator.last_modified), timezone.utc), usegmt=True
+        ),
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Cookie",
+    }
+
+
+def not_modified_response(etag: str, validator: UserValidator) -> Response:
+    return Response(status_code=304, headers=_headers(etag, validator))
+
+
+def cached_body(etag: str) -> bytes | None:
+    if not _ttl():
+        return None
+    try:
+        raw = get_redis().get(f"{BODY_PREFIX}{etag}")
+    except redis.RedisError:
+        return None
+    return raw.encode() if raw else None
+
+
+def json_response(body: bytes | Any, etag: str, validator: UserValidator) -> Response:
+    """JSON response with validators; freshly rendered bodies are cached under the ETag."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body, separators=(",", ":"), default=str).encode()
+        ttl = _ttl()
+        if ttl:
+            try:
+                get_redis().set(f"{BODY_PREFIX}{etag}", body.decode(), ex=ttl)
+            except redis.RedisError:
+                logger.debug("HTTP cache write failed", exc_info=True)
+    return Response(content=body, media_type="application/json", headers=_headers(etag, validator))
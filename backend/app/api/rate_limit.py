@@ -0,0 +1,258 @@
+"""API rate limiting: one GCRA bucket per session (or client IP), shared through Redis.
+
+GCRA (generic cell rate algorithm) stores a single timestamp per key, the theoretical
+arrival time (TAT). Requests are spaced ``window / limit`` apart and up to ``limit`` of
+them may arrive as a burst. It gives the same result as a sliding window without
+per-request bookkeeping. One Lua script reads and advances the TAT atomically, so every
+API instance shares the limit at the cost of one Redis round trip per request.
+
+Keys are ``user:<id>`` for a valid session cookie, else ``ip:<client address>``.
+``X-Forwarded-For`` is only read when the peer is in ``TRUSTED_PROXIES``; the client is then
+the rightmost hop that is not a trusted proxy, since anything left of it is client-supplied.
+Once Redis rejects a key, the process remembers how long the key stays limited and rejects
+further requests locally without calling Redis. The middleware runs the Redis call in a
+thread so the event loop never waits on it. When Redis is unreachable the limiter fails
+open and skips Redis for ``REDIS_RETRY_SECONDS``.
+
+Responses carry ``RateLimit-Limit``, ``RateLimit-Remaining``, ``RateLimit-Reset`` and
+``RateLimit-Policy``; a 429 also carries ``Retry-After``.
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import math
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import redis
+from starlette.requests import cookie_parser
+
+from app.core.config import get_settings
+from app.core.metrics import HTTP_RATE_LIMITED_TOTAL
+from app.core.redis_client import get_redis
+from app.core.security import SESSION_COOKIE_NAME, parse_session_cookie
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+REDIS_RETRY_SECONDS = 5.0
+MAX_LOCAL_KEYS = 10_000
+EXEMPT_PATHS = frozenset({"/health", "/metrics"})
+
+_REJECTED_LOCAL = HTTP_RATE_LIMITED_TOTAL.labels("local")
+_REJECTED_REDIS = HTTP_RATE_LIMITED_TOTAL.labels("redis")
+_SESSION_COOKIE = SESSION_COOKIE_NAME.encode()
+
+# KEYS[1] bucket (TAT). ARGV: now, interval (window / limit), limit.
+# Returns {allowed, remaining, retry_after, reset_after}; seconds as strings (Lua floats).
+_GCRA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = interval * tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > burst then
+  return {0, 0, tostring(new_tat - now - burst), tostring(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((burst - (new_tat - now)) / interval + 1e-9), '0', tostring(new_tat - now)}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    window_seconds: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        out = [
+            (b"ratelimit-limit", str(self.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(self.reset_after)).encode()),
+            (b"ratelimit-policy", f"{self.limit};w={self.window_seconds}".encode()),
+        ]
+        if not self.allowed:
+            out.append((b"retry-after", str(max(1, math.ceil(self.retry_after))).encode()))
+        return out
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limit: int,
+        window_seconds: int,
+        *,
+        redis_factory: Callable[[], redis.Redis] = get_redis,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.interval = window_seconds / limit
+        self._redis = redis_factory
+        self._clock = clock
+        # key -> (limited until, bucket full again at); only keys Redis has rejected.
+        self._blocked: dict[str, tuple[float, float]] = {}
+        self._redis_down_until = 0.0
+
+    def _result(self, allowed: bool, remaining: int, retry_after: float, reset_after: float) -> RateLimitResult:
+        return RateLimitResult(allowed, self.limit, self.window_seconds, remaining, retry_after, reset_after)
+
+    def hit(self, key: str) -> RateLimitResult | None:
+        """Count one request for ``key``; None when the limit could not be checked (fail open)."""
+        now = self._clock()
+        result = self._local(key, now)
+        return result if result is not None else self._check_redis(key, now)
+
+    async def hit_async(self, key: str) -> RateLimitResult | None:
+        """``hit`` for the event loop: local rejections answer inline, the Redis call runs in a thread."""
+        now = self._clock()
+        result = self._local(key, now)
+        if result is not None or now < self._redis_down_until:
+            return result
+        return await asyncio.to_thread(self._check_redis, key, now)
+
+    def _local(self, key: str, now: float) -> RateLimitResult | None:
+        # Rejection for a key Redis refused earlier and that is still inside its Retry-After.
+        blocked = self._blocked.get(key)
+        if blocked is None:
+            return None
+        until, reset_at = blocked
+        if now < until:
+            _REJECTED_LOCAL.inc()
+            return self._result(False, 0, until - now, reset_at - now)
+        self._blocked.pop(key, None)
+        return None
+
+    def _check_redis(self, key: str, now: float) -> RateLimitResult | None:
+        if now < self._redis_down_until:
+            return None
+        try:
+            allowed, remaining, retry_after, reset_after = self._redis().eval(
+                _GCRA, 1, KEY_PREFIX + key, repr(now), repr(self.interval), str(self.limit)
+            )
+        except redis.RedisError:
+            logger.warning("Rate limiter cannot reach Redis; allowing requests for %ss", REDIS_RETRY_SECONDS)
+            self._redis_down_until = now + REDIS_RETRY_SECONDS
+            return None
+        result = self._result(bool(int(allowed)), int(remaining), float(retry_after), float(reset_after))
+        if not result.allowed:
+            _REJECTED_REDIS.inc()
+            if len(self._blocked) >= MAX_LOCAL_KEYS:
+                self._blocked.clear()
+            self._blocked[key] = (now + result.retry_after, now + result.reset_after)
+        return result
+
+
+@lru_cache(maxsize=4096)
+def _session_user(cookie_header: str, secret: str) -> int | None:
+    # Clients resend the same cookie header, so the HMAC check runs once per session.
+    return parse_session_cookie(cookie_parser(cookie_header), secret)
+
+
+Networks = tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]
+
+
+def trusted_networks(entries: Iterable[str]) -> Networks:
+    """Parse ``TRUSTED_PROXIES`` entries (addresses or CIDR ranges)."""
+    return tuple(ipaddress.ip_network(entry, strict=False) for entry in entries)
+
+
+def _trusted(addr: str, networks: Networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in net for net in networks)
+
+
+def client_address(scope: dict, forwarded: bytes | None, networks: Networks) -> str:
+    """Peer address, or the rightmost untrusted ``X-Forwarded-For`` hop when the peer is a trusted proxy."""
+    client = scope.get("client")
+    addr = client[0] if client else "unknown"
+    if not forwarded or not networks or not _trusted(addr, networks):
+        return addr
+    for hop in reversed(forwarded.decode("latin-1").split(",")):
+        hop = hop.strip()
+        if not hop:
+            break
+        addr = hop
+        if not _trusted(hop, networks):
+            break
+    return addr
+
+
+def rate_limit_key(scope: dict, secret: str, networks: Networks = ()) -> str:
+    """``user:<id>`` for a valid session cookie, else ``ip:<client_address>``."""
+    cookie = forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            cookie = value
+        elif name == b"x-forwarded-for":
+            forwarded = value
+    if cookie and _SESSION_COOKIE in cookie:
+        user_id = _session_user(cookie.decode("latin-1"), secret)
+        if user_id:
+            return f"user:{user_id}"
+    return "ip:" + client_address(scope, forwarded, networks)
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter | None:
+    """Process-wide limiter from ``RATE_LIMIT_*``; None when disabled."""
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return None
+    return RateLimiter(settings.rate_limit_requests, settings.rate_limit_window_seconds)
+
+
+_TOO_MANY = json.dumps({"detail": "Too many requests"}).encode()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying ``RateLimiter`` to every HTTP request except ``EXEMPT_PATHS``."""
+
+    def __init__(
+        self,
+        app: Any,
+        limiter: RateLimiter | None = None,
+        secret: str | None = None,
+        trusted_proxies: Iterable[str] | None = None,
+    ):
+        self.app = app
+        self.limiter = limiter if limiter is not None else get_rate_limiter()
+        self.secret = secret or get_settings().app_secret
+        if trusted_proxies is None:
+            trusted_proxies = get_settings().trusted_proxies
+        self.networks = trusted_networks(trusted_proxies)
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if self.limiter is None or scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        result = await self.limiter.hit_async(rate_limit_key(scope, self.secret, self.networks))
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+        if not result.allowed:
+            headers = [(b"content-type", b"application/json"), (b"content-length", str(len(_TOO_MANY)).encode())]
+            await send({"type": "http.response.start", "status": 429, "headers": headers + result.headers()})
+            await send({"type": "http.response.body", "body": _TOO_MANY})
+            return
+
+        async def send_with_headers(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *result.headers()]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,56 @@
+"""Pool of Spotify app credentials, so throughput isn't capped by one app's rate limit.
+
+The primary app (``SPOTIFY_CLIENT_ID``/``SECRET``, named ``default``) plus
+``SPOTIFY_EXTRA_APPS`` (``app1``, ``app2``, ...). Each user is bound to one app at login:
+the one with the fewest users, so a newly added app fills up first. ``OAuthToken.client_id``
+records the binding (NULL for tokens issued before the pool: the primary app). Refreshes
+and sync requests use the user's app. Each app has its own adaptive concurrency limit
+(``get_spotify_limiter(app.name)``), so 429s from one app don't slow users of the others.
+Removing an app from the pool signs its users out; their next login picks another app.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings
+from app.db.models import OAuthToken
+
+DEFAULT_APP = "default"
+
+
+@dataclass(frozen=True)
+class SpotifyApp:
+    name: str
+    client_id: str
+    client_secret: str = field(repr=False)
+
+
+def app_pool(settings: Settings) -> list[SpotifyApp]:
+    apps = [SpotifyApp(DEFAULT_APP, settings.client_id, settings.client_secret)]
+    for i, entry in enumerate(settings.spotify_extra_apps, start=1):
+        client_id, _, client_secret = entry.partition(":")
+        apps.append(SpotifyApp(f"app{i}", client_id, client_secret))
+    return apps
+
+
+def app_for(settings: Settings, client_id: str | None) -> SpotifyApp | None:
+    """The pool app with ``client_id`` (primary for None); None if it is no longer configured."""
+    pool = app_pool(settings)
+    if client_id is None:
+        return pool[0]
+    return next((app for app in pool if app.client_id == client_id), None)
+
+
+def pick_app(db: Session, settings: Settings) -> SpotifyApp:
+    """App for a new login: the one bound to the fewest users."""
+    pool = app_pool(settings)
+    if len(pool) == 1:
+        return pool[0]
+    counts = dict(
+        db.execute(select(OAuthToken.client_id, func.count()).group_by(OAuthToken.client_id)).tuples().all()
+    )
+    counts[pool[0].client_id] = counts.get(pool[0].client_id, 0) + counts.pop(None, 0)
+    return min(pool, key=lambda app: counts.get(app.client_id, 0))
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, Request, Response
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
+from app.api.http_cache import get_user_validator, json_response, not_modified, not_modified_response
 from app.core.config import get_settings
 from app.core.security import (
     STATE_COOKIE_NAME,
@@ -15,10 +16,11 @@ from app.core.security import (
     parse_session_cookie,
     set_session_cookie,
     set_state_cookie,
+    state_app_key,
     verify_state,
 )
 from app.db.session import get_db
-from app.db.models import User
+from app.auth.apps import app_for, pick_app
 from app.auth.spotify_client import (
     SpotifyAuthError,
     exchange_code,
@@ -37,11 +39,12 @@ def _callback_uri(settings) -> str:
 
 
 @router.get("/login")
-def login(request: Request):
+def login(request: Request, db: Session = Depends(get_db)):
     settings = get_settings()
-    state = generate_state(settings.app_secret)
+    app = pick_app(db, settings)
+    state = generate_state(settings.app_secret, app.client_id)
     redirect_uri = _callback_uri(settings)
-    url = get_authorize_url(redirect_uri, state, settings.client_id)
+    url = get_authorize_url(redirect_uri, state, app.client_id)
     resp = RedirectResponse(url=url, status_code=302)
     set_state_cookie(resp, state, settings.app_secret, secure=settings.environment == "production")
     return resp
@@ -74,9 +77,16 @@ async def callback(
         resp = RedirectResponse(url=redirect_url, status_code=302)
         clear_state_cookie(resp)
         return resp
+    app = app_for(settings, state_app_key(state))
+    if app is None:
+        logger.warning("OAuth state names a Spotify app that is no longer configured")
+        redirect_url = get_safe_success_redirect(settings.allowed_origins, settings.auth_success_redirect)
+        resp = RedirectResponse(url=redirect_url, status_code=302)
+        clear_state_cookie(resp)
+        return resp
     redirect_uri = _callback_uri(settings)
     try:
-        token_data = await exchange_code(code, redirect_uri, settings)
+        token_data = await exchange_code(code, redirect_uri, app)
     except SpotifyAuthError:
         logger.warning("Token exchange failed")
         redirect_url = get_safe_success_redirect(settings.allowed_origins, settings.auth_success_redirect)
@@ -100,7 +110,9 @@ async def callback(
         logger.warning("Me response missing id")
         redirect_url = get_safe_success_redirect(settings.allowed_origins, settings.auth_success_redirect)
         return RedirectResponse(url=redirect_url, status_code=302)
-    user = upsert_user_and_tokens(db, spotify_user_id, access_token, refresh_token, expires_in, scope)
+    user = upsert_user_and_tokens(
+        db, spotify_user_id, access_token, refresh_token, expires_in, scope, client_id=app.client_id
+    )
     redirect_url = get_safe_success_redirect(settings.allowed_origins, settings.auth_success_redirect)
     resp = RedirectResponse(url=redirect_url, status_code=302)
     clear_state_cookie(resp)
@@ -117,10 +129,13 @@ def me(
     user_id = parse_session_cookie(request.cookies, settings.app_secret)
     if not user_id:
         return Response(content='{"authenticated":false}', status_code=401, media_type="application/json")
-    user = db.get(User, user_id)
-    if not user:
+    validator = get_user_validator(db, user_id)
+    if validator is None:
         return Response(content='{"authenticated":false}', status_code=401, media_type="application/json")
-    return {"authenticated": True, "spotify_user_id": user.spotify_user_id}
+    etag = validator.etag("auth.me")
+    if not_modified(request, etag, validator):
+        return not_modified_response(etag, validator)
+    return json_response({"authenticated": True, "spotify_user_id": validator.spotify_user_id}, etag, validator)
 
 
 @router.post("/logout")
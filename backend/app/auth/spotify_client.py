@@ -1,14 +1,19 @@
 """Spotify OAuth and API wrapper; token refresh and DB update (no tokens in logs)."""
+import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlencode
 
-import httpx
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
+from app.auth.apps import SpotifyApp, app_for
 from app.core.config import Settings
 from app.db.models import OAuthToken, User
 
+if TYPE_CHECKING:
+    import httpx
+
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
@@ -23,6 +28,13 @@ class SpotifyAuthError(Exception):
     pass
 
 
+def _http_client() -> "httpx.AsyncClient":
+    # httpx is only needed for the OAuth round trips; keep it out of API startup.
+    import httpx
+
+    return httpx.AsyncClient()
+
+
 def get_authorize_url(redirect_uri: str, state: str, client_id: str) -> str:
     params = {
         "client_id": client_id,
@@ -37,9 +49,9 @@ def get_authorize_url(redirect_uri: str, state: str, client_id: str) -> str:
 async def exchange_code(
     code: str,
     redirect_uri: str,
-    settings: Settings,
+    app: SpotifyApp,
 ) -> dict[str, Any]:
-    async with httpx.AsyncClient() as client:
+    async with _http_client() as client:
         resp = await client.post(
             SPOTIFY_TOKEN_URL,
             data={
@@ -47,7 +59,7 @@ async def exchange_code(
                 "code": code,
                 "redirect_uri": redirect_uri,
             },
-            auth=(settings.client_id, settings.client_secret),
+            auth=(app.client_id, app.client_secret),
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
     if resp.status_code != 200:
@@ -55,15 +67,15 @@ async def exchange_code(
     return resp.json()
 
 
-async def refresh_tokens(refresh_token: str, settings: Settings) -> dict[str, Any]:
-    async with httpx.AsyncClient() as client:
+async def refresh_tokens(refresh_token: str, app: SpotifyApp) -> dict[str, Any]:
+    async with _http_client() as client:
         resp = await client.post(
             SPOTIFY_TOKEN_URL,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": refresh_token,
             },
-            auth=(settings.client_id, settings.client_secret),
+            auth=(app.client_id, app.client_secret),
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
     if resp.status_code != 200:
@@ -72,7 +84,7 @@ async def refresh_tokens(refresh_token: str, settings: Settings) -> dict[str, An
 
 
 async def get_current_user(access_token: str) -> dict[str, Any]:
-    async with httpx.AsyncClient() as client:
+    async with _http_client() as client:
         resp = await client.get(
             f"{SPOTIFY_API_BASE}/me",
             headers={"Authorization": f"Bearer {access_token}"},
@@ -93,6 +105,7 @@ def upsert_user_and_tokens(
     refresh_token: str,
     expires_in: int,
     scope: str | None,
+    client_id: str | None = None,
 ) -> User:
     user = db.query(User).filter(User.spotify_user_id == spotify_user_id).first()
     if not user:
@@ -106,6 +119,7 @@ def upsert_user_and_tokens(
         token_row.refresh_token = refresh_token
         token_row.expires_at = expires_at
         token_row.scope = scope
+        token_row.client_id = client_id
     else:
         token_row = OAuthToken(
             user_id=user.id,
@@ -113,6 +127,7 @@ def upsert_user_and_tokens(
             refresh_token=refresh_token,
             expires_at=expires_at,
             scope=scope,
+            client_id=client_id,
         )
         db.add(token_row)
     db.commit()
@@ -122,15 +137,17 @@ def upsert_user_and_tokens(
 
 def get_valid_access_token(db: Session, user_id: int, settings: Settings) -> str | None:
     """Return access token for user; refresh and update DB if expired. Sync for use from sync context."""
-    import asyncio
     token_row = db.query(OAuthToken).filter(OAuthToken.user_id == user_id).first()
     if not token_row:
         return None
+    app = app_for(settings, token_row.client_id)
+    if app is None:
+        return None
     buffer_seconds = 60
     if (token_row.expires_at - _utc_now()).total_seconds() > buffer_seconds:
         return token_row.access_token
     try:
-        new_data = asyncio.run(refresh_tokens(token_row.refresh_token, settings))
+        new_data = asyncio.run(refresh_tokens(token_row.refresh_token, app))
     except SpotifyAuthError:
         return None
     new_access = new_data.get("access_token")
@@ -143,25 +160,57 @@ def get_valid_access_token(db: Session, user_id: int, settings: Settings) -> str
     return new_access
 
 
-async def get_valid_access_token_async(
-    db: Session, user_id: int, settings: Settings
-) -> str | None:
-    """Async version for use in request handlers."""
+def _read_token(db: Session, user_id: int) -> OAuthToken | None:
+    # Detached, and the read transaction ends here so no pooled connection is held meanwhile.
     token_row = db.query(OAuthToken).filter(OAuthToken.user_id == user_id).first()
+    if token_row is not None:
+        db.expunge(token_row)
+    db.commit()
+    return token_row
+
+
+def _store_refreshed(
+    db: Session, user_id: int, access_token: str, refresh_token: str, expires_at: datetime
+) -> None:
+    db.execute(
+        update(OAuthToken)
+        .where(OAuthToken.user_id == user_id)
+        .values(access_token=access_token, refresh_token=refresh_token, expires_at=expires_at)
+    )
+    db.commit()
+
+
+async def get_valid_token_async(
+    db: Session, user_id: int, settings: Settings
+) -> tuple[str, SpotifyApp] | None:
+    """Access token and the user's Spotify app; refreshes and updates the DB if expired.
+
+    None when the user has no tokens, the refresh fails, or their app left the pool. DB work
+    runs in a thread and commits, so the event loop never waits on the database.
+    """
+    token_row = await asyncio.to_thread(_read_token, db, user_id)
     if not token_row:
         return None
+    app = app_for(settings, token_row.client_id)
+    if app is None:
+        return None
     buffer_seconds = 60
     if (token_row.expires_at - _utc_now()).total_seconds() > buffer_seconds:
-        return token_row.access_token
+        return token_row.access_token, app
     try:
-        new_data = await refresh_tokens(token_row.refresh_token, settings)
+        new_data = await refresh_tokens(token_row.refresh_token, app)
     except SpotifyAuthError:
         return None
     new_access = new_data.get("access_token")
     new_expires_in = new_data.get("expires_in", 3600)
     new_refresh = new_data.get("refresh_token") or token_row.refresh_token
-    token_row.access_token = new_access
-    token_row.refresh_token = new_refresh
-    token_row.expires_at = _expires_at(new_expires_in)
-    db.commit()
-    return new_access
+    await asyncio.to_thread(_store_refreshed, db, user_id, new_access, new_refresh, _expires_at(new_expires_in))
+    return new_access, app
+
+
+async def get_valid_access_token_async(
+    db: Session, user_id: int, settings: Settings
+) -> str | None:
+    """Async version for use in request handlers."""
+    token = await get_valid_token_async(db, user_id, settings)
+    return token[0] if token else None
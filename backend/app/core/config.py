@@ -1,6 +1,7 @@
 """Load config from env; fail fast if required vars missing (CWE-798). No secrets in code."""
 from __future__ import annotations
 
+import ipaddress
 from functools import lru_cache
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -18,10 +19,15 @@ class Settings(BaseSettings):
     # Required for OAuth and app security
     client_id: str = Field(..., min_length=1, alias="SPOTIFY_CLIENT_ID")
     client_secret: str = Field(..., min_length=1, alias="SPOTIFY_CLIENT_SECRET")
+    # More Spotify apps ("client_id:client_secret", comma-separated); Spotify rate-limits per app
+    spotify_extra_apps: list[str] = Field(default=[], alias="SPOTIFY_EXTRA_APPS")
     app_secret: str = Field(..., min_length=16, alias="APP_SECRET")
     database_url: str = Field(..., alias="DATABASE_URL")
     base_url: str = Field(..., alias="BASE_URL")
 
+    # Spotify user IDs allowed to read cross-user stats (/jobs/*/stats); comma-separated
+    admin_spotify_user_ids: list[str] = Field(default=[], alias="ADMIN_SPOTIFY_USER_IDS")
+
     # CORS; comma-separated in env
     allowed_origins: list[str] = Field(
         default=["http://localhost:3000"],
@@ -32,13 +38,127 @@ class Settings(BaseSettings):
     debug: bool = Field(default=False, alias="DEBUG")
     environment: str = Field(default="development", alias="ENVIRONMENT")
 
+    db_pool_size: int = Field(default=5, ge=1, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, ge=0, alias="DB_MAX_OVERFLOW")
+
     redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
-    rate_limit_requests: int = Field(default=60, alias="RATE_LIMIT_REQUESTS")
-    rate_limit_window_seconds: int = Field(default=60, alias="RATE_LIMIT_WINDOW_SECONDS")
+    # Per session (or client IP) across all API instances; GCRA in Redis (app.api.rate_limit)
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_requests: int = Field(default=60, ge=1, alias="RATE_LIMIT_REQUESTS")
+    rate_limit_window_seconds: int = Field(default=60, ge=1, alias="RATE_LIMIT_WINDOW_SECONDS")
+    # Reverse proxies (addresses or CIDRs, comma-separated) whose X-Forwarded-For is believed
+    trusted_proxies: list[str] = Field(default=[], alias="TRUSTED_PROXIES")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     json_logs: bool = Field(default=False, alias="JSON_LOGS")
+    # Format and write log records on a listener thread instead of the caller (event loop).
+    log_queue: bool = Field(default=False, alias="LOG_QUEUE")
+    # Server-side TTL for cached per-user validators and GET bodies (app.api.http_cache); 0 disables
+    http_cache_ttl_seconds: int = Field(default=30, ge=0, alias="HTTP_CACHE_TTL_SECONDS")
     auth_success_redirect: str | None = Field(default=None, alias="AUTH_SUCCESS_REDIRECT")
 
+    # Celery worker profiles (python -m app.workers.run interactive|bulk)
+    # Results only bridge the gap until PlaylistRun exists; job status reads the DB row first.
+    celery_result_expires_seconds: int = Field(default=3600, ge=60, alias="CELERY_RESULT_EXPIRES_SECONDS")
+    # Task/result payloads are small JSON dicts; compression only pays off for large results.
+    celery_compression: str | None = Field(default=None, alias="CELERY_COMPRESSION")
+    celery_interactive_concurrency: int = Field(default=4, ge=1, alias="CELERY_INTERACTIVE_CONCURRENCY")
+    celery_interactive_prefetch_multiplier: int = Field(default=1, ge=1, alias="CELERY_INTERACTIVE_PREFETCH_MULTIPLIER")
+    celery_bulk_concurrency: int = Field(default=8, ge=1, alias="CELERY_BULK_CONCURRENCY")
+    celery_bulk_prefetch_multiplier: int = Field(default=4, ge=1, alias="CELERY_BULK_PREFETCH_MULTIPLIER")
+
+    # Scheduling: per-user concurrency and fair-share dispatch of scheduled (bulk) syncs
+    sync_max_concurrent_per_user: int = Field(default=1, ge=1, alias="SYNC_MAX_CONCURRENT_PER_USER")
+    sync_user_slot_ttl_seconds: int = Field(default=900, ge=30, alias="SYNC_USER_SLOT_TTL_SECONDS")
+    sync_user_busy_defer_seconds: int = Field(default=15, ge=1, alias="SYNC_USER_BUSY_DEFER_SECONDS")
+    fair_dispatch_interval_seconds: float = Field(default=5.0, gt=0, alias="FAIR_DISPATCH_INTERVAL_SECONDS")
+    fair_dispatch_batch_size: int = Field(default=100, ge=1, alias="FAIR_DISPATCH_BATCH_SIZE")
+    fair_dispatch_max_queue_depth: int = Field(default=200, ge=1, alias="FAIR_DISPATCH_MAX_QUEUE_DEPTH")
+    # Scheduled syncs: each enabled config is due every SYNC_SCHEDULE_INTERVAL_SECONDS; beat claims
+    # due configs (FOR UPDATE SKIP LOCKED, so schedulers can run in parallel) in batches
+    sync_schedule_interval_seconds: int = Field(default=86_400, ge=60, alias="SYNC_SCHEDULE_INTERVAL_SECONDS")
+    schedule_due_interval_seconds: float = Field(default=60.0, gt=0, alias="SCHEDULE_DUE_INTERVAL_SECONDS")
+    schedule_due_batch_size: int = Field(default=500, ge=1, alias="SCHEDULE_DUE_BATCH_SIZE")
+
+    # Tracing: none | console | file | otlp (OTLP endpoint via OTEL_EXPORTER_OTLP_ENDPOINT)
+    tracing_exporter: str = Field(default="none", alias="TRACING_EXPORTER")
+    tracing_file_path: str = Field(default="traces.jsonl", alias="TRACING_FILE_PATH")
+    tracing_sample_ratio: float = Field(default=1.0, ge=0, le=1, alias="TRACING_SAMPLE_RATIO")
+
+    # Worker-side Prometheus exporter port; 0 disables (API serves /metrics itself)
+    worker_metrics_port: int = Field(default=0, ge=0, alias="WORKER_METRICS_PORT")
+
+    # Asyncio worker (python -m app.workers.aio_worker); the DB pool sizes its blocking-call threads
+    aio_worker_queue: str = Field(default="sync.bulk", alias="AIO_WORKER_QUEUE")
+    aio_worker_concurrency: int = Field(default=100, ge=1, alias="AIO_WORKER_CONCURRENCY")
+    aio_worker_drain_timeout_seconds: float = Field(default=30.0, ge=0, alias="AIO_WORKER_DRAIN_TIMEOUT_SECONDS")
+
+    # Per-sync budget shared by all Spotify requests of one sync (time incl. retry sleeps, retries)
+    sync_deadline_seconds: float = Field(default=300.0, gt=0, alias="SYNC_DEADLINE_SECONDS")
+    sync_retry_budget: int = Field(default=20, ge=0, alias="SYNC_RETRY_BUDGET")
+    # Overlap add_tracks POSTs with the source scan; the queue holds this many 100-URI batches
+    sync_pipeline_enabled: bool = Field(default=True, alias="SYNC_PIPELINE_ENABLED")
+    sync_pipeline_queue_batches: int = Field(default=2, ge=1, alias="SYNC_PIPELINE_QUEUE_BATCHES")
+    # How long a dry run's diff can be applied with plan_id (app.playlists.plans); 0 disables
+    sync_plan_ttl_seconds: int = Field(default=900, ge=0, alias="SYNC_PLAN_TTL_SECONDS")
+    # Checkpoints that let a retried sync task resume its run; 0 disables
+    sync_journal_ttl_seconds: int = Field(default=3600, ge=0, alias="SYNC_JOURNAL_TTL_SECONDS")
+    # Track IDs one sync keeps in memory for dedup before spilling to a temp SQLite file, and
+    # the total all syncs in a worker process may keep (~100 bytes per ID)
+    sync_dedup_max_memory_ids: int = Field(default=100_000, ge=0, alias="SYNC_DEDUP_MAX_MEMORY_IDS")
+    sync_dedup_worker_memory_ids: int = Field(default=500_000, ge=0, alias="SYNC_DEDUP_WORKER_MEMORY_IDS")
+
+    # Adaptive (AIMD) limit on in-flight Spotify requests per worker process; set MIN=MAX to pin it
+    spotify_concurrency_initial: int = Field(default=8, ge=1, alias="SPOTIFY_CONCURRENCY_INITIAL")
+    spotify_concurrency_min: int = Field(default=1, ge=1, alias="SPOTIFY_CONCURRENCY_MIN")
+    spotify_concurrency_max: int = Field(default=100, ge=1, alias="SPOTIFY_CONCURRENCY_MAX")
+    spotify_latency_tolerance: float = Field(default=2.0, gt=1, alias="SPOTIFY_LATENCY_TOLERANCE")
+
+    # Circuit breaker for Spotify outages (state shared through Redis); 429s don't count
+    spotify_breaker_enabled: bool = Field(default=True, alias="SPOTIFY_BREAKER_ENABLED")
+    spotify_breaker_error_rate: float = Field(default=0.5, gt=0, le=1, alias="SPOTIFY_BREAKER_ERROR_RATE")
+    spotify_breaker_min_requests: int = Field(default=20, ge=1, alias="SPOTIFY_BREAKER_MIN_REQUESTS")
+    spotify_breaker_window_seconds: int = Field(default=30, ge=10, alias="SPOTIFY_BREAKER_WINDOW_SECONDS")
+    spotify_breaker_open_seconds: int = Field(default=30, ge=1, alias="SPOTIFY_BREAKER_OPEN_SECONDS")
+    spotify_breaker_half_open_probes: int = Field(default=3, ge=1, alias="SPOTIFY_BREAKER_HALF_OPEN_PROBES")
+
+    # Sampling profiler for sync tasks (app.core.profiling). The rate can be changed at runtime
+    # with `python -m app.core.profiling set-rate 0.05` (Redis override, no redeploy).
+    profile_sample_rate: float = Field(default=0.0, ge=0, le=1, alias="PROFILE_SAMPLE_RATE")
+    profile_interval_ms: int = Field(default=5, ge=1, alias="PROFILE_INTERVAL_MS")
+    profile_output_dir: str = Field(default="/tmp/sync-profiles", alias="PROFILE_OUTPUT_DIR")
+
+    @field_validator("spotify_extra_apps", mode="before")
+    @classmethod
+    def parse_spotify_extra_apps(cls, v):
+        if not isinstance(v, list):
+            v = (v or "").split(",")
+        entries = [x.strip() for x in v if x.strip()]
+        for entry in entries:
+            client_id, _, client_secret = entry.partition(":")
+            if not client_id or not client_secret:
+                raise ValueError("SPOTIFY_EXTRA_APPS entries must be client_id:client_secret")
+        return entries
+
+    @field_validator("admin_spotify_user_ids", mode="before")
+    @classmethod
+    def parse_admin_spotify_user_ids(cls, v):
+        if not isinstance(v, list):
+            v = (v or "").split(",")
+        return [x.strip() for x in v if x.strip()]
+
+    @field_validator("trusted_proxies", mode="before")
+    @classmethod
+    def parse_trusted_proxies(cls, v):
+        if not isinstance(v, list):
+            v = (v or "").split(",")
+        entries = [x.strip() for x in v if x.strip()]
+        for entry in entries:
+            try:
+                ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                raise ValueError(f"TRUSTED_PROXIES entry {entry!r} is not an IP address or network") from None
+        return entries
+
     @field_validator("allowed_origins", mode="before")
     @classmethod
     def parse_allowed_origins(cls, v):
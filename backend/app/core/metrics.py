@@ -0,0 +1,205 @@
+"""Prometheus metrics: API requests, Spotify client, DB queries, sync workers.
+
+API processes expose ``GET /metrics``; workers run a small exporter
+(``start_worker_exporter``). For Celery prefork set ``PROMETHEUS_MULTIPROC_DIR`` so
+child-process samples are aggregated by the exporter in the parent.
+Labels use route/endpoint templates only (never IDs or user data) to bound cardinality.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+HTTP_RATE_LIMITED_TOTAL = Counter(
+    "http_rate_limited_total",
+    "API requests rejected with 429 by the rate limiter (local = rejected without Redis).",
+    ["source"],
+)
+SPOTIFY_REQUEST_SECONDS = Histogram(
+    "spotify_request_duration_seconds",
+    "Latency of single Spotify API attempts by endpoint template.",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+SPOTIFY_REQUEST_ATTEMPTS = Histogram(
+    "spotify_request_attempts",
+    "Attempts needed per logical SpotifyApi.request call.",
+    ["method", "endpoint"],
+    buckets=(1, 2, 3, 4, 6, 8, 12),
+)
+SPOTIFY_RATE_LIMITED_TOTAL = Counter(
+    "spotify_rate_limited_total",
+    "429 responses from Spotify.",
+    ["endpoint"],
+)
+SPOTIFY_RETRY_SLEEP_SECONDS_TOTAL = Counter(
+    "spotify_retry_sleep_seconds_total",
+    "Seconds slept before retrying Spotify requests.",
+    ["reason"],
+)
+SPOTIFY_CONCURRENCY_LIMIT = Gauge(
+    "spotify_concurrency_limit",
+    "Current adaptive limit on in-flight Spotify requests (per process and Spotify app).",
+    ["app"],
+    multiprocess_mode="liveall",
+)
+SPOTIFY_INFLIGHT_REQUESTS = Gauge(
+    "spotify_inflight_requests",
+    "Spotify requests currently in flight.",
+    ["app"],
+    multiprocess_mode="livesum",
+)
+SPOTIFY_BREAKER_REJECTED_TOTAL = Counter(
+    "spotify_breaker_rejected_total",
+    "Spotify requests failed fast by the open circuit breaker.",
+)
+SPOTIFY_BREAKER_TRANSITIONS_TOTAL = Counter(
+    "spotify_breaker_transitions_total",
+    "Circuit breaker transitions observed by this process.",
+    ["to"],
+)
+
+SYNC_PAGES_FETCHED = Histogram(
+    "sync_pages_fetched",
+    "Spotify pages fetched per sync.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500, 1000),
+)
+SYNC_TRACKS_ADDED_TOTAL = Counter("sync_tracks_added_total", "Tracks added to target playlists.")
+SYNC_DEDUP_MEMORY_IDS = Gauge(
+    "sync_dedup_memory_ids",
+    "Track IDs reserved by in-memory sync dedup sets (per process).",
+    multiprocess_mode="livesum",
+)
+SYNC_DEDUP_SPILLS_TOTAL = Counter("sync_dedup_spills_total", "Sync dedup sets moved to disk.")
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "DB statement duration by statement type.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "task_queue_wait_seconds",
+    "Time between enqueue and start of a sync task.",
+    ["queue"],
+    buckets=TASK_BUCKETS,
+)
+TASK_RUN_SECONDS = Histogram(
+    "task_run_duration_seconds",
+    "Sync task run time by outcome.",
+    ["task", "outcome"],
+    buckets=TASK_BUCKETS,
+)
+
+_ID_SEGMENT = re.compile(r"^[0-9A-Za-z]{16,}$|^\d+$")
+_SPOTIFY_PREFIX = re.compile(r"^https?://[^/]+/v1")
+
+
+def endpoint_template(path: str) -> str:
+    """``/playlists/37i9dQZEVXcJ/tracks`` -> ``/playlists/{id}/tracks`` (query dropped)."""
+    path = _SPOTIFY_PREFIX.sub("", path).split("?", 1)[0]
+    return "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/"))
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    op = head[0].lower() if head else "other"
+    return op if op in {"select", "insert", "update", "delete"} else "other"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every DB statement on ``engine``."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_query_start")
+        if starts:
+            DB_QUERY_SECONDS.labels(_operation(statement)).observe(time.perf_counter() - starts.pop())
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request latency by matched route template."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope.get("method", ""), template, str(status["code"])).observe(
+                time.perf_counter() - start
+            )
+
+
+def _registry() -> CollectorRegistry | None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return None
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Exposition payload for ``/metrics`` (aggregates multiprocess samples when enabled)."""
+    registry = _registry()
+    payload = generate_latest(registry) if registry is not None else generate_latest()
+    return payload, CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter(port: int) -> None:
+    """Serve worker metrics on ``port`` (0 disables)."""
+    if not port:
+        return
+    registry = _registry()
+    if registry is not None:
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info("Worker metrics exporter listening on :%d", port)
@@ -0,0 +1,199 @@
+"""Opt-in sampling profiler for sync tasks; writes flamegraph "folded" stacks.
+
+A sampled task gets a background thread that snapshots, every ``PROFILE_INTERVAL_MS``:
+
+- the worker thread's Python stack (skipped while the event loop is idle in ``select``),
+  i.e. where CPU goes: JSON decoding, dedup, SQLAlchemy, logging;
+- the task's await chain (coroutine frames), i.e. wall-clock view of what the sync is
+  waiting on. The chain stops at async generators, which CPython doesn't expose.
+
+Each profile is two files in ``PROFILE_OUTPUT_DIR``: ``<name>-<id>.cpu.folded`` and
+``<name>-<id>.async.folded`` (one ``frame;frame;frame count`` line per stack), readable by
+flamegraph.pl, inferno and speedscope. No extra dependency; overhead applies to sampled
+tasks only.
+
+``PROFILE_SAMPLE_RATE`` is the default share of tasks profiled. A value stored in Redis
+(``set-rate`` below) overrides it for all workers within ``RATE_REFRESH_SECONDS``::
+
+    python -m app.core.profiling set-rate 0.05
+    python -m app.core.profiling clear-rate
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Any, AsyncIterator
+
+import redis
+
+from app.core.config import Settings, get_settings
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY = "profiling:sample_rate"
+RATE_REFRESH_SECONDS = 30.0
+
+_rate_cache: tuple[float, float] | None = None  # (checked_at monotonic, rate)
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{Path(code.co_filename).stem}:{name}"
+
+
+def _thread_stack(frame: FrameType) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_idle(frame: FrameType) -> bool:
+    """Event loop blocked in the selector: waiting on I/O, not burning CPU."""
+    return frame.f_code.co_filename.endswith("selectors.py")
+
+
+def _await_chain(task: asyncio.Task) -> list[str]:
+    chain = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            chain.append(f"<{type(awaitable).__name__}>")
+            break
+        chain.append(_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return chain
+
+
+class StackSampler:
+    """Samples one thread's stack (and optionally one task's await chain) from a daemon thread."""
+
+    def __init__(self, thread_id: int, task: asyncio.Task | None = None, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.task = task
+        self.interval = interval
+        self.cpu: Counter[str] = Counter()
+        self.awaits: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        self.samples += 1
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None and not _is_idle(frame):
+            self.cpu[";".join(_thread_stack(frame))] += 1
+        if self.task is not None and not self.task.done():
+            chain = _await_chain(self.task)
+            if chain:
+                self.awaits[";".join(chain)] += 1
+
+    def write(self, directory: str, stem: str) -> list[Path]:
+        out = Path(directory)
+        out.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for kind, stacks in (("cpu", self.cpu), ("async", self.awaits)):
+            path = out / f"{stem}.{kind}.folded"
+            path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+            paths.append(path)
+        return paths
+
+
+def _cached_rate(now: float) -> float | None:
+    cache = _rate_cache
+    if cache is not None and now - cache[0] < RATE_REFRESH_SECONDS:
+        return cache[1]
+    return None
+
+
+def sample_rate(settings: Settings) -> float:
+    """Redis override if set (cached briefly), else ``PROFILE_SAMPLE_RATE``."""
+    global _rate_cache
+    now = time.monotonic()
+    cached = _cached_rate(now)
+    if cached is not None:
+        return cached
+    rate = settings.profile_sample_rate
+    try:
+        override = get_redis().get(RATE_KEY)
+        if override is not None:
+            rate = min(1.0, max(0.0, float(override)))
+    except (redis.RedisError, ValueError):
+        logger.debug("Could not read profiling rate override", exc_info=True)
+    _rate_cache = (now, rate)
+    return rate
+
+
+async def sample_rate_async(settings: Settings) -> float:
+    """``sample_rate`` for the event loop: the Redis read (once per refresh) runs in a thread."""
+    cached = _cached_rate(time.monotonic())
+    return cached if cached is not None else await asyncio.to_thread(sample_rate, settings)
+
+
+@asynccontextmanager
+async def maybe_profile(name: str, run_id: str | None = None) -> AsyncIterator[StackSampler | None]:
+    """Profile the current task with probability ``sample_rate``; never fails the task."""
+    settings = get_settings()
+    if random.random() >= await sample_rate_async(settings):
+        yield None
+        return
+    sampler = StackSampler(
+        threading.get_ident(), asyncio.current_task(), interval=settings.profile_interval_ms / 1000
+    )
+    sampler.start()
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+        stem = f"{name}-{run_id or int(time.time() * 1000)}-{os.getpid()}"
+        try:
+            paths = sampler.write(settings.profile_output_dir, stem)
+            logger.info("Profile (%d samples) written: %s", sampler.samples, ", ".join(map(str, paths)))
+        except OSError:
+            logger.warning("Could not write profile %s", stem, exc_info=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.core.profiling")
+    sub = parser.add_subparsers(dest="command", required=True)
+    set_rate = sub.add_parser("set-rate", help="override PROFILE_SAMPLE_RATE for all workers")
+    set_rate.add_argument("rate", type=float)
+    sub.add_parser("clear-rate", help="drop the override (back to PROFILE_SAMPLE_RATE)")
+    args = parser.parse_args(argv)
+    r = get_redis()
+    if args.command == "set-rate":
+        if not 0 <= args.rate <= 1:
+            parser.error("rate must be between 0 and 1")
+        r.set(RATE_KEY, str(args.rate))
+    else:
+        r.delete(RATE_KEY)
+
+
+if __name__ == "__main__":
+    main()
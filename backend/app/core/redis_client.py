@@ -0,0 +1,12 @@
+"""Shared Redis client (broker Redis) for coordination state: slots, fair queues, stats."""
+from functools import lru_cache
+
+import redis
+
+from app.core.config import get_settings
+
+
+@lru_cache
+def get_redis() -> redis.Redis:
+    """Process-wide client; redis-py pools connections and is thread-safe."""
+    return redis.Redis.from_url(get_settings().redis_url, decode_responses=True)
@@ -17,11 +17,20 @@ def _sign(secret: str, payload: str) -> str:
     return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
 
 
-def generate_state(secret: str) -> str:
+def generate_state(secret: str, app_key: str = "") -> str:
+    """Signed OAuth state; ``app_key`` (the Spotify client ID used) travels signed inside it."""
     raw = secrets.token_urlsafe(32)
+    if app_key:
+        raw = f"{raw}~{app_key}"
     return f"{raw}.{_sign(secret, raw)}"
 
 
+def state_app_key(state: str) -> str | None:
+    """``app_key`` of a state from ``generate_state`` (verify it first); None if it has none."""
+    raw = state.split(".", 1)[0]
+    return raw.split("~", 1)[1] if "~" in raw else None
+
+
 def verify_state(secret: str, cookie_value: str | None, query_state: str | None) -> bool:
     if not cookie_value or not query_state or cookie_value != query_state:
         return False
@@ -0,0 +1,12 @@
+"""Small summary statistics shared by stats endpoints (no heavy imports)."""
+from __future__ import annotations
+
+import math
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
@@ -0,0 +1,70 @@
+"""OpenTelemetry tracing across API enqueue, Celery/asyncio workers and Spotify calls.
+
+``configure_tracing`` installs an SDK tracer provider per process (API lifespan, each
+worker process). Until then the OpenTelemetry API hands out no-op spans, so instrumented
+code costs next to nothing when ``TRACING_EXPORTER=none``; the SDK itself
+(``app.core.tracing_sdk``) is only imported when an exporter is configured.
+
+Context crosses the broker as W3C ``traceparent``/``tracestate`` message headers:
+``trace_headers()`` when enqueueing, ``extract_context()`` in the worker.
+Span attributes carry IDs of our own rows and endpoint templates only; never tokens.
+"""
+from __future__ import annotations
+
+import logging
+import sys
+from typing import Any, Mapping
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADERS = ("traceparent", "tracestate")
+
+tracer = trace.get_tracer("spotify_playlist_manager")
+
+_configured = False
+
+
+def configure_tracing(settings: Settings, service_name: str) -> bool:
+    """Install the tracer provider for this process. Returns False when tracing is off."""
+    global _configured
+    if _configured:
+        return True
+    if settings.tracing_exporter.lower() not in {"console", "file", "otlp"}:
+        return False
+    from app.core.tracing_sdk import build_exporter, build_provider
+
+    exporter = build_exporter(settings)
+    if exporter is None:
+        return False
+    trace.set_tracer_provider(build_provider(settings, service_name, exporter))
+    _configured = True
+    logger.info("Tracing enabled (%s) for %s", settings.tracing_exporter, service_name)
+    return True
+
+
+def shutdown_tracing() -> None:
+    # Without the SDK loaded there is no provider of ours to flush.
+    sdk = sys.modules.get("app.core.tracing_sdk")
+    if sdk is not None:
+        sdk.shutdown_provider(trace.get_tracer_provider())
+
+
+def trace_headers() -> dict[str, str]:
+    """Current trace context as message headers (empty when there is no active span)."""
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(source: Mapping[str, Any] | Any) -> Context:
+    """Context from message headers (dict) or a Celery request (headers are attributes)."""
+    if isinstance(source, Mapping):
+        carrier = {k: source[k] for k in TRACE_HEADERS if source.get(k)}
+    else:
+        carrier = {k: getattr(source, k) for k in TRACE_HEADERS if getattr(source, k, None)}
+    return propagate.extract(carrier)
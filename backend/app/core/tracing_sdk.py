@@ -0,0 +1,65 @@
+"""OpenTelemetry SDK side of tracing: tracer provider, sampler and exporters.
+
+Kept apart from ``app.core.tracing`` so that importing instrumented modules only pulls in the
+lightweight OpenTelemetry API; the SDK loads when ``configure_tracing`` actually enables it.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Sequence
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.core.config import Settings
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Append one JSON object per finished span to a local file."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [span.to_json(indent=None) for span in spans]
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        return None
+
+
+def build_exporter(settings: Settings) -> SpanExporter | None:
+    kind = settings.tracing_exporter.lower()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return JsonLinesSpanExporter(settings.tracing_file_path)
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    return None
+
+
+def build_provider(settings: Settings, service_name: str, exporter: SpanExporter) -> TracerProvider:
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name, "deployment.environment": settings.environment}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+def shutdown_provider(provider: object) -> None:
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
@@ -1,8 +1,8 @@
 """SQLAlchemy models. ORM only (parameterized SQL); never log or expose token fields (CWE-532)."""
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Any
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, Boolean, JSON
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text, Boolean, JSON, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -33,6 +33,8 @@ class OAuthToken(Base):
     refresh_token: Mapped[str] = mapped_column(Text, nullable=False)
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     scope: Mapped[str] = mapped_column(String(512), nullable=True)
+    # Spotify app that issued the tokens (app.auth.apps); NULL means the primary app.
+    client_id: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, onupdate=_utc_now, nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="oauth_tokens")
@@ -48,13 +50,27 @@ class PlaylistConfig(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     source_playlist_id: Mapped[str] = mapped_column(String(255), nullable=False)
     target_playlist_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Source snapshot_id as of the last complete sync; an unchanged source skips the next one.
+    source_snapshot_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     strategy_json: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
     is_enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # When the scheduler should enqueue the next sync (app.workers.scheduling.schedule_due_syncs).
+    next_run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="playlist_configs")
     runs: Mapped[list["PlaylistRun"]] = relationship("PlaylistRun", back_populates="playlist_config", cascade="all, delete-orphan")
 
+    # Partial index: due scans only touch enabled configs.
+    __table_args__ = (
+        Index(
+            "ix_playlist_configs_due",
+            "next_run_at",
+            postgresql_where=text("is_enabled"),
+            sqlite_where=text("is_enabled"),
+        ),
+    )
+
 
 class PlaylistRun(Base):
     __tablename__ = "playlist_runs"
@@ -64,11 +80,50 @@ class PlaylistRun(Base):
         Integer, ForeignKey("playlist_configs.id", ondelete="CASCADE"), nullable=False, index=True
     )
     status: Mapped[str] = mapped_column(String(64), nullable=False)
+    job_id: Mapped[str | None] = mapped_column(String(155), nullable=True, index=True)
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, nullable=False)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Every start, resume and finish moves it forward (HTTP validators; finished_at can reset).
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=_utc_now, onupdate=_utc_now, nullable=False
+    )
     tracks_added_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Phase timings and Spotify call counters (app.playlists.profile.SyncProfile.as_dict()).
+    profile_json: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
 
     playlist_config: Mapped["PlaylistConfig"] = relationship("PlaylistConfig", back_populates="runs")
 
     __table_args__ = (Index("ix_playlist_runs_config_started", "playlist_config_id", "started_at"),)
+
+
+class Track(Base):
+    """Spotify track catalog shared by all users; other tables refer to tracks by ``id``."""
+    __tablename__ = "tracks"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    spotify_id: Mapped[str] = mapped_column(String(32), unique=True, nullable=False, index=True)
+
+
+class PlaylistRunTrack(Base):
+    """Tracks a run added to its target playlist (one integer pair per track)."""
+    __tablename__ = "playlist_run_tracks"
+
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey("playlist_runs.id", ondelete="CASCADE"), primary_key=True)
+    track_id: Mapped[int] = mapped_column(Integer, ForeignKey("tracks.id"), primary_key=True, index=True)
+
+
+class DiscoverWeeklyWeek(Base):
+    """One user's Discover Weekly for one week, as catalog keys (``app.playlists.history``)."""
+    __tablename__ = "discover_weekly_weeks"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    week_start: Mapped[date] = mapped_column(Date, nullable=False)
+    source_snapshot_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    track_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Sorted tracks.id values, delta + varint encoded.
+    track_keys: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utc_now, nullable=False)
+
+    __table_args__ = (Index("ix_discover_weekly_weeks_user_week", "user_id", "week_start", unique=True),)
@@ -1,19 +1,52 @@
-"""DB session factory; use with dependency injection. Parameterized SQL only (CWE-89)."""
+"""DB session factory; use with dependency injection. Parameterized SQL only (CWE-89).
+
+The engine (and the DB driver import) is created on first use, not at import time, so
+importing models or the API app stays cheap and doesn't need a reachable database URL.
+"""
+from functools import lru_cache
+from typing import Any
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-from app.config import get_settings
+from app.core.config import get_settings
 
-settings = get_settings()
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=settings.debug,
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@lru_cache
+def get_engine() -> Engine:
+    from app.core.metrics import instrument_engine
+
+    settings = get_settings()
+    engine = create_engine(
+        settings.database_url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        echo=settings.debug,
+    )
+    instrument_engine(engine)
+    return engine
+
+
+@lru_cache
+def _session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def SessionLocal() -> Session:  # noqa: N802 - keeps the sessionmaker-style call sites
+    return _session_factory()()
+
+
+def __getattr__(name: str) -> Any:
+    # ``from app.db.session import engine`` still works, creating the engine on demand.
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
     db = SessionLocal()
     try:
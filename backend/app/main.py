@@ -2,11 +2,14 @@
 from contextlib import asynccontextmanager
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.rate_limit import RateLimitMiddleware
 from app.core.config import get_settings
-from app.core.logging import configure_logging
+from app.core.logging import configure_logging, stop_logging_listener
+from app.core.metrics import PrometheusMiddleware, render_latest
+from app.core.tracing import configure_tracing, shutdown_tracing
 from app.auth.routes import router as auth_router
 from app.playlists.routes import router as playlists_router
 from app.playlists.routes import jobs_router
@@ -15,11 +18,14 @@ from app.playlists.routes import jobs_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings = get_settings()
-    configure_logging(level=settings.log_level, json_logs=settings.json_logs)
+    configure_logging(level=settings.log_level, json_logs=settings.json_logs, use_queue=settings.log_queue)
     logger = logging.getLogger(__name__)
+    configure_tracing(settings, service_name="api")
     logger.info("Starting %s", settings.app_name)
     yield
     logger.info("Shutting down")
+    shutdown_tracing()
+    stop_logging_listener()
 
 
 def create_app() -> FastAPI:
@@ -30,6 +36,8 @@ def create_app() -> FastAPI:
         docs_url="/docs" if settings.environment != "production" else None,
         redoc_url="/redoc" if settings.environment != "production" else None,
     )
+    # Innermost of the three, so 429 responses still get CORS headers and are measured.
+    app.add_middleware(RateLimitMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins,
@@ -37,11 +45,17 @@ def create_app() -> FastAPI:
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["*"],
     )
+    app.add_middleware(PrometheusMiddleware)
 
     @app.get("/health")
     def health():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        payload, content_type = render_latest()
+        return Response(content=payload, media_type=content_type)
+
     app.include_router(auth_router)
     app.include_router(playlists_router)
     app.include_router(jobs_router)
@@ -0,0 +1,229 @@
+"""Circuit breaker for Spotify outages, shared by all workers through Redis.
+
+States live in one Redis hash (``spotify:breaker``); outcomes are counted in 10s buckets
+covering ``SPOTIFY_BREAKER_WINDOW_SECONDS``:
+
+- closed: requests flow; when the window has at least ``MIN_REQUESTS`` outcomes and the
+  5xx/network-error share reaches ``ERROR_RATE`` the breaker opens.
+- open: requests fail fast with ``CircuitOpenError`` for ``OPEN_SECONDS``; sync tasks
+  defer themselves (ETA) instead of retrying into the outage.
+- half_open: up to ``HALF_OPEN_PROBES`` requests go through; that many successes close
+  the breaker, any failure reopens it.
+
+429s are rate limiting, not an outage, and are left to the adaptive limiter. Each process
+caches a "closed" answer for ``LOCAL_TTL_SECONDS``; while it holds, successes are counted
+locally and written with the next failure or refresh, so healthy traffic costs about one
+Redis round trip per second per process. The breaker fails open when Redis is unreachable.
+Async callers use ``check_async``/``record_async``, which answer from the local cache on
+the event loop and make any Redis call in a thread. The local success count is guarded by a
+lock, so sync and async callers on different threads can share one breaker.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Callable
+
+import redis
+
+from app.core.config import get_settings
+from app.core.metrics import SPOTIFY_BREAKER_REJECTED_TOTAL, SPOTIFY_BREAKER_TRANSITIONS_TOTAL
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "spotify:breaker"
+BUCKET_PREFIX = "spotify:breaker:bucket:"
+BUCKET_SECONDS = 10
+LOCAL_TTL_SECONDS = 1.0
+HALF_OPEN_RETRY_SECONDS = 5
+
+# KEYS[1] state hash. ARGV: now, open_seconds, max_probes, half_open_retry.
+# Returns {allowed, state, retry_after}.
+_ALLOW = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state or state == 'closed' then return {1, 'closed', '0'} end
+if state == 'open' then
+  local open_until = tonumber(redis.call('HGET', KEYS[1], 'until'))
+  if now < open_until then return {0, 'open', tostring(open_until - now)} end
+  redis.call('HSET', KEYS[1], 'state', 'half_open', 'probes', 0, 'successes', 0,
+             'until', now + tonumber(ARGV[2]))
+  state = 'half_open'
+elseif now >= tonumber(redis.call('HGET', KEYS[1], 'until')) then
+  -- Probes never reported back (worker died): hand out a fresh set.
+  redis.call('HSET', KEYS[1], 'probes', 0, 'successes', 0, 'until', now + tonumber(ARGV[2]))
+end
+if redis.call('HINCRBY', KEYS[1], 'probes', 1) <= tonumber(ARGV[3]) then
+  return {1, 'half_open', '0'}
+end
+redis.call('HINCRBY', KEYS[1], 'probes', -1)
+return {0, 'half_open', ARGV[4]}
+"""
+
+# KEYS[1] state hash, KEYS[2..] window buckets (KEYS[2] = current).
+# ARGV: now, successes, failures, error_rate, min_requests, open_seconds, max_probes, bucket_ttl.
+# Returns the state after recording; 'opened' / 'recovered' mark transitions.
+_RECORD = """
+local now = tonumber(ARGV[1])
+local ok = tonumber(ARGV[2])
+local failed = tonumber(ARGV[3])
+local function open()
+  redis.call('HSET', KEYS[1], 'state', 'open', 'until', now + tonumber(ARGV[6]))
+  return 'opened'
+end
+local state = redis.call('HGET', KEYS[1], 'state')
+if state == 'open' then return 'open' end
+if state == 'half_open' then
+  if failed > 0 then return open() end
+  if redis.call('HINCRBY', KEYS[1], 'successes', ok) >= tonumber(ARGV[7]) then
+    redis.call('DEL', unpack(KEYS))
+    return 'recovered'
+  end
+  return 'half_open'
+end
+redis.call('HINCRBY', KEYS[2], 'total', ok + failed)
+if failed > 0 then redis.call('HINCRBY', KEYS[2], 'failures', failed) end
+redis.call('EXPIRE', KEYS[2], ARGV[8])
+local total, failures = 0, 0
+for i = 2, #KEYS do
+  total = total + tonumber(redis.call('HGET', KEYS[i], 'total') or '0')
+  failures = failures + tonumber(redis.call('HGET', KEYS[i], 'failures') or '0')
+end
+if total >= tonumber(ARGV[5]) and failures / total >= tonumber(ARGV[4]) then return open() end
+return 'closed'
+"""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        *,
+        error_rate: float = 0.5,
+        min_requests: int = 20,
+        window_seconds: int = 30,
+        open_seconds: int = 30,
+        half_open_probes: int = 3,
+        redis_factory: Callable[[], redis.Redis] = get_redis,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.buckets = max(1, math.ceil(window_seconds / BUCKET_SECONDS))
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._redis = redis_factory
+        self._clock = clock
+        self._closed_until = 0.0
+        self._pending_ok = 0
+        self._pending_lock = threading.Lock()
+
+    def check(self) -> float | None:
+        """None if the request may go ahead, else seconds until it is worth trying again."""
+        now = self._clock()
+        if now < self._closed_until:
+            return None
+        return self._allow(now, self._take_pending())
+
+    async def check_async(self) -> float | None:
+        """``check`` for the event loop: Redis is only called (in a thread) when the cache expired."""
+        now = self._clock()
+        if now < self._closed_until:
+            return None
+        return await asyncio.to_thread(self._allow, now, self._take_pending())
+
+    def _allow(self, now: float, pending_ok: int) -> float | None:
+        if pending_ok:
+            self._send(pending_ok, 0)
+        try:
+            allowed, state, retry_after = self._redis().eval(
+                _ALLOW,
+                1,
+                STATE_KEY,
+                str(now),
+                str(self.open_seconds),
+                str(self.half_open_probes),
+                str(HALF_OPEN_RETRY_SECONDS),
+            )
+        except redis.RedisError:
+            logger.debug("Circuit breaker state unavailable; allowing request", exc_info=True)
+            return None
+        if state == "closed":
+            self._closed_until = now + LOCAL_TTL_SECONDS
+        if int(allowed):
+            return None
+        SPOTIFY_BREAKER_REJECTED_TOTAL.inc()
+        return max(1.0, float(retry_after))
+
+    def record(self, failed: bool) -> None:
+        """Count one outcome (5xx/network error = failed)."""
+        if not failed and self._clock() < self._closed_until:
+            self._add_pending()
+            return
+        self._send(self._take_pending() + (0 if failed else 1), 1 if failed else 0)
+
+    async def record_async(self, failed: bool) -> None:
+        """``record`` for the event loop; outcomes that must be written go to Redis in a thread."""
+        if not failed and self._clock() < self._closed_until:
+            self._add_pending()
+            return
+        await asyncio.to_thread(self._send, self._take_pending() + (0 if failed else 1), 1 if failed else 0)
+
+    def _add_pending(self) -> None:
+        with self._pending_lock:
+            self._pending_ok += 1
+
+    def _take_pending(self) -> int:
+        with self._pending_lock:
+            pending, self._pending_ok = self._pending_ok, 0
+        return pending
+
+    def _send(self, successes: int, failures: int) -> None:
+        now = self._clock()
+        current = int(now // BUCKET_SECONDS)
+        keys = [f"{BUCKET_PREFIX}{current - i}" for i in range(self.buckets)]
+        try:
+            state = self._redis().eval(
+                _RECORD,
+                1 + len(keys),
+                STATE_KEY,
+                *keys,
+                str(now),
+                str(successes),
+                str(failures),
+                str(self.error_rate),
+                str(self.min_requests),
+                str(self.open_seconds),
+                str(self.half_open_probes),
+                str((self.buckets + 1) * BUCKET_SECONDS),
+            )
+        except redis.RedisError:
+            logger.debug("Could not record circuit breaker outcome", exc_info=True)
+            return
+        if state == "opened":
+            SPOTIFY_BREAKER_TRANSITIONS_TOTAL.labels("open").inc()
+            logger.warning("Spotify circuit breaker opened for %ss", self.open_seconds)
+        elif state == "recovered":
+            SPOTIFY_BREAKER_TRANSITIONS_TOTAL.labels("closed").inc()
+            logger.info("Spotify circuit breaker closed after successful probes")
+        if state not in ("closed", "recovered"):
+            self._closed_until = 0.0
+
+
+@lru_cache
+def get_spotify_breaker() -> CircuitBreaker | None:
+    """Process-wide breaker from ``SPOTIFY_BREAKER_*``; None when disabled."""
+    settings = get_settings()
+    if not settings.spotify_breaker_enabled:
+        return None
+    return CircuitBreaker(
+        error_rate=settings.spotify_breaker_error_rate,
+        min_requests=settings.spotify_breaker_min_requests,
+        window_seconds=settings.spotify_breaker_window_seconds,
+        open_seconds=settings.spotify_breaker_open_seconds,
+        half_open_probes=settings.spotify_breaker_half_open_probes,
+    )
@@ -0,0 +1,85 @@
+"""Shared track catalog: Spotify track IDs mapped once to integer keys.
+
+Per-user data (``playlist_run_tracks``) stores 4-byte ``tracks.id`` values instead of
+repeating 22-character Spotify IDs, so its rows and indexes stay small and membership
+queries compare integers. Catalog rows are inserted in bulk with
+``INSERT ... ON CONFLICT DO NOTHING`` (PostgreSQL and SQLite), so concurrent syncs that
+see the same track don't conflict. Other databases select the keys that already exist and
+insert the rest in a savepoint, looking again if a concurrent insert wins the race. Batches are inserted in sorted order: concurrent
+transactions then take the unique-index locks in the same order and cannot deadlock on
+overlapping tracks. Nothing here commits; rows are committed with the run's final state.
+"""
+from __future__ import annotations
+
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.tracing import tracer
+from app.db.models import PlaylistRunTrack, Track
+
+BATCH_SIZE = 1000
+TRACK_URI_PREFIX = "spotify:track:"
+
+_INSERT_IGNORING_CONFLICTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def track_id_from_uri(uri: str) -> str | None:
+    return uri[len(TRACK_URI_PREFIX):] if uri.startswith(TRACK_URI_PREFIX) else None
+
+
+def _insert_ignoring_conflicts(db: Session, model: type, rows: list[dict], index_elements: list[str]) -> None:
+    dialect_insert = _INSERT_IGNORING_CONFLICTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        _insert_missing(db, model, rows, index_elements)
+        return
+    db.execute(dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements), rows)
+
+
+def _insert_missing(db: Session, model: type, rows: list[dict], index_elements: list[str]) -> None:
+    # Portable fallback: skip keys that exist; a concurrent insert only rolls back the savepoint.
+    columns = [getattr(model, name) for name in index_elements]
+    key_column = columns[0] if len(columns) == 1 else tuple_(*columns)
+    pending = {tuple(row[name] for name in index_elements): row for row in rows}
+    for attempt in range(2):
+        keys = [k[0] for k in pending] if len(columns) == 1 else list(pending)
+        existing = set(db.execute(select(*columns).where(key_column.in_(keys))).tuples())
+        missing = [row for key, row in pending.items() if key not in existing]
+        if not missing:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(insert(model), missing)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def catalog_ids(db: Session, spotify_ids: Iterable[str]) -> dict[str, int]:
+    """``tracks.id`` for each Spotify track ID, adding the ones not in the catalog yet."""
+    out: dict[str, int] = {}
+    ids = iter(sorted(set(spotify_ids)))
+    while batch := list(islice(ids, BATCH_SIZE)):
+        _insert_ignoring_conflicts(db, Track, [{"spotify_id": tid} for tid in batch], ["spotify_id"])
+        out.update(db.execute(select(Track.spotify_id, Track.id).where(Track.spotify_id.in_(batch))).tuples().all())
+    return out
+
+
+def record_run_tracks(db: Session, run_id: int, spotify_ids: Iterable[str]) -> int:
+    """Store the tracks ``run_id`` added (idempotent); returns how many were given."""
+    with tracer.start_as_current_span("db.catalog") as span:
+        keys = catalog_ids(db, spotify_ids)
+        span.set_attribute("app.rows", len(keys))
+        if keys:
+            _insert_ignoring_conflicts(
+                db,
+                PlaylistRunTrack,
+                [{"run_id": run_id, "track_id": key} for key in keys.values()],
+                ["run_id", "track_id"],
+            )
+    return len(keys)
@@ -0,0 +1,185 @@
+"""Track ID sets for sync dedup that spill to disk instead of growing without bound.
+
+A ``TrackIdSet`` starts as a plain ``set``. It moves to a private temporary SQLite
+database (``sqlite3.connect("")``: on disk, deleted on close, small page cache) once it
+holds ``max_memory_ids`` IDs, or once the worker-wide ``DedupBudget`` is used up. All
+sets in a process share that budget, so many concurrent syncs of big playlists in the
+asyncio worker spill early instead of adding up. Memory is reserved in blocks of
+``RESERVE_BLOCK`` IDs, which keeps the shared counter off the per-track path.
+
+A Spotify track ID in a set costs about 100 bytes, so the default worker budget of
+500k IDs is roughly 50 MB. Lookups in a spilled set are indexed and mostly served from
+SQLite's page cache. Syncs check and add a whole page at a time with ``add_new_async``,
+which runs any SQLite work (a spilled set, or one that may spill now) in a thread so the
+event loop keeps serving the other syncs.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator
+
+from app.core.config import get_settings
+from app.core.metrics import SYNC_DEDUP_MEMORY_IDS, SYNC_DEDUP_SPILLS_TOTAL
+
+RESERVE_BLOCK = 1024
+INSERT_BATCH = 1000
+LOOKUP_BATCH = 500  # bound parameters per IN (...) query; old SQLite builds allow 999
+SPILL_CACHE_KIB = 2048
+
+
+class DedupBudget:
+    """IDs all in-memory ``TrackIdSet`` instances of a process may hold together."""
+
+    def __init__(self, max_ids: int):
+        self.max_ids = max_ids
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, n: int) -> bool:
+        with self._lock:
+            if self.used + n > self.max_ids:
+                return False
+            self.used += n
+        SYNC_DEDUP_MEMORY_IDS.inc(n)
+        return True
+
+    def release(self, n: int) -> None:
+        if n <= 0:
+            return
+        with self._lock:
+            self.used -= n
+        SYNC_DEDUP_MEMORY_IDS.dec(n)
+
+
+@lru_cache
+def get_dedup_budget() -> DedupBudget:
+    """Process-wide budget from ``SYNC_DEDUP_WORKER_MEMORY_IDS``."""
+    return DedupBudget(get_settings().sync_dedup_worker_memory_ids)
+
+
+class TrackIdSet:
+    """Set of track IDs (``in``, ``add``, ``update``, iteration); call ``clear()`` when done."""
+
+    def __init__(self, max_memory_ids: int, budget: DedupBudget | None = None):
+        self.max_memory_ids = max_memory_ids
+        self._budget = budget
+        self._reserved = 0
+        self._memory: set[str] = set()
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._db is not None
+
+    def __contains__(self, track_id: str) -> bool:
+        if self._db is None:
+            return track_id in self._memory
+        return self._db.execute("SELECT 1 FROM ids WHERE id = ?", (track_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        if self._db is None:
+            return len(self._memory)
+        return self._db.execute("SELECT count(*) FROM ids").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        if self._db is None:
+            return iter(self._memory)
+        return (row[0] for row in self._db.execute("SELECT id FROM ids"))
+
+    def add(self, track_id: str) -> None:
+        if self._db is None:
+            if track_id in self._memory:
+                return
+            if len(self._memory) < self._reserved or self._grow():
+                self._memory.add(track_id)
+                return
+            self._spill()
+        self._db.execute("INSERT OR IGNORE INTO ids VALUES (?)", (track_id,))
+
+    def add_new(self, track_ids: Iterable[str]) -> set[str]:
+        """Add ``track_ids``; returns the ones that were not in the set yet (one query per batch)."""
+        unique = list(dict.fromkeys(track_ids))
+        if self._db is None:
+            new = [t for t in unique if t not in self._memory]
+        else:
+            present: set[str] = set()
+            for start in range(0, len(unique), LOOKUP_BATCH):
+                batch = unique[start:start + LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                present.update(row[0] for row in self._db.execute(f"SELECT id FROM ids WHERE id IN ({marks})", batch))
+            new = [t for t in unique if t not in present]
+        self.update(new)
+        return set(new)
+
+    async def add_new_async(self, track_ids: list[str]) -> set[str]:
+        """``add_new`` for the event loop: inline while the IDs fit in memory, else in a thread."""
+        if self._db is None and self._fits_in_memory(len(track_ids)):
+            return self.add_new(track_ids)
+        return await asyncio.to_thread(self.add_new, track_ids)
+
+    def update(self, track_ids: Iterable[str]) -> None:
+        it = iter(track_ids)
+        while self._db is None:
+            track_id = next(it, None)
+            if track_id is None:
+                return
+            self.add(track_id)
+        while batch := list(islice(it, INSERT_BATCH)):
+            self._db.executemany("INSERT OR IGNORE INTO ids VALUES (?)", ((t,) for t in batch))
+
+    def clear(self) -> None:
+        """Drop all IDs, the memory reservation and the spill file; the set stays usable."""
+        self._memory = set()
+        self._release()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self) -> TrackIdSet:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.clear()
+
+    def _fits_in_memory(self, n: int) -> bool:
+        # Reserves ahead (cheap) so that adding ``n`` IDs cannot spill.
+        while len(self._memory) + n > self._reserved:
+            if not self._grow():
+                return False
+        return True
+
+    def _grow(self) -> bool:
+        block = min(RESERVE_BLOCK, self.max_memory_ids - self._reserved)
+        if block <= 0:
+            return False
+        if self._budget is not None and not self._budget.reserve(block):
+            return False
+        self._reserved += block
+        return True
+
+    def _release(self) -> None:
+        if self._budget is not None:
+            self._budget.release(self._reserved)
+        self._reserved = 0
+
+    def _spill(self) -> None:
+        # Inserts stay in one open transaction that is never committed: nothing is synced to disk
+        # until the page cache overflows, and the file is dropped on close.
+        db = sqlite3.connect("", check_same_thread=False)
+        db.execute(f"PRAGMA cache_size = -{SPILL_CACHE_KIB}")
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("CREATE TABLE ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        db.executemany("INSERT INTO ids VALUES (?)", ((t,) for t in self._memory))
+        self._db = db
+        self._memory = set()
+        self._release()
+        SYNC_DEDUP_SPILLS_TOTAL.inc()
+
+
+def new_track_id_set() -> TrackIdSet:
+    """A ``TrackIdSet`` sized by ``SYNC_DEDUP_MAX_MEMORY_IDS`` and charged to the worker budget."""
+    return TrackIdSet(get_settings().sync_dedup_max_memory_ids, get_dedup_budget())
@@ -0,0 +1,126 @@
+"""Weekly Discover Weekly archive: what Spotify recommended to each user, week by week.
+
+A complete sync that sees a new source ``snapshot_id`` stores the source's tracks as one
+``discover_weekly_weeks`` row per user and week (weeks start on Monday, UTC). Tracks are
+catalog keys (``app.playlists.catalog``), sorted, delta-encoded and written as LEB128
+varints: a 30-track week is about 60-90 bytes. History queries read a user's rows through
+the ``(user_id, week_start)`` index and decode them in Python. A year of weeks is a few KB,
+so answers take milliseconds and never call Spotify.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import DiscoverWeeklyWeek, Track
+from app.playlists.catalog import catalog_ids
+
+logger = logging.getLogger(__name__)
+
+# Larger sources (not a Discover Weekly) are not archived.
+MAX_TRACKS = 500
+
+
+def encode_keys(keys: Iterable[int]) -> bytes:
+    out = bytearray()
+    prev = 0
+    for key in sorted(set(keys)):
+        delta, prev = key - prev, key
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_keys(blob: bytes) -> list[int]:
+    keys: list[int] = []
+    value = shift = prev = 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += value
+        keys.append(prev)
+        value = shift = 0
+    return keys
+
+
+def week_of(moment: datetime) -> date:
+    day = moment.date()
+    return day - timedelta(days=day.weekday())
+
+
+@dataclass
+class ArchivedWeek:
+    week_start: date
+    source_snapshot_id: str | None
+    keys: list[int]
+
+
+def archive_week(
+    db: Session, user_id: int, week_start: date, snapshot_id: str | None, spotify_ids: list[str]
+) -> bool:
+    """Store (or replace) the user's week; not committed. False when the source is too large."""
+    if len(spotify_ids) > MAX_TRACKS:
+        logger.info("Not archiving a %d-track source for user %s", len(spotify_ids), user_id)
+        return False
+    keys = list(catalog_ids(db, spotify_ids).values())
+    row = db.scalars(
+        select(DiscoverWeeklyWeek).where(
+            DiscoverWeeklyWeek.user_id == user_id, DiscoverWeeklyWeek.week_start == week_start
+        )
+    ).first()
+    if row is None:
+        row = DiscoverWeeklyWeek(user_id=user_id, week_start=week_start)
+        db.add(row)
+    row.source_snapshot_id = snapshot_id
+    row.track_count = len(keys)
+    row.track_keys = encode_keys(keys)
+    return True
+
+
+def load_weeks(
+    db: Session, user_id: int, weeks: Iterable[date] | None = None, limit: int | None = None
+) -> list[ArchivedWeek]:
+    """The user's archived weeks, newest first; only ``weeks`` when given."""
+    query = (
+        select(DiscoverWeeklyWeek.week_start, DiscoverWeeklyWeek.source_snapshot_id, DiscoverWeeklyWeek.track_keys)
+        .where(DiscoverWeeklyWeek.user_id == user_id)
+        .order_by(DiscoverWeeklyWeek.week_start.desc())
+    )
+    if weeks is not None:
+        query = query.where(DiscoverWeeklyWeek.week_start.in_(list(weeks)))
+    if limit is not None:
+        query = query.limit(limit)
+    return [ArchivedWeek(week, snapshot, decode_keys(blob)) for week, snapshot, blob in db.execute(query)]
+
+
+def spotify_ids(db: Session, keys: Iterable[int]) -> dict[int, str]:
+    wanted = list(set(keys))
+    if not wanted:
+        return {}
+    return dict(db.execute(select(Track.id, Track.spotify_id).where(Track.id.in_(wanted))).tuples().all())
+
+
+def catalog_key(db: Session, spotify_id: str) -> int | None:
+    return db.scalar(select(Track.id).where(Track.spotify_id == spotify_id))
+
+
+def repeated_keys(weeks: list[ArchivedWeek], min_weeks: int = 2) -> dict[int, list[date]]:
+    """Catalog keys found in at least ``min_weeks`` of ``weeks``, with those weeks (newest first)."""
+    counts = Counter(key for week in weeks for key in week.keys)
+    repeated = {key for key, n in counts.items() if n >= min_weeks}
+    out: dict[int, list[date]] = {key: [] for key in repeated}
+    for week in weeks:
+        for key in week.keys:
+            if key in repeated:
+                out[key].append(week.week_start)
+    return out
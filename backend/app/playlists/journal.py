@@ -0,0 +1,117 @@
+"""Sync journal: checkpoints that let a retried sync task resume instead of starting over.
+
+A real (non-dry) sync started by a task journals its progress in Redis under the task ID,
+which Celery retries and asyncio-worker republishes keep:
+
+- ``sync:journal:<job_id>``: ``SyncJournal`` JSON (run ID, playlist and snapshot IDs,
+  phase, source position, tracks added so far);
+- ``sync:journal:<job_id>:target``: set of track IDs known to be in the target (the target
+  scan plus every batch added since).
+
+The first checkpoint (phase ``discover``, run ID only) is written as soon as the run row
+exists, so a retry after an early failure (token, playlist discovery) reuses the same
+``PlaylistRun`` row and just runs discovery again. Later checkpoints are written once the
+playlists are known, when the target scan completes and after every successful add batch
+(together with the snapshot ID Spotify returns for it). From there a retry skips playlist
+discovery, reuses the target IDs when the target's snapshot ID is still the one we last saw
+(otherwise rescans it), and continues the source from the first item not yet committed. Journals expire after ``SYNC_JOURNAL_TTL_SECONDS``
+and are deleted when the sync succeeds. Redis errors only cost the ability to resume.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable
+
+import redis
+
+from app.core.redis_client import get_redis
+
+if TYPE_CHECKING:
+    from app.playlists.dedup import TrackIdSet
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PREFIX = "sync:journal:"
+ID_BATCH = 1000
+
+PHASE_DISCOVER = "discover"
+PHASE_SCAN_TARGET = "scan_target"
+PHASE_SCAN_SOURCE = "scan_source"
+
+
+@dataclass
+class SyncJournal:
+    run_id: int
+    # Playlist fields are None until discovery has found them (phase ``discover``).
+    source_playlist_id: str | None = None
+    source_snapshot_id: str | None = None
+    target_playlist_id: str | None = None
+    # Target snapshot after its scan or our latest add; a different one means someone else wrote.
+    target_snapshot_id: str | None = None
+    phase: str = PHASE_SCAN_TARGET
+    # Source items before this index are handled (added, or skipped as duplicates/local).
+    source_index: int = 0
+    added: int = 0
+
+
+def _keys(job_id: str) -> tuple[str, str]:
+    return f"{JOURNAL_PREFIX}{job_id}", f"{JOURNAL_PREFIX}{job_id}:target"
+
+
+def load_journal(job_id: str) -> SyncJournal | None:
+    """The journal of an earlier attempt of ``job_id``, if any."""
+    try:
+        raw = get_redis().get(_keys(job_id)[0])
+    except redis.RedisError:
+        logger.warning("Could not load sync journal for job %s", job_id, exc_info=True)
+        return None
+    return SyncJournal(**json.loads(raw)) if raw else None
+
+
+def load_target_ids(job_id: str, into: TrackIdSet) -> bool:
+    """Stream the stored target track IDs into ``into``; False if they could not be read."""
+    try:
+        into.update(get_redis().sscan_iter(_keys(job_id)[1], count=ID_BATCH))
+    except redis.RedisError:
+        logger.warning("Could not load sync journal target for job %s", job_id, exc_info=True)
+        return False
+    return True
+
+
+def save_journal(job_id: str, journal: SyncJournal, new_target_ids: Iterable[str], ttl_seconds: int) -> None:
+    """Checkpoint ``journal``; ``new_target_ids`` are added to the stored target set."""
+    key, target_key = _keys(job_id)
+    ids = iter(new_target_ids)
+    try:
+        client = get_redis()
+        # One round trip per ID_BATCH so a large target scan is never buffered (client or
+        # server side) as a single transaction; the journal is written last, once its IDs are.
+        while batch := list(islice(ids, ID_BATCH)):
+            pipe = client.pipeline(transaction=False)
+            pipe.sadd(target_key, *batch)
+            pipe.expire(target_key, ttl_seconds)
+            pipe.execute()
+        pipe = client.pipeline(transaction=False)
+        pipe.set(key, json.dumps(asdict(journal)), ex=ttl_seconds)
+        pipe.expire(target_key, ttl_seconds)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Could not checkpoint sync journal for job %s", job_id, exc_info=True)
+
+
+def reset_target(job_id: str) -> None:
+    """Forget stored target IDs (before a rescan)."""
+    try:
+        get_redis().delete(_keys(job_id)[1])
+    except redis.RedisError:
+        logger.debug("Could not reset sync journal target for job %s", job_id, exc_info=True)
+
+
+def delete_journal(job_id: str) -> None:
+    try:
+        get_redis().delete(*_keys(job_id))
+    except redis.RedisError:
+        logger.debug("Could not delete sync journal for job %s", job_id, exc_info=True)
@@ -0,0 +1,129 @@
+"""AIMD concurrency limit for Spotify calls, shared by every sync in a worker process.
+
+Each HTTP attempt holds one slot (retry sleeps don't). The limit adapts to what Spotify
+tolerates instead of being hand-tuned:
+
+- additive increase: +1/limit per healthy completion, i.e. about +1 per round of calls;
+- multiplicative decrease: x``ERROR_BACKOFF`` on 429/5xx/network errors and
+  x``LATENCY_BACKOFF`` when smoothed latency exceeds ``latency_tolerance`` x baseline,
+  at most once per ``cooldown`` seconds so one burst of failures counts once.
+
+There is one limiter per Spotify app (``app.auth.apps``): Spotify rate-limits each app
+separately, so each pool app adapts to its own ceiling.
+
+State is per process and not thread-safe: the asyncio worker shares one limiter across
+its syncs, prefork Celery children each have their own (and run one sync at a time).
+Waiters are plain futures, so the limiter survives ``asyncio.run`` per Celery task.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Callable
+
+from app.core.config import get_settings
+from app.core.metrics import SPOTIFY_CONCURRENCY_LIMIT, SPOTIFY_INFLIGHT_REQUESTS
+
+ERROR_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+EWMA_ALPHA = 0.2
+BASELINE_DRIFT = 1.01  # baseline may rise 1% per sample, so it follows lasting latency shifts
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        app: str = "default",
+    ):
+        self.app = app
+        self._limit_gauge = SPOTIFY_CONCURRENCY_LIMIT.labels(app)
+        self._inflight_gauge = SPOTIFY_INFLIGHT_REQUESTS.labels(app)
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self._clock = clock
+        self._limit = float(min(self.max_limit, max(min_limit, initial)))
+        self._inflight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._ewma: float | None = None
+        self._baseline: float | None = None
+        self._last_decrease = float("-inf")
+        self._limit_gauge.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    async def acquire(self) -> None:
+        while self._inflight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._inflight += 1
+        self._inflight_gauge.inc()
+
+    def release(self, latency: float | None, overloaded: bool | None) -> None:
+        """Free a slot and feed back the outcome; ``overloaded=None`` (cancelled) adapts nothing."""
+        self._inflight -= 1
+        self._inflight_gauge.dec()
+        if overloaded:
+            self._decrease(ERROR_BACKOFF)
+        elif overloaded is not None and latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    def _observe(self, latency: float) -> None:
+        self._ewma = latency if self._ewma is None else (1 - EWMA_ALPHA) * self._ewma + EWMA_ALPHA * latency
+        self._baseline = latency if self._baseline is None else min(latency, self._baseline * BASELINE_DRIFT)
+        if self._ewma > self._baseline * self.latency_tolerance:
+            self._decrease(LATENCY_BACKOFF)
+        elif self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._limit_gauge.set(self.limit)
+
+    def _decrease(self, factor: float) -> None:
+        now = self._clock()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * factor)
+        self._limit_gauge.set(self.limit)
+
+    def _wake(self) -> None:
+        free = self.limit - self._inflight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            waiter.set_result(None)
+            free -= 1
+
+
+@lru_cache
+def get_spotify_limiter(app: str = "default") -> AdaptiveLimiter:
+    """Process-wide limiter for one Spotify app, configured from ``SPOTIFY_CONCURRENCY_*``."""
+    settings = get_settings()
+    return AdaptiveLimiter(
+        initial=settings.spotify_concurrency_initial,
+        min_limit=settings.spotify_concurrency_min,
+        max_limit=settings.spotify_concurrency_max,
+        latency_tolerance=settings.spotify_latency_tolerance,
+        app=app,
+    )
@@ -0,0 +1,70 @@
+"""Sync plans: the diff computed by a dry run, kept in Redis so applying it skips the fetch.
+
+A dry run stores its result under its own run ID (``sync:plan:<run_id>``, expiring after
+``SYNC_PLAN_TTL_SECONDS``). A sync requested with ``plan_id`` set to that run ID checks the
+target playlist's ``snapshot_id`` with one call and, if it hasn't moved, only sends the
+``add_tracks`` POSTs. A complete plan also carries the source's track IDs, so applying it
+archives the week just like a full sync. A plan that is missing, expired, belongs to another
+user or whose target changed is ignored and the sync runs in full.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import redis
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PLAN_PREFIX = "sync:plan:"
+
+
+@dataclass
+class SyncPlan:
+    user_id: int
+    source_playlist_id: str
+    source_snapshot_id: str | None
+    target_playlist_id: str
+    target_snapshot_id: str | None
+    uris: list[str]
+    # False when max_tracks cut the diff short; applying it then leaves tracks for the next sync.
+    complete: bool
+    # Source track IDs for the weekly archive; None when incomplete (or stored before they were kept).
+    source_track_ids: list[str] | None = None
+
+
+def save_plan(plan_id: int, plan: SyncPlan, ttl_seconds: int) -> bool:
+    if ttl_seconds <= 0:
+        return False
+    try:
+        get_redis().set(f"{PLAN_PREFIX}{plan_id}", json.dumps(asdict(plan)), ex=ttl_seconds)
+    except redis.RedisError:
+        logger.warning("Could not store sync plan %s", plan_id, exc_info=True)
+        return False
+    return True
+
+
+def load_plan(plan_id: int, user_id: int) -> SyncPlan | None:
+    """The user's plan, or None (missing, expired, someone else's, Redis unavailable)."""
+    try:
+        raw = get_redis().get(f"{PLAN_PREFIX}{plan_id}")
+    except redis.RedisError:
+        logger.warning("Could not load sync plan %s", plan_id, exc_info=True)
+        return None
+    if not raw:
+        return None
+    data: dict[str, Any] = json.loads(raw)
+    if data.get("user_id") != user_id:
+        return None
+    return SyncPlan(**data)
+
+
+def delete_plan(plan_id: int) -> None:
+    try:
+        get_redis().delete(f"{PLAN_PREFIX}{plan_id}")
+    except redis.RedisError:
+        logger.debug("Could not delete sync plan %s", plan_id, exc_info=True)
@@ -0,0 +1,59 @@
+"""Per-sync timing and counter profile, stored on ``PlaylistRun.profile_json``.
+
+One ``SyncProfile`` per sync: ``phase()`` times a named step (and opens the matching
+``sync.<phase>`` span), ``SpotifyApi`` bumps the counters. ``as_dict()`` is the compact
+JSON form, e.g.::
+
+    {"phases_ms": {"access_token": 4.1, "find_playlists": 212.0, ...},
+     "pages": 7, "api_calls": 9, "retries": 1, "sleep_seconds": 2.0, "bytes": 48213}
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from app.core.tracing import tracer
+
+PHASES = (
+    "access_token",
+    "check_snapshot",
+    "find_playlists",
+    "create_playlist",
+    "scan_target",
+    "scan_source",
+    "add_tracks",
+)
+COUNTERS = ("pages", "api_calls", "retries", "sleep_seconds", "bytes")
+
+
+@dataclass
+class SyncProfile:
+    phases_ms: dict[str, float] = field(default_factory=dict)
+    pages: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    sleep_seconds: float = 0.0
+    bytes: int = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Any]:
+        """Time ``name`` (accumulating if entered more than once) inside a ``sync.<name>`` span."""
+        started = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(f"sync.{name}") as span:
+                yield span
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.phases_ms[name] = round(self.phases_ms.get(name, 0.0) + elapsed, 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "phases_ms": dict(self.phases_ms),
+            "pages": self.pages,
+            "api_calls": self.api_calls,
+            "retries": self.retries,
+            "sleep_seconds": round(self.sleep_seconds, 3),
+            "bytes": self.bytes,
+        }
@@ -1,23 +1,41 @@
 from __future__ import annotations
 
 import logging
+from datetime import date
+from typing import Callable
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
+from app.api.http_cache import (
+    cached_body,
+    get_user_validator,
+    json_response,
+    not_modified,
+    not_modified_response,
+)
 from app.core.config import get_settings
 from app.core.security import parse_session_cookie
+from app.core.stats import percentile
+from app.core.tracing import tracer
 from app.db.models import PlaylistConfig, PlaylistRun, User
 from app.db.session import get_db
-from app.workers.celery_app import celery_app
-from app.workers.tasks import sync_discover_weekly_task
+from app.playlists import history
+from app.playlists.profile import COUNTERS, PHASES
 from app.schemas.playlists import (
+    HistoryWeekOut,
+    HistoryWeeksResponse,
     JobEnqueueResponse,
     JobStatusResponse,
     PlaylistRunListResponse,
     PlaylistRunOut,
+    PercentileSummary,
+    RepeatedTrackOut,
+    RepeatedTracksResponse,
+    RunProfileStatsResponse,
     SyncDiscoverWeeklyRequest,
+    TrackHistoryResponse,
+    WeekOverlapResponse,
 )
 
 logger = logging.getLogger(__name__)
@@ -36,18 +54,47 @@ def _current_user(request: Request, db: Session) -> User:
     return user
 
 
+def _admin_user(request: Request, db: Session) -> User:
+    """Current user, if listed in ``ADMIN_SPOTIFY_USER_IDS`` (cross-user data)."""
+    user = _current_user(request, db)
+    if user.spotify_user_id not in get_settings().admin_spotify_user_ids:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
+
+
 @router.post("/sync/discover-weekly", response_model=JobEnqueueResponse)
 async def sync_discover_weekly_endpoint(
     request: Request,
     body: SyncDiscoverWeeklyRequest,
     db: Session = Depends(get_db),
 ):
-    settings = get_settings()
+    # Celery/kombu load on the first enqueue, not at API startup.
+    from app.workers.scheduling import enqueue_interactive_sync
+
     user = _current_user(request, db)
-    async_result = sync_discover_weekly_task.apply_async(
-        kwargs={"user_id": user.id, "dry_run": body.dry_run, "max_tracks": body.max_tracks}
-    )
-    return JobEnqueueResponse(job_id=async_result.id)
+    with tracer.start_as_current_span("sync.enqueue") as span:
+        span.set_attribute("app.user_id", user.id)
+        job_id = enqueue_interactive_sync(
+            user.id, dry_run=body.dry_run, max_tracks=body.max_tracks, plan_id=body.plan_id
+        )
+        span.set_attribute("messaging.message.id", job_id)
+    return JobEnqueueResponse(job_id=job_id)
+
+
+def _user_view(request: Request, db: Session, view: str, render: Callable[[int], dict]) -> Response:
+    """Conditional GET for a per-user view; ``render(user_id)`` runs only on a cache miss."""
+    settings = get_settings()
+    user_id = parse_session_cookie(request.cookies, settings.app_secret)
+    validator = get_user_validator(db, user_id) if user_id else None
+    if validator is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    etag = validator.etag(view)
+    if not_modified(request, etag, validator):
+        return not_modified_response(etag, validator)
+    body = cached_body(etag)
+    if body is None:
+        body = render(user_id)
+    return json_response(body, etag, validator)
 
 
 @router.get("/runs", response_model=PlaylistRunListResponse)
@@ -59,24 +106,176 @@ def list_runs(
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=422, detail="limit must be between 1 and 100")
 
-    user = _current_user(request, db)
+    def render(user_id: int) -> dict:
+        runs = (
+            db.query(PlaylistRun)
+            .join(PlaylistConfig, PlaylistRun.playlist_config_id == PlaylistConfig.id)
+            .filter(PlaylistConfig.user_id == user_id)
+            .order_by(PlaylistRun.started_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return PlaylistRunListResponse(items=[PlaylistRunOut.model_validate(r) for r in runs]).model_dump(mode="json")
+
+    return _user_view(request, db, f"playlists.runs:{limit}", render)
+
+
+@router.get("/history", response_model=HistoryWeeksResponse)
+def discover_weekly_history(request: Request, limit: int = 12, db: Session = Depends(get_db)):
+    """Archived Discover Weekly track lists, newest week first."""
+    if limit < 1 or limit > 260:
+        raise HTTPException(status_code=422, detail="limit must be between 1 and 260")
+
+    def render(user_id: int) -> dict:
+        weeks = history.load_weeks(db, user_id, limit=limit)
+        names = history.spotify_ids(db, (key for week in weeks for key in week.keys))
+        items = [
+            HistoryWeekOut(
+                week_start=week.week_start,
+                source_snapshot_id=week.source_snapshot_id,
+                track_ids=[names[key] for key in week.keys],
+            )
+            for week in weeks
+        ]
+        return HistoryWeeksResponse(items=items).model_dump(mode="json")
+
+    return _user_view(request, db, f"playlists.history:{limit}", render)
+
+
+@router.get("/history/tracks/{track_id}", response_model=TrackHistoryResponse)
+def track_history(request: Request, track_id: str, db: Session = Depends(get_db)):
+    """Weeks in which Discover Weekly recommended ``track_id`` (a Spotify track ID)."""
+
+    def render(user_id: int) -> dict:
+        key = history.catalog_key(db, track_id)
+        weeks = history.load_weeks(db, user_id) if key is not None else []
+        found = [week.week_start for week in weeks if key in week.keys]
+        return TrackHistoryResponse(track_id=track_id, weeks=found).model_dump(mode="json")
+
+    return _user_view(request, db, f"playlists.history.track:{track_id}", render)
+
+
+@router.get("/history/overlap", response_model=WeekOverlapResponse)
+def week_overlap(request: Request, week_a: date, week_b: date, db: Session = Depends(get_db)):
+    """Tracks two archived weeks have in common (weeks are Mondays, as listed by /history)."""
 
-    runs = (
+    def render(user_id: int) -> dict:
+        weeks = {week.week_start: set(week.keys) for week in history.load_weeks(db, user_id, [week_a, week_b])}
+        if week_a not in weeks or week_b not in weeks:
+            raise HTTPException(status_code=404, detail="Week not archived")
+        a, b = weeks[week_a], weeks[week_b]
+        common = a & b
+        names = history.spotify_ids(db, common)
+        return WeekOverlapResponse(
+            week_a=week_a,
+            week_b=week_b,
+            common_track_ids=sorted(names[key] for key in common),
+            only_a=len(a - b),
+            only_b=len(b - a),
+            jaccard=len(common) / len(a | b) if a | b else 0.0,
+        ).model_dump(mode="json")
+
+    return _user_view(request, db, f"playlists.history.overlap:{week_a}:{week_b}", render)
+
+
+@router.get("/history/repeats", response_model=RepeatedTracksResponse)
+def repeated_tracks(request: Request, min_weeks: int = 2, db: Session = Depends(get_db)):
+    """Tracks Discover Weekly recommended in at least ``min_weeks`` weeks, most repeated first."""
+    if min_weeks < 2:
+        raise HTTPException(status_code=422, detail="min_weeks must be at least 2")
+
+    def render(user_id: int) -> dict:
+        repeated = history.repeated_keys(history.load_weeks(db, user_id), min_weeks)
+        names = history.spotify_ids(db, repeated)
+        items = [
+            RepeatedTrackOut(track_id=names[key], weeks=weeks)
+            for key, weeks in sorted(repeated.items(), key=lambda kv: (-len(kv[1]), names[kv[0]]))
+        ]
+        return RepeatedTracksResponse(items=items).model_dump(mode="json")
+
+    return _user_view(request, db, f"playlists.history.repeats:{min_weeks}", render)
+
+
+def _summary(values: list[float]) -> PercentileSummary:
+    ordered = sorted(values)
+    return PercentileSummary(samples=len(ordered), p50=percentile(ordered, 50), p95=percentile(ordered, 95))
+
+
+def summarize_profiles(profiles: list[dict]) -> RunProfileStatsResponse:
+    """p50/p95 per phase (over runs that reached it) and per counter."""
+    phase_values: dict[str, list[float]] = {}
+    for profile in profiles:
+        for name, ms in (profile.get("phases_ms") or {}).items():
+            phase_values.setdefault(name, []).append(float(ms))
+    ordered_names = [p for p in PHASES if p in phase_values] + sorted(set(phase_values) - set(PHASES))
+    return RunProfileStatsResponse(
+        runs=len(profiles),
+        phases_ms={name: _summary(phase_values[name]) for name in ordered_names},
+        counters={name: _summary([float(p.get(name) or 0) for p in profiles]) for name in COUNTERS},
+    )
+
+
+@jobs_router.get("/queues/stats")
+def job_queue_stats(request: Request, db: Session = Depends(get_db)):
+    """Queue depth and recent wait times (p50/p95/max) per sync queue (admins only)."""
+    _admin_user(request, db)
+    from app.workers.scheduling import queue_stats
+
+    return queue_stats()
+
+
+@jobs_router.get("/runs/stats", response_model=RunProfileStatsResponse)
+def run_profile_stats(
+    request: Request, limit: int = 500, status: str | None = None, db: Session = Depends(get_db)
+):
+    """p50/p95 phase timings and call counters across the most recent finished runs (all users; admins only)."""
+    _admin_user(request, db)
+    if limit < 1 or limit > 5000:
+        raise HTTPException(status_code=422, detail="limit must be between 1 and 5000")
+    query = db.query(PlaylistRun.profile_json).filter(PlaylistRun.finished_at.isnot(None))
+    if status:
+        query = query.filter(PlaylistRun.status == status)
+    rows = query.order_by(PlaylistRun.finished_at.desc()).limit(limit).all()
+    return summarize_profiles([row.profile_json for row in rows if row.profile_json])
+
+
+def _latest_run_for_job(db: Session, job_id: str) -> PlaylistRun | None:
+    return (
         db.query(PlaylistRun)
-        .join(PlaylistConfig, PlaylistRun.playlist_config_id == PlaylistConfig.id)
-        .filter(PlaylistConfig.user_id == user.id)
+        .filter(PlaylistRun.job_id == job_id)
         .order_by(PlaylistRun.started_at.desc())
-        .limit(limit)
-        .all()
+        .first()
     )
-    return PlaylistRunListResponse(items=[PlaylistRunOut.model_validate(r) for r in runs])
 
 
 @jobs_router.get("/{job_id}", response_model=JobStatusResponse)
-def job_status(job_id: str):
+def job_status(job_id: str, db: Session = Depends(get_db)):
+    """Job state from the PlaylistRun row (indexed by job_id); the result backend is a fallback
+    for jobs that have not started a run yet or are between retries."""
+    run = _latest_run_for_job(db, job_id)
+    if run is not None and run.status in {"running", "success", "unchanged"}:
+        return JobStatusResponse(
+            job_id=job_id,
+            state="STARTED" if run.status == "running" else "SUCCESS",
+            status=run.status,
+            run_id=run.id,
+            tracks_added_count=run.tracks_added_count,
+        )
+
+    if run is not None and run.status == "deferred":
+        # Spotify was down (circuit open); the task re-queued itself with an ETA.
+        return JobStatusResponse(job_id=job_id, state="RETRY", status="deferred", run_id=run.id)
+
+    from celery.result import AsyncResult
+
+    from app.workers.celery_app import celery_app
+
     res = AsyncResult(job_id, app=celery_app)
     state = res.state or "PENDING"
 
+    if run is not None and state not in {"STARTED", "RETRY"}:
+        # Terminal failure recorded on the run; the backend result may have expired.
+        return JobStatusResponse(job_id=job_id, state="SUCCESS", status=run.status, run_id=run.id)
     if state == "SUCCESS":
         payload = res.result if isinstance(res.result, dict) else {}
         return JobStatusResponse(
@@ -91,4 +290,3 @@ def job_status(job_id: str):
     if state == "FAILURE":
         return JobStatusResponse(job_id=job_id, state=state, status="failed")
     return JobStatusResponse(job_id=job_id, state=state, status="unknown")
-
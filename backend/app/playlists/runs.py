@@ -0,0 +1,141 @@
+"""PlaylistRun lifecycle with few transactions: bulk "running" inserts, one terminal update.
+
+Runs are inserted (and committed) up front so a crashed worker still leaves a "running"
+marker. The terminal state is one UPDATE by primary key, committed together with whatever
+else the caller wrote in the session; no refresh round-trips, callers work with
+``RunRecord`` values instead of ORM rows.
+After each commit the owners' HTTP cache validators are invalidated (``app.api.http_cache``).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.api.http_cache import invalidate_user
+from app.core.tracing import tracer
+from app.db.models import PlaylistRun
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class RunRecord:
+    id: int
+    playlist_config_id: int
+    job_id: str | None = None
+    user_id: int | None = None
+    status: str = "running"
+    tracks_added_count: int | None = None
+    error_message: str | None = None
+    profile: dict[str, Any] | None = None
+    finished_at: datetime | None = None
+
+
+class RunRecorder:
+    """PlaylistRun writes for one session: ``start`` then ``finish`` is two commits in total."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def start_many(
+        self, items: Iterable[tuple[int, str | None]], user_ids: Sequence[int | None] | None = None
+    ) -> list[RunRecord]:
+        """Insert one "running" row per (playlist_config_id, job_id) and commit.
+
+        ``user_ids`` (parallel to ``items``) lets the recorder invalidate the owners' HTTP caches.
+        """
+        now = _utc_now()
+        rows = [
+            {"playlist_config_id": cfg_id, "job_id": job_id, "status": "running", "started_at": now, "updated_at": now}
+            for cfg_id, job_id in items
+        ]
+        if not rows:
+            return []
+        owners = list(user_ids) if user_ids is not None else [None] * len(rows)
+        with tracer.start_as_current_span("db.commit") as span:
+            span.set_attribute("app.operation", "runs.start")
+            span.set_attribute("app.rows", len(rows))
+            ids = self.db.scalars(
+                insert(PlaylistRun).returning(PlaylistRun.id, sort_by_parameter_order=True), rows
+            ).all()
+            self.db.commit()
+        records = [
+            RunRecord(id=run_id, playlist_config_id=row["playlist_config_id"], job_id=row["job_id"], user_id=owner)
+            for run_id, row, owner in zip(ids, rows, owners, strict=True)
+        ]
+        self._invalidate(records)
+        return records
+
+    def start(self, playlist_config_id: int, job_id: str | None = None, user_id: int | None = None) -> RunRecord:
+        return self.start_many([(playlist_config_id, job_id)], [user_id])[0]
+
+    def resume(
+        self, run_id: int, playlist_config_id: int, job_id: str, user_id: int | None = None
+    ) -> RunRecord | None:
+        """Mark an earlier attempt's run of ``job_id`` "running" again and commit.
+
+        None when no such run exists (deleted, or it belongs to another config or job).
+        """
+        with tracer.start_as_current_span("db.commit") as span:
+            span.set_attribute("app.operation", "runs.resume")
+            result = self.db.execute(
+                update(PlaylistRun)
+                .where(
+                    PlaylistRun.id == run_id,
+                    PlaylistRun.job_id == job_id,
+                    PlaylistRun.playlist_config_id == playlist_config_id,
+                )
+                .values(status="running", finished_at=None, error_message=None, updated_at=_utc_now())
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        if result.rowcount != 1:
+            return None
+        record = RunRecord(id=run_id, playlist_config_id=playlist_config_id, job_id=job_id, user_id=user_id)
+        self._invalidate([record])
+        return record
+
+    def finish(
+        self,
+        record: RunRecord,
+        status: str,
+        *,
+        tracks_added: int | None = None,
+        error_message: str | None = None,
+        profile: dict[str, Any] | None = None,
+    ) -> RunRecord:
+        """Write the terminal state and commit (with the rest of the session's pending work)."""
+        record.status = status
+        record.finished_at = _utc_now()
+        record.error_message = error_message
+        record.profile = profile
+        if tracks_added is not None:
+            record.tracks_added_count = tracks_added
+        with tracer.start_as_current_span("db.commit") as span:
+            span.set_attribute("app.operation", "runs.finish")
+            self.db.execute(
+                update(PlaylistRun)
+                .where(PlaylistRun.id == record.id)
+                .values(
+                    status=record.status,
+                    finished_at=record.finished_at,
+                    updated_at=record.finished_at,
+                    tracks_added_count=record.tracks_added_count,
+                    error_message=record.error_message,
+                    profile_json=record.profile,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        self._invalidate([record])
+        return record
+
+    @staticmethod
+    def _invalidate(records: Iterable[RunRecord]) -> None:
+        invalidate_user(r.user_id for r in records if r.user_id is not None)
@@ -2,16 +2,50 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
 import random
-from datetime import datetime, timezone
-from typing import Any, AsyncIterator, Iterable
+import time
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
 
 import httpx
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
-from app.auth.spotify_client import SpotifyAuthError, get_valid_access_token_async
+from app.auth.spotify_client import SpotifyAuthError, get_valid_token_async
 from app.core.config import Settings
-from app.db.models import PlaylistConfig, PlaylistRun, User
+from app.core.metrics import (
+    SPOTIFY_RATE_LIMITED_TOTAL,
+    SPOTIFY_REQUEST_ATTEMPTS,
+    SPOTIFY_REQUEST_SECONDS,
+    SPOTIFY_RETRY_SLEEP_SECONDS_TOTAL,
+    SYNC_PAGES_FETCHED,
+    SYNC_TRACKS_ADDED_TOTAL,
+    endpoint_template,
+)
+from app.core.tracing import tracer
+from app.db.models import PlaylistConfig, User
+from app.playlists.breaker import CircuitBreaker, get_spotify_breaker
+from app.playlists.catalog import record_run_tracks, track_id_from_uri
+from app.playlists.dedup import TrackIdSet, new_track_id_set
+from app.playlists.history import MAX_TRACKS as HISTORY_MAX_TRACKS
+from app.playlists.history import archive_week, week_of
+from app.playlists.journal import (
+    PHASE_DISCOVER,
+    PHASE_SCAN_SOURCE,
+    SyncJournal,
+    delete_journal,
+    load_journal,
+    load_target_ids,
+    reset_target,
+    save_journal,
+)
+from app.playlists.limiter import AdaptiveLimiter, get_spotify_limiter
+from app.playlists.plans import SyncPlan, delete_plan, load_plan, save_plan
+from app.playlists.profile import SyncProfile
+from app.playlists.runs import RunRecord, RunRecorder
 from app.schemas.playlists import SyncDiscoverWeeklyRequest
 
 logger = logging.getLogger(__name__)
@@ -19,10 +53,8 @@ logger = logging.getLogger(__name__)
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
 DISCOVER_WEEKLY_NAME = "Discover Weekly"
 SAVED_WEEKLY_NAME = "Saved Weekly"
-
-
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
+OVERLOAD_STATUS_CODES = (429, 500, 502, 503, 504)
+ADD_BATCH_SIZE = 100  # Spotify's maximum URIs per add-items request
 
 
 class SpotifyApiError(Exception):
@@ -31,10 +63,91 @@ class SpotifyApiError(Exception):
         self.status_code = status_code
 
 
+class CircuitOpenError(SpotifyApiError):
+    """Spotify looks down (circuit breaker open); try again after ``countdown`` seconds."""
+
+    def __init__(self, countdown: float):
+        super().__init__(503, "Spotify unavailable (circuit open)")
+        self.countdown = math.ceil(countdown)
+
+
+class SyncDeadlineExceededError(SpotifyApiError):
+    """The sync's total time budget ran out (or a retry sleep would overrun it)."""
+
+    def __init__(self) -> None:
+        super().__init__(None, "Sync deadline exceeded")
+
+
+class RetryBudgetExhaustedError(SpotifyApiError):
+    """The sync used up its retry budget; carries the status that triggered the last retry."""
+
+    def __init__(self, status_code: int | None):
+        super().__init__(status_code, "Spotify retry budget exhausted")
+
+
+class SyncBudget:
+    """Total time and retry allowance for one sync, shared by all of its Spotify requests.
+
+    Every attempt's timeout and every retry sleep is capped by the remaining time, and each
+    retry (429, 5xx, network error) spends one unit of ``retries``, so a struggling sync stops
+    after a predictable amount of work instead of multiplying retries per request.
+    """
+
+    def __init__(
+        self,
+        seconds: float = math.inf,
+        retries: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self.deadline = clock() + seconds
+        self.retries_left = retries
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - self._clock())
+
+    def check(self) -> None:
+        if self.remaining() <= 0:
+            raise SyncDeadlineExceededError()
+
+    def spend_retry(self, status_code: int | None, sleep_seconds: float) -> None:
+        """Account for a retry about to sleep ``sleep_seconds``; raise if it can't be afforded."""
+        if self.retries_left is not None:
+            if self.retries_left <= 0:
+                raise RetryBudgetExhaustedError(status_code)
+            self.retries_left -= 1
+        if sleep_seconds >= self.remaining():
+            raise SyncDeadlineExceededError()
+
+
+async def check_spotify_available(breaker: CircuitBreaker | None = None) -> None:
+    """Raise ``CircuitOpenError`` while the breaker rejects requests."""
+    breaker = breaker or get_spotify_breaker()
+    retry_after = await breaker.check_async() if breaker is not None else None
+    if retry_after is not None:
+        raise CircuitOpenError(retry_after)
+
+
 class SpotifyApi:
-    def __init__(self, access_token: str, client: httpx.AsyncClient):
+    def __init__(
+        self,
+        access_token: str,
+        client: httpx.AsyncClient,
+        profile: SyncProfile | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        breaker: CircuitBreaker | None = None,
+        budget: SyncBudget | None = None,
+    ):
         self._access_token = access_token
         self._client = client
+        self.profile = profile or SyncProfile()
+        self.budget = budget or SyncBudget()
+        self._limiter = limiter or get_spotify_limiter()
+        self._breaker = breaker or get_spotify_breaker()
+
+    @property
+    def pages_fetched(self) -> int:
+        return self.profile.pages
 
     async def request(
         self,
@@ -46,37 +159,127 @@ class SpotifyApi:
         max_attempts: int = 4,
     ) -> httpx.Response:
         url = path if path.startswith("http") else f"{SPOTIFY_API_BASE}{path}"
+        endpoint = endpoint_template(path)
+        with tracer.start_as_current_span("spotify.request", kind=SpanKind.CLIENT) as span:
+            span.set_attribute("http.request.method", method)
+            span.set_attribute("url.template", endpoint)
+            resp = await self._send_with_retries(
+                method, url, endpoint, params=params, json=json, max_attempts=max_attempts
+            )
+            span.set_attribute("http.response.status_code", resp.status_code)
+            return resp
+
+    async def _send_with_retries(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        *,
+        params: dict[str, Any] | None,
+        json: dict[str, Any] | None,
+        max_attempts: int,
+    ) -> httpx.Response:
         headers = {"Authorization": f"Bearer {self._access_token}"}
+        attempt = 0
 
-        for attempt in range(1, max_attempts + 1):
-            try:
-                resp = await self._client.request(
-                    method,
-                    url,
-                    headers=headers,
-                    params=params,
-                    json=json,
+        try:
+            for attempt in range(1, max_attempts + 1):
+                if attempt > 1:
+                    self.profile.retries += 1
+                self.budget.check()
+                self.profile.api_calls += 1
+                started = time.perf_counter()
+                try:
+                    resp = await self._attempt(method, url, headers=headers, params=params, json=json)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    SPOTIFY_REQUEST_SECONDS.labels(method, endpoint, "network_error").observe(
+                        time.perf_counter() - started
+                    )
+                    self.budget.check()
+                    if attempt == max_attempts:
+                        raise SpotifyApiError(None, "Spotify request failed") from e
+                    await self._retry_sleep(self._backoff_seconds(attempt), "network_error", None)
+                    continue
+
+                SPOTIFY_REQUEST_SECONDS.labels(method, endpoint, str(resp.status_code)).observe(
+                    time.perf_counter() - started
                 )
-            except (httpx.TimeoutException, httpx.NetworkError) as e:
-                if attempt == max_attempts:
-                    raise SpotifyApiError(None, "Spotify request failed") from e
-                await asyncio.sleep(self._backoff_seconds(attempt))
-                continue
-
-            if resp.status_code == 429:
-                retry_after = int(resp.headers.get("Retry-After", "1") or "1")
-                await asyncio.sleep(min(10, max(1, retry_after)))
-                continue
-
-            if resp.status_code in (500, 502, 503, 504):
-                if attempt == max_attempts:
-                    raise SpotifyApiError(resp.status_code, "Spotify server error")
-                await asyncio.sleep(self._backoff_seconds(attempt))
-                continue
+                self.profile.bytes += len(resp.content)
+
+                if resp.status_code == 429:
+                    SPOTIFY_RATE_LIMITED_TOTAL.labels(endpoint).inc()
+                    if attempt == max_attempts:
+                        raise SpotifyApiError(429, "Spotify rate limit")
+                    retry_after = int(resp.headers.get("Retry-After", "1") or "1")
+                    await self._retry_sleep(min(10, max(1, retry_after)), "rate_limited", 429)
+                    continue
 
-            return resp
+                if resp.status_code in (500, 502, 503, 504):
+                    if attempt == max_attempts:
+                        raise SpotifyApiError(resp.status_code, "Spotify server error")
+                    await self._retry_sleep(self._backoff_seconds(attempt), "server_error", resp.status_code)
+                    continue
 
-        raise SpotifyApiError(None, "Spotify request failed")
+                return resp
+
+            raise SpotifyApiError(None, "Spotify request failed")
+        finally:
+            SPOTIFY_REQUEST_ATTEMPTS.labels(method, endpoint).observe(attempt)
+            trace.get_current_span().set_attribute("app.attempts", attempt)
+
+    async def _attempt(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: dict[str, str],
+        params: dict[str, Any] | None,
+        json: dict[str, Any] | None,
+    ) -> httpx.Response:
+        """One HTTP attempt: breaker check, then an adaptive-limiter slot."""
+        if self._breaker is not None:
+            retry_after = await self._breaker.check_async()
+            if retry_after is not None:
+                raise CircuitOpenError(retry_after)
+        await self._limiter.acquire()
+        started = time.perf_counter()
+        overloaded: bool | None = None
+        outage: bool | None = None  # 429 is throttling: a limiter signal, not counted by the breaker
+        try:
+            resp = await self._client.request(
+                method, url, headers=headers, params=params, json=json, timeout=self._attempt_timeout()
+            )
+            overloaded = resp.status_code in OVERLOAD_STATUS_CODES
+            if resp.status_code != 429:
+                outage = overloaded
+            return resp
+        except (httpx.TimeoutException, httpx.NetworkError):
+            overloaded = outage = True
+            raise
+        finally:
+            self._limiter.release(time.perf_counter() - started, overloaded)
+            if self._breaker is not None and outage is not None:
+                await self._breaker.record_async(outage)
+
+    def _attempt_timeout(self) -> Any:
+        """Client timeouts, shortened so a single attempt can't outlive the sync deadline."""
+        remaining = self.budget.remaining()
+        read = self._client.timeout.read
+        if read is not None and remaining >= read:
+            return httpx.USE_CLIENT_DEFAULT
+        return httpx.Timeout(remaining)
+
+    async def _retry_sleep(self, seconds: float, reason: str, status_code: int | None) -> None:
+        self.budget.spend_retry(status_code, seconds)
+        await self._sleep(seconds, reason)
+
+    async def _sleep(self, seconds: float, reason: str) -> None:
+        self.profile.sleep_seconds += seconds
+        SPOTIFY_RETRY_SLEEP_SECONDS_TOTAL.labels(reason).inc(seconds)
+        with tracer.start_as_current_span("spotify.retry_sleep") as span:
+            span.set_attribute("app.retry_reason", reason)
+            span.set_attribute("app.sleep_seconds", seconds)
+            await asyncio.sleep(seconds)
 
     @staticmethod
     def _backoff_seconds(attempt: int) -> float:
@@ -92,6 +295,7 @@ class SpotifyApi:
             resp = await self.request("GET", "/me/playlists", params={"limit": limit, "offset": offset})
             if resp.status_code != 200:
                 raise SpotifyApiError(resp.status_code, "Failed to list playlists")
+            self.profile.pages += 1
             data = resp.json()
             items = data.get("items") or []
             for p in items:
@@ -101,15 +305,28 @@ class SpotifyApi:
             offset += limit
         raise SpotifyApiError(None, "Paging guard tripped for playlists")
 
+    async def get_snapshot_id(self, playlist_id: str) -> str | None:
+        """Current ``snapshot_id`` of a playlist (one small response); None if it can't be read."""
+        resp = await self.request("GET", f"/playlists/{playlist_id}", params={"fields": "snapshot_id"})
+        if resp.status_code != 200:
+            return None
+        return resp.json().get("snapshot_id")
+
     async def create_playlist(self, name: str) -> dict[str, Any]:
         resp = await self.request("POST", "/me/playlists", json={"name": name, "public": False})
         if resp.status_code not in (200, 201):
             raise SpotifyApiError(resp.status_code, "Failed to create playlist")
         return resp.json()
 
-    async def iter_playlist_track_items(self, playlist_id: str) -> AsyncIterator[dict[str, Any]]:
+    async def iter_playlist_track_items(self, playlist_id: str, offset: int = 0) -> AsyncIterator[dict[str, Any]]:
+        async for items in self.iter_playlist_track_pages(playlist_id, offset):
+            for it in items:
+                yield it
+
+    async def iter_playlist_track_pages(
+        self, playlist_id: str, offset: int = 0
+    ) -> AsyncIterator[list[dict[str, Any]]]:
         limit = 50
-        offset = 0
         max_pages = 5000
         fields = "items(track(id,uri,is_local)),next,offset,limit,total"
 
@@ -121,20 +338,32 @@ class SpotifyApi:
             )
             if resp.status_code != 200:
                 raise SpotifyApiError(resp.status_code, "Failed to list playlist items")
+            self.profile.pages += 1
             data = resp.json()
             items = data.get("items") or []
-            for it in items:
-                yield it
+            if items:
+                yield items
             if not data.get("next"):
                 return
             offset += limit
         raise SpotifyApiError(None, "Paging guard tripped for playlist items")
 
     async def add_tracks(self, playlist_id: str, uris: list[str]) -> None:
-        for chunk in _chunks(uris, 100):
+        for index, chunk in enumerate(_chunks(uris, ADD_BATCH_SIZE)):
+            await self.add_tracks_chunk(playlist_id, chunk, index)
+
+    async def add_tracks_chunk(self, playlist_id: str, chunk: list[str], index: int = 0) -> str | None:
+        """POST one batch (<= 100 URIs); returns the playlist's new ``snapshot_id``."""
+        with tracer.start_as_current_span("spotify.add_tracks.chunk") as span:
+            span.set_attribute("app.chunk_index", index)
+            span.set_attribute("app.chunk_size", len(chunk))
             resp = await self.request("POST", f"/playlists/{playlist_id}/tracks", json={"uris": chunk})
             if resp.status_code not in (200, 201):
                 raise SpotifyApiError(resp.status_code, "Failed to add tracks")
+            try:
+                return resp.json().get("snapshot_id")
+            except ValueError:
+                return None
 
 
 def _chunks(items: list[str], size: int) -> Iterable[list[str]]:
@@ -147,6 +376,140 @@ def _truncate_error(msg: str, limit: int = 800) -> str:
     return msg if len(msg) <= limit else msg[: limit - 3] + "..."
 
 
+def _playable(item: dict[str, Any]) -> tuple[str, str] | None:
+    """(track id, URI) of a source item that can be added; None for local or incomplete items."""
+    track = item.get("track") or {}
+    if track.get("is_local") is True:
+        return None
+    tid = track.get("id")
+    uri = track.get("uri")
+    return (tid, uri) if tid and uri else None
+
+
+def _collect_id(item: dict[str, Any], ids: list[str]) -> None:
+    # One past the archive limit is enough to know the source won't be archived.
+    tid = (item.get("track") or {}).get("id")
+    if tid and len(ids) <= HISTORY_MAX_TRACKS:
+        ids.append(tid)
+
+
+async def _scan_track_ids(api: SpotifyApi, profile: SyncProfile, playlist_id: str, into: TrackIdSet) -> None:
+    with profile.phase("scan_target"):
+        async for items in api.iter_playlist_track_pages(playlist_id):
+            await into.add_new_async([tid for item in items if (tid := (item.get("track") or {}).get("id"))])
+
+
+async def _new_source_tracks(
+    api: SpotifyApi,
+    playlist_id: str,
+    known_ids: TrackIdSet,
+    *,
+    offset: int = 0,
+    source_ids: list[str] | None = None,
+) -> AsyncIterator[tuple[str, str] | None]:
+    """One entry per source item from ``offset``: (track id, URI) if new, else None.
+
+    New tracks join ``known_ids``, which starts as the target's tracks, so the source is
+    also deduped against itself. Lookups are made per page (``TrackIdSet.add_new_async``),
+    so a spilled set costs one SQLite call per page, off the event loop. ``source_ids``,
+    when given, collects the ID of every item (for the weekly archive).
+    """
+    async for items in api.iter_playlist_track_pages(playlist_id, offset):
+        picked = [_playable(item) for item in items]
+        new = await known_ids.add_new_async([p[0] for p in picked if p is not None])
+        for item, pick in zip(items, picked, strict=True):
+            if source_ids is not None:
+                _collect_id(item, source_ids)
+            if pick is not None and pick[0] in new:
+                new.discard(pick[0])  # repeated within the page: only the first is new
+                yield pick
+            else:
+                yield None
+
+
+# Called after each added batch with (next source index, its track IDs, new target snapshot_id).
+CommitHook = Callable[[int, list[str], "str | None"], Awaitable[None]]
+# (week start, source snapshot_id, source track IDs) for ``archive_week``.
+WeekArchive = tuple[date, "str | None", list[str]]
+
+
+async def _stream_new_tracks(
+    api: SpotifyApi,
+    profile: SyncProfile,
+    source_id: str,
+    target_id: str,
+    known_ids: TrackIdSet,
+    cap: int,
+    *,
+    queue_batches: int,
+    overlap: bool = True,
+    start_index: int = 0,
+    on_commit: CommitHook | None = None,
+    source_ids: list[str] | None = None,
+) -> int:
+    """Scan the source from ``start_index`` and add tracks not in ``known_ids``; returns tracks added.
+
+    The scanner dedups items as pages arrive and hands full batches to the poster through a
+    queue of ``queue_batches`` batches. When the poster falls behind, the scanner blocks on
+    the queue, so memory stays at a few batches plus one page however long the source is.
+    Batches are posted in source order by a single poster. With ``overlap=False`` the scan
+    finishes before the first POST (unbounded queue). ``source_ids``, when given, collects
+    the ID of every source track scanned (for the weekly archive).
+    """
+    batches: asyncio.Queue[tuple[list[str], list[str], int] | None] = asyncio.Queue(
+        maxsize=queue_batches if overlap else 0
+    )
+    added = 0
+
+    async def scan() -> None:
+        nonlocal added
+        uris: list[str] = []
+        tids: list[str] = []
+        index = start_index
+        with profile.phase("scan_source"):
+            async for picked in _new_source_tracks(
+                api, source_id, known_ids, offset=start_index, source_ids=source_ids
+            ):
+                index += 1
+                if picked is None:
+                    continue
+                tids.append(picked[0])
+                uris.append(picked[1])
+                added += 1
+                if len(uris) == ADD_BATCH_SIZE:
+                    await batches.put((uris, tids, index))
+                    uris, tids = [], []
+                if added >= cap:
+                    break
+        if uris:
+            await batches.put((uris, tids, index))
+        await batches.put(None)
+
+    async def post() -> None:
+        chunk_index = 0
+        while (batch := await batches.get()) is not None:
+            uris, tids, next_index = batch
+            with profile.phase("add_tracks"):
+                snapshot_id = await api.add_tracks_chunk(target_id, uris, chunk_index)
+            if on_commit is not None:
+                await on_commit(next_index, tids, snapshot_id)
+            chunk_index += 1
+
+    if not overlap:
+        await scan()
+        await post()
+        return added
+    stages = [asyncio.create_task(scan()), asyncio.create_task(post())]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        # One stage failed (or we were cancelled): stop the other, which may be blocked on the queue.
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+    return added
+
+
 def _get_or_create_discover_weekly_config(db: Session, user_id: int) -> PlaylistConfig:
     cfg = (
         db.query(PlaylistConfig)
@@ -168,113 +531,295 @@ def _get_or_create_discover_weekly_config(db: Session, user_id: int) -> Playlist
     return cfg
 
 
-def _start_run(db: Session, playlist_config_id: int) -> PlaylistRun:
-    run = PlaylistRun(playlist_config_id=playlist_config_id, status="running")
-    db.add(run)
-    db.commit()
-    db.refresh(run)
-    return run
-
-
-def _finish_run_success(db: Session, run: PlaylistRun, tracks_added: int) -> PlaylistRun:
-    run.status = "success"
-    run.tracks_added_count = tracks_added
-    run.finished_at = _utc_now()
-    run.error_message = None
-    db.commit()
-    db.refresh(run)
-    return run
-
-
-def _finish_run_error(db: Session, run: PlaylistRun, message: str, status: str = "error") -> PlaylistRun:
-    run.status = status
-    run.finished_at = _utc_now()
-    run.error_message = _truncate_error(message)
-    db.commit()
-    db.refresh(run)
-    return run
-
-
 async def sync_discover_weekly(
     db: Session,
     settings: Settings,
     user: User,
     req: SyncDiscoverWeeklyRequest,
-) -> tuple[PlaylistConfig, PlaylistRun, int]:
-    cfg = _get_or_create_discover_weekly_config(db, user.id)
-    run = _start_run(db, cfg.id)
-
-    access_token = await get_valid_access_token_async(db, user.id, settings)
-    if not access_token:
-        _finish_run_error(db, run, "Not authenticated with Spotify", status="unauthorized")
+    job_id: str | None = None,
+) -> tuple[PlaylistConfig, RunRecord, int]:
+    """Sync Discover Weekly into Saved Weekly.
+
+    When the source's ``snapshot_id`` still matches the one recorded by the last complete
+    sync, the run ends after that single check with status ``unchanged``. A dry run saves
+    its diff as a plan (``app.playlists.plans``); ``req.plan_id`` applies it without
+    re-reading either playlist as long as the target's snapshot hasn't moved.
+
+    A real sync with a ``job_id`` journals its progress (``app.playlists.journal``); when
+    the task is retried it resumes the same run from the last added batch (or from playlist
+    discovery when the first attempt failed before reaching it).
+
+    Commits twice: the "running" marker and the final state.
+    """
+    # From the identity key: no query even when an earlier commit expired ``user``.
+    user_id = inspect(user).identity[0]
+    recorder = RunRecorder(db)
+    journal_ttl = settings.sync_journal_ttl_seconds
+    journaled = bool(job_id) and not req.dry_run and journal_ttl > 0
+
+    def begin() -> tuple[PlaylistConfig, str, str | None, RunRecord, SyncJournal | None]:
+        cfg = _get_or_create_discover_weekly_config(db, user_id)
+        # Read before the commit expires them; the loop never touches ORM state after that.
+        last_source = cfg.source_playlist_id, cfg.source_snapshot_id
+        journal = load_journal(job_id) if journaled else None
+        run = recorder.resume(journal.run_id, cfg.id, job_id, user_id) if journal is not None else None
+        if run is None:
+            run = recorder.start(cfg.id, job_id, user_id)
+            journal = None
+            if journaled:
+                # Before any Spotify call: a retry after an early failure reuses this run.
+                journal = SyncJournal(run.id, phase=PHASE_DISCOVER)
+                save_journal(job_id, journal, (), journal_ttl)
+        return cfg, *last_source, run, journal
+
+    # DB and Redis work runs in threads, one step at a time, and every step ends its transaction:
+    # the event loop never blocks on I/O and no pooled connection is held across Spotify calls.
+    cfg, last_source_id, last_source_snapshot, run, journal = await asyncio.to_thread(begin)
+
+    profile = SyncProfile()
+    budget = SyncBudget(settings.sync_deadline_seconds, settings.sync_retry_budget)
+    # Spotify IDs this attempt added; stored as playlist_run_tracks with the final state.
+    added_track_ids: list[str] = []
+    # Config changes, committed together with the run's final state.
+    cfg_updates: dict[str, Any] = {}
+
+    def write_final(
+        status: str, tracks_added: int | None, error: str | None, archive: WeekArchive | None
+    ) -> None:
+        for name, value in cfg_updates.items():
+            setattr(cfg, name, value)
+        if archive is not None:
+            archive_week(db, user_id, *archive)
+        if added_track_ids:
+            record_run_tracks(db, run.id, added_track_ids)
+        recorder.finish(
+            run,
+            status,
+            tracks_added=tracks_added,
+            error_message=_truncate_error(error) if error else None,
+            profile=profile.as_dict(),
+        )
+
+    async def finish(
+        status: str,
+        *,
+        tracks_added: int | None = None,
+        error: str | None = None,
+        archive: WeekArchive | None = None,
+    ) -> None:
+        if run.status == "running":
+            await asyncio.to_thread(write_final, status, tracks_added, error, archive)
+
+    with profile.phase("access_token"):
+        token = await get_valid_token_async(db, user_id, settings)
+    if not token:
+        await finish("unauthorized", error="Not authenticated with Spotify")
         raise SpotifyAuthError("Missing token")
+    access_token, spotify_app = token
 
     timeout = httpx.Timeout(10.0, connect=5.0)
     async with httpx.AsyncClient(timeout=timeout) as client:
-        api = SpotifyApi(access_token, client)
+        # Requests count against the user's Spotify app (its own rate limit).
+        api = SpotifyApi(
+            access_token,
+            client,
+            profile,
+            limiter=get_spotify_limiter(spotify_app.name),
+            budget=budget,
+        )
+        # Target tracks plus every source track picked so far; spills to disk when large.
+        known_ids = new_track_id_set()
 
         try:
-            discover_id = None
-            saved_id = None
-            async for p in api.iter_my_playlists():
-                name = (p.get("name") or "").strip()
-                pid = p.get("id")
-                if not pid:
-                    continue
-                if name == DISCOVER_WEEKLY_NAME:
-                    discover_id = pid
-                elif name == SAVED_WEEKLY_NAME:
-                    saved_id = pid
-                if discover_id and saved_id:
-                    break
-
-            if not discover_id:
-                _finish_run_error(db, run, "Discover Weekly playlist not found", status="not_found")
-                raise SpotifyApiError(404, "Discover Weekly not found")
+            if journal is not None and journal.phase != PHASE_DISCOVER:
+                discover_id, saved_id = journal.source_playlist_id, journal.target_playlist_id
+                discover_snapshot = journal.source_snapshot_id
+                cfg_updates.update(source_playlist_id=discover_id, target_playlist_id=saved_id)
+                with profile.phase("check_snapshot"):
+                    target_snapshot = await api.get_snapshot_id(saved_id)
+                stale = (
+                    journal.phase != PHASE_SCAN_SOURCE
+                    or target_snapshot is None
+                    or target_snapshot != journal.target_snapshot_id
+                )
+                if stale or not await asyncio.to_thread(load_target_ids, job_id, known_ids):
+                    # Target scan never finished, or someone else (or a lost add response) changed it.
+                    known_ids.clear()
+                    await asyncio.to_thread(reset_target, job_id)
+                    await _scan_track_ids(api, profile, saved_id, known_ids)
+                    journal.target_snapshot_id = target_snapshot
+                    journal.phase = PHASE_SCAN_SOURCE
+                    await asyncio.to_thread(save_journal, job_id, journal, known_ids, journal_ttl)
+                logger.info(
+                    "Resuming sync run %s at source item %s (%s tracks added)",
+                    run.id,
+                    journal.source_index,
+                    journal.added,
+                )
+            else:
+                plan = await asyncio.to_thread(load_plan, req.plan_id, user_id) if req.plan_id else None
+                if plan is not None and plan.target_snapshot_id:
+                    with profile.phase("check_snapshot"):
+                        target_snapshot = await api.get_snapshot_id(plan.target_playlist_id)
+                    if target_snapshot == plan.target_snapshot_id:
+                        if plan.uris:
+                            with profile.phase("add_tracks") as span:
+                                span.set_attribute("app.tracks", len(plan.uris))
+                                await api.add_tracks(plan.target_playlist_id, plan.uris)
+                            added_track_ids.extend(filter(None, map(track_id_from_uri, plan.uris)))
+                        cfg_updates.update(
+                            source_playlist_id=plan.source_playlist_id, target_playlist_id=plan.target_playlist_id
+                        )
+                        archive = None
+                        if plan.complete and plan.source_track_ids is not None:
+                            # Same as a complete full sync: record the snapshot and archive the week.
+                            cfg_updates["source_snapshot_id"] = plan.source_snapshot_id
+                            archive = (
+                                week_of(datetime.now(timezone.utc)),
+                                plan.source_snapshot_id,
+                                plan.source_track_ids,
+                            )
+                        await finish("success", tracks_added=len(plan.uris), archive=archive)
+                        await asyncio.to_thread(delete_plan, req.plan_id)
+                        if journal is not None:
+                            await asyncio.to_thread(delete_journal, job_id)
+                        SYNC_TRACKS_ADDED_TOTAL.inc(len(plan.uris))
+                        return cfg, run, len(plan.uris)
+                    logger.info("Sync plan %s is stale (target changed); running a full sync", req.plan_id)
+
+                if last_source_id and last_source_snapshot:
+                    with profile.phase("check_snapshot"):
+                        current_snapshot = await api.get_snapshot_id(last_source_id)
+                    if current_snapshot == last_source_snapshot:
+                        await finish("unchanged", tracks_added=0)
+                        if journal is not None:
+                            await asyncio.to_thread(delete_journal, job_id)
+                        return cfg, run, 0
+
+                discover_id = None
+                discover_snapshot = None
+                saved_id = None
+                saved_snapshot = None
+                with profile.phase("find_playlists"):
+                    async for p in api.iter_my_playlists():
+                        name = (p.get("name") or "").strip()
+                        pid = p.get("id")
+                        if not pid:
+                            continue
+                        if name == DISCOVER_WEEKLY_NAME:
+                            discover_id = pid
+                            discover_snapshot = p.get("snapshot_id")
+                        elif name == SAVED_WEEKLY_NAME:
+                            saved_id = pid
+                            saved_snapshot = p.get("snapshot_id")
+                        if discover_id and saved_id:
+                            break
+
+                if not discover_id:
+                    await finish("not_found", error="Discover Weekly playlist not found")
+                    raise SpotifyApiError(404, "Discover Weekly not found")
 
-            if not saved_id:
-                created = await api.create_playlist(SAVED_WEEKLY_NAME)
-                saved_id = created.get("id")
                 if not saved_id:
-                    raise SpotifyApiError(None, "Created playlist missing id")
-
-            cfg.source_playlist_id = discover_id
-            cfg.target_playlist_id = saved_id
-            db.commit()
+                    with profile.phase("create_playlist"):
+                        created = await api.create_playlist(SAVED_WEEKLY_NAME)
+                    saved_id = created.get("id")
+                    saved_snapshot = created.get("snapshot_id")
+                    if not saved_id:
+                        raise SpotifyApiError(None, "Created playlist missing id")
+
+                cfg_updates.update(source_playlist_id=discover_id, target_playlist_id=saved_id)
+
+                if journal is not None:
+                    # From here on a retry skips discovery (and never creates a second playlist).
+                    journal = SyncJournal(run.id, discover_id, discover_snapshot, saved_id, saved_snapshot)
+                    await asyncio.to_thread(save_journal, job_id, journal, (), journal_ttl)
+                await _scan_track_ids(api, profile, saved_id, known_ids)
+                if journal is not None:
+                    journal.phase = PHASE_SCAN_SOURCE
+                    await asyncio.to_thread(save_journal, job_id, journal, known_ids, journal_ttl)
 
-            existing_target_ids: set[str] = set()
-            async for item in api.iter_playlist_track_items(saved_id):
-                track = item.get("track") or {}
-                tid = track.get("id")
-                if tid:
-                    existing_target_ids.add(tid)
-
-            to_add_uris: list[str] = []
-            seen_ids: set[str] = set()
             added_cap = req.max_tracks or 10_000
-
-            async for item in api.iter_playlist_track_items(discover_id):
-                track = item.get("track") or {}
-                if track.get("is_local") is True:
-                    continue
-                tid = track.get("id")
-                uri = track.get("uri")
-                if not tid or not uri:
-                    continue
-                if tid in existing_target_ids or tid in seen_ids:
-                    continue
-                seen_ids.add(tid)
-                to_add_uris.append(uri)
-                if len(to_add_uris) >= added_cap:
-                    break
-
-            if not req.dry_run and to_add_uris:
-                await api.add_tracks(saved_id, to_add_uris)
-
-            _finish_run_success(db, run, tracks_added=len(to_add_uris))
-            return cfg, run, len(to_add_uris)
-
+            to_add_uris: list[str] = []
+            source_ids: list[str] | None = None
+
+            if req.dry_run:
+                source_ids = []
+                with profile.phase("scan_source"):
+                    async for picked in _new_source_tracks(api, discover_id, known_ids, source_ids=source_ids):
+                        if picked is None:
+                            continue
+                        to_add_uris.append(picked[1])
+                        if len(to_add_uris) >= added_cap:
+                            break
+                added = len(to_add_uris)
+            else:
+
+                async def on_commit(next_index: int, track_ids: list[str], snapshot_id: str | None) -> None:
+                    added_track_ids.extend(track_ids)
+                    if journal is not None:
+                        journal.source_index = next_index
+                        journal.added += len(track_ids)
+                        journal.target_snapshot_id = snapshot_id
+                        await asyncio.to_thread(save_journal, job_id, journal, track_ids, journal_ttl)
+
+                added = journal.added if journal is not None else 0
+                start_index = journal.source_index if journal is not None else 0
+                # For the weekly archive; a resumed scan misses earlier items, so it re-reads them.
+                source_ids = [] if start_index == 0 else None
+                if added < added_cap:
+                    added += await _stream_new_tracks(
+                        api,
+                        profile,
+                        discover_id,
+                        saved_id,
+                        known_ids,
+                        added_cap - added,
+                        queue_batches=settings.sync_pipeline_queue_batches,
+                        overlap=settings.sync_pipeline_enabled,
+                        start_index=start_index,
+                        on_commit=on_commit,
+                        source_ids=source_ids,
+                    )
+
+            complete = added < added_cap
+            archive = None
+            if req.dry_run:
+                plan = SyncPlan(
+                    user_id=user_id,
+                    source_playlist_id=discover_id,
+                    source_snapshot_id=discover_snapshot,
+                    target_playlist_id=saved_id,
+                    target_snapshot_id=saved_snapshot,
+                    uris=to_add_uris,
+                    complete=complete,
+                    source_track_ids=source_ids if complete else None,
+                )
+                await asyncio.to_thread(save_plan, run.id, plan, settings.sync_plan_ttl_seconds)
+            elif complete:
+                # Only a complete real sync makes the next one with the same snapshot a no-op.
+                cfg_updates["source_snapshot_id"] = discover_snapshot
+                if source_ids is None:
+                    source_ids = []
+                    with profile.phase("scan_source"):
+                        async for item in api.iter_playlist_track_items(discover_id):
+                            _collect_id(item, source_ids)
+                archive = week_of(datetime.now(timezone.utc)), discover_snapshot, source_ids
+            await finish("success", tracks_added=added, archive=archive)
+            if journaled:
+                await asyncio.to_thread(delete_journal, job_id)
+            if not req.dry_run:
+                SYNC_TRACKS_ADDED_TOTAL.inc(added)
+            return cfg, run, added
+
+        except CircuitOpenError as e:
+            await finish("deferred", error=str(e))
+            raise
+        except SyncDeadlineExceededError as e:
+            await finish("timeout", error=str(e))
+            raise
         except SpotifyApiError as e:
-            _finish_run_error(db, run, str(e))
+            await finish("error", error=str(e))
             raise
-
+        finally:
+            known_ids.clear()
+            SYNC_PAGES_FETCHED.observe(profile.pages)
@@ -1,19 +1,36 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class SyncDiscoverWeeklyRequest(BaseModel):
     dry_run: bool = Field(default=False)
     max_tracks: int | None = Field(default=None, ge=1, le=500)
+    # run_id of an earlier dry run: apply its saved diff instead of recomputing it.
+    plan_id: int | None = Field(default=None, ge=1)
+
+    @model_validator(mode="after")
+    def _plan_is_not_dry(self) -> "SyncDiscoverWeeklyRequest":
+        if self.dry_run and self.plan_id is not None:
+            raise ValueError("plan_id applies a dry run; it cannot be combined with dry_run")
+        return self
 
 
 class JobEnqueueResponse(BaseModel):
     job_id: str
 
 
+class SyncProfileOut(BaseModel):
+    phases_ms: dict[str, float] = Field(default_factory=dict)
+    pages: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    sleep_seconds: float = 0.0
+    bytes: int = 0
+
+
 class PlaylistRunOut(BaseModel):
     model_config = {"from_attributes": True}
 
@@ -24,12 +41,25 @@ class PlaylistRunOut(BaseModel):
     finished_at: datetime | None
     tracks_added_count: int | None
     error_message: str | None
+    profile: SyncProfileOut | None = Field(default=None, validation_alias="profile_json")
 
 
 class PlaylistRunListResponse(BaseModel):
     items: list[PlaylistRunOut]
 
 
+class PercentileSummary(BaseModel):
+    samples: int
+    p50: float | None
+    p95: float | None
+
+
+class RunProfileStatsResponse(BaseModel):
+    runs: int
+    phases_ms: dict[str, PercentileSummary]
+    counters: dict[str, PercentileSummary]
+
+
 class JobStatusResponse(BaseModel):
     job_id: str
     state: str
@@ -37,3 +67,35 @@ class JobStatusResponse(BaseModel):
     run_id: int | None = None
     tracks_added_count: int | None = None
 
+
+class HistoryWeekOut(BaseModel):
+    week_start: date
+    source_snapshot_id: str | None
+    track_ids: list[str]
+
+
+class HistoryWeeksResponse(BaseModel):
+    items: list[HistoryWeekOut]
+
+
+class TrackHistoryResponse(BaseModel):
+    track_id: str
+    weeks: list[date]
+
+
+class WeekOverlapResponse(BaseModel):
+    week_a: date
+    week_b: date
+    common_track_ids: list[str]
+    only_a: int
+    only_b: int
+    jaccard: float
+
+
+class RepeatedTrackOut(BaseModel):
+    track_id: str
+    weeks: list[date]
+
+
+class RepeatedTracksResponse(BaseModel):
+    items: list[RepeatedTrackOut]
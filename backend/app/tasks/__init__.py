@@ -1 +0,0 @@
-# Celery tasks
@@ -0,0 +1,347 @@
+"""Asyncio worker: consumes the Celery queue and runs many syncs concurrently in one process.
+
+Alternative to ``celery worker`` (prefork) for the I/O-bound sync tasks. Same broker,
+queue and task names, so both can be deployed side by side:
+
+    python -m app.workers.aio_worker
+
+Semantics kept from the Celery setup:
+- acks late: a message is acked only after its task finished (or was re-published for retry);
+  unacked messages are restored by the Redis transport if the process dies.
+- retries: same decision and countdown as ``sync_discover_weekly_task``
+  (``should_retry`` / ``retry_countdown``); the retry is re-published with ``retries + 1``.
+- deferrals: a ``UserBusyError`` sync (per-user limit) or ``CircuitOpenError`` (Spotify down) is
+  re-published after its countdown without spending a retry, like the Celery task.
+- ETA/countdown: the message is held (unacked) until due; like Celery, the prefetch count is
+  raised by one while it waits so held messages never take the ``concurrency`` slots that
+  ready messages need.
+- results: stored in the Celery result backend, so ``/jobs/{job_id}`` works unchanged.
+- SIGTERM/SIGINT: stop consuming, let in-flight syncs finish within the drain timeout,
+  then requeue whatever is left.
+
+Syncs make their DB and Redis calls in threads (``asyncio.to_thread``) and end each DB
+transaction before going back to Spotify, so a sync holds a pooled connection only for
+those short steps and concurrency is not tied to the pool size. The loop's default
+executor gets ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` threads: blocking steps queue for a
+thread instead of blocking inside one while they wait for a connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from celery import Celery
+from kombu import Consumer
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.core.config import Settings, get_settings
+from app.core.logging import configure_logging
+from app.core.metrics import start_worker_exporter
+from app.core.tracing import configure_tracing, extract_context, trace_headers, tracer
+from app.workers.celery_app import celery_app
+from app.workers.tasks import (
+    DEFERRABLE_ERRORS,
+    SYNC_DISCOVER_WEEKLY_TASK,
+    note_queue_wait,
+    retry_countdown,
+    run_discover_weekly_sync,
+    should_retry,
+    sync_discover_weekly_task,
+)
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[..., Awaitable[dict[str, Any]]]
+
+TASK_HANDLERS: dict[str, TaskHandler] = {
+    SYNC_DISCOVER_WEEKLY_TASK: run_discover_weekly_sync,
+}
+
+# Celery task objects used to re-publish retries with identical routing/serialization.
+TASK_SIGNATURES = {
+    SYNC_DISCOVER_WEEKLY_TASK: sync_discover_weekly_task,
+}
+
+DRAIN_POLL_SECONDS = 0.5
+
+
+def parse_task_message(body: Any, headers: dict[str, Any] | None) -> tuple[str | None, str | None, dict[str, Any], int, datetime | None]:
+    """Extract (task name, task id, kwargs, retries, eta) from a Celery protocol 2 message."""
+    headers = headers or {}
+    kwargs: dict[str, Any] = {}
+    if isinstance(body, list | tuple) and len(body) >= 2 and isinstance(body[1], dict):
+        kwargs = dict(body[1])
+    eta = None
+    raw_eta = headers.get("eta")
+    if raw_eta:
+        try:
+            eta = datetime.fromisoformat(str(raw_eta))
+        except ValueError:
+            eta = None
+        if eta is not None and eta.tzinfo is None:
+            eta = eta.replace(tzinfo=timezone.utc)
+    retries = int(headers.get("retries") or 0)
+    return headers.get("task"), headers.get("id"), kwargs, retries, eta
+
+
+def blocking_threads(settings: Settings) -> int:
+    """Threads for the syncs' blocking DB/Redis steps: one per pooled DB connection."""
+    return max(1, settings.db_pool_size + settings.db_max_overflow)
+
+
+class AsyncioWorker:
+    """Single-process consumer with bounded concurrency.
+
+    kombu channels are not thread-safe, so every broker operation (drain, ack, requeue)
+    runs on one dedicated I/O thread; task bodies run on the event loop.
+    """
+
+    def __init__(
+        self,
+        app: Celery,
+        *,
+        queue_name: str,
+        concurrency: int,
+        drain_timeout: float,
+        handlers: dict[str, TaskHandler] | None = None,
+        blocking_threads: int | None = None,
+    ):
+        self.app = app
+        self.queue_name = queue_name
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self.handlers = handlers if handlers is not None else TASK_HANDLERS
+        self.blocking_threads = blocking_threads
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aio-worker-io")
+        self._sem = asyncio.Semaphore(concurrency)
+        self._inflight: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._consumer: Consumer | None = None
+        # Messages held until their ETA; each raises the prefetch count by one.
+        self._eta_waiting = 0
+
+    def request_stop(self) -> None:
+        if not self._stopping.is_set():
+            logger.info("Shutdown requested; draining %d in-flight task(s)", len(self._inflight))
+            self._stopping.set()
+
+    async def _io_call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        assert self._loop is not None
+        return await self._loop.run_in_executor(self._io, fn, *args)
+
+    def _on_message(self, body: Any, message: Any) -> None:
+        # Called on the I/O thread from drain_events; hand off to the event loop.
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(self._dispatch, body, message)
+
+    def _dispatch(self, body: Any, message: Any) -> None:
+        task = asyncio.create_task(self._handle(body, message))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _handle(self, body: Any, message: Any) -> None:
+        try:
+            await self._process(body, message)
+        except asyncio.CancelledError:
+            # Cancelled during shutdown drain: hand the message back to the broker.
+            await self._io_call(message.requeue)
+            raise
+        except Exception:
+            # Never leave a message unsettled (or the task's exception unretrieved).
+            logger.exception("Failed handling a task message; requeueing it")
+            await self._settle(message, "requeue")
+
+    async def _settle(self, message: Any, action: str) -> None:
+        """Ack or requeue; a broker error is logged (unacked messages are redelivered anyway)."""
+        try:
+            await self._io_call(getattr(message, action))
+        except Exception:
+            logger.exception("Could not %s task message", action)
+
+    async def _retry_later(self, message: Any, *republish_args: Any) -> bool:
+        """Re-publish for a later attempt; if that fails, requeue ``message`` instead and return False."""
+        try:
+            await asyncio.to_thread(self._republish, *republish_args)
+        except Exception:
+            logger.exception("Could not re-publish task %s; requeueing the message", republish_args[1])
+            await self._settle(message, "requeue")
+            return False
+        return True
+
+    async def _wait_for_eta(self, delay: float) -> None:
+        await self._add_eta_waiting(1)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            await self._add_eta_waiting(-1)
+
+    async def _add_eta_waiting(self, delta: int) -> None:
+        self._eta_waiting += delta
+        if self._consumer is None:
+            return
+        # Computed here and applied in order on the I/O thread, so the last update wins.
+        prefetch = self.concurrency + self._eta_waiting
+        try:
+            await self._io_call(partial(self._consumer.qos, prefetch_count=prefetch))
+        except Exception:
+            logger.exception("Could not set prefetch count to %d", prefetch)
+
+    async def _process(self, body: Any, message: Any) -> None:
+        name, task_id, kwargs, retries, eta = parse_task_message(body, message.headers)
+        handler = self.handlers.get(name or "")
+        if handler is None or not task_id:
+            logger.warning("Rejecting unsupported task message: %s", name)
+            await self._io_call(message.reject)
+            return
+
+        if eta is not None:
+            delay = (eta - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                await self._wait_for_eta(delay)
+
+        headers = message.headers or {}
+        ignore_result = bool(headers.get("ignore_result"))
+        enqueued_at = headers.get("enqueued_at")
+
+        async def store(method: str, *args: Any) -> None:
+            # Fire-and-forget (ignore_result) messages never touch the result backend.
+            if ignore_result:
+                return
+            try:
+                await asyncio.to_thread(getattr(self.app.backend, method), task_id, *args)
+            except Exception:
+                # Results are for /jobs status only; losing one must not lose the message.
+                logger.warning("Could not store %s for task %s", method, task_id, exc_info=True)
+
+        async with self._sem:
+            with tracer.start_as_current_span(
+                name,
+                context=extract_context(headers),
+                kind=SpanKind.CONSUMER,
+                record_exception=False,
+                set_status_on_exception=False,
+            ) as span:
+                span.set_attribute("messaging.message.id", task_id)
+                span.set_attribute("app.retries", retries)
+                await asyncio.to_thread(note_queue_wait, self.queue_name, enqueued_at, retries)
+                await store("mark_as_started")
+                try:
+                    result = await handler(job_id=task_id, **kwargs)
+                except DEFERRABLE_ERRORS as e:
+                    if not await self._retry_later(
+                        message, name, task_id, kwargs, retries, e.countdown, enqueued_at, ignore_result
+                    ):
+                        return
+                    await store("store_result", None, "RETRY")
+                except Exception as e:
+                    span.record_exception(e)
+                    span.set_status(Status(StatusCode.ERROR))
+                    if should_retry(e, retries):
+                        countdown = retry_countdown(retries)
+                        if not await self._retry_later(
+                            message, name, task_id, kwargs, retries + 1, countdown, enqueued_at, ignore_result
+                        ):
+                            return
+                        await store("mark_as_retry", e)
+                        logger.info("Task %s retry %d in %ss", task_id, retries + 1, countdown)
+                    else:
+                        logger.warning("Task %s failed after %d retries", task_id, retries)
+                        await store("mark_as_done", {"status": "error"})
+                else:
+                    await store("mark_as_done", result)
+        await self._settle(message, "ack")
+
+    def _republish(
+        self,
+        name: str,
+        task_id: str,
+        kwargs: dict[str, Any],
+        retries: int,
+        countdown: int,
+        enqueued_at: Any,
+        ignore_result: bool = False,
+    ) -> None:
+        TASK_SIGNATURES[name].apply_async(
+            kwargs=kwargs,
+            task_id=task_id,
+            retries=retries,
+            countdown=countdown,
+            queue=self.queue_name,
+            headers={"enqueued_at": enqueued_at, **trace_headers()},
+            ignore_result=ignore_result,
+        )
+
+    def _drain_once(self, conn: Any) -> None:
+        with contextlib.suppress(TimeoutError):
+            conn.drain_events(timeout=DRAIN_POLL_SECONDS)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.blocking_threads:
+            self._loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=self.blocking_threads, thread_name_prefix="aio-worker-blocking")
+            )
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                self._loop.add_signal_handler(sig, self.request_stop)
+
+        conn = self.app.connection_for_read()
+        try:
+            queue = self.app.amqp.queues[self.queue_name]
+            consumer = await self._io_call(self._start_consumer, conn, queue)
+            logger.info("Asyncio worker consuming %r with concurrency %d", self.queue_name, self.concurrency)
+            while not self._stopping.is_set():
+                await self._io_call(self._drain_once, conn)
+            await self._io_call(consumer.cancel)
+            await self._drain_inflight()
+        finally:
+            await self._io_call(conn.release)
+            self._io.shutdown(wait=True)
+
+    def _start_consumer(self, conn: Any, queue: Any) -> Consumer:
+        consumer = Consumer(
+            conn.default_channel,
+            queues=[queue],
+            callbacks=[self._on_message],
+            accept=["json"],
+            prefetch_count=self.concurrency,
+        )
+        consumer.consume()
+        self._consumer = consumer
+        return consumer
+
+    async def _drain_inflight(self) -> None:
+        if not self._inflight:
+            return
+        done, pending = await asyncio.wait(set(self._inflight), timeout=self.drain_timeout or None)
+        if pending:
+            logger.warning("Drain timeout; cancelling %d task(s), messages will be redelivered", len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def main() -> None:
+    settings = get_settings()
+    configure_logging(level=settings.log_level, json_logs=settings.json_logs, use_queue=settings.log_queue)
+    start_worker_exporter(settings.worker_metrics_port)
+    configure_tracing(settings, service_name="aio-worker")
+    worker = AsyncioWorker(
+        celery_app,
+        queue_name=settings.aio_worker_queue,
+        concurrency=settings.aio_worker_concurrency,
+        drain_timeout=settings.aio_worker_drain_timeout_seconds,
+        blocking_threads=blocking_threads(settings),
+    )
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":
+    main()
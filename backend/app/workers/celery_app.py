@@ -1,9 +1,24 @@
-"""Celery application configuration (local Redis broker/backend)."""
+"""Celery application configuration (local Redis broker/backend).
+
+Single Celery app for the project. Syncs are routed to two queues so user-triggered
+syncs never wait behind the weekly bulk backlog:
+
+- ``sync.interactive``: enqueued by the API; small concurrency, prefetch 1 (low latency).
+- ``sync.bulk``: scheduled/batch syncs (default route); higher concurrency and prefetch.
+
+Run one worker per profile (see ``app.workers.run``); prefetch is a per-worker setting,
+so separate workers are what make it per-queue.
+"""
 
 from celery import Celery
+from kombu import Queue
 
 from app.core.config import get_settings
 
+QUEUE_DEFAULT = "celery"
+QUEUE_INTERACTIVE = "sync.interactive"
+QUEUE_BULK = "sync.bulk"
+
 settings = get_settings()
 
 celery_app = Celery(
@@ -23,5 +38,38 @@ celery_app.conf.update(
     broker_connection_retry_on_startup=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
+    task_default_queue=QUEUE_DEFAULT,
+    task_queues=(
+        Queue(QUEUE_DEFAULT),
+        Queue(QUEUE_INTERACTIVE),
+        Queue(QUEUE_BULK),
+    ),
+    task_routes={"sync.discover_weekly": {"queue": QUEUE_BULK}},
+    beat_schedule={
+        "dispatch-fair-scheduled-syncs": {
+            "task": "sync.dispatch_fair",
+            "schedule": settings.fair_dispatch_interval_seconds,
+        },
+        "schedule-due-syncs": {
+            "task": "sync.schedule_due",
+            "schedule": settings.schedule_due_interval_seconds,
+        },
+    },
+    result_expires=settings.celery_result_expires_seconds,
+    task_compression=settings.celery_compression or None,
+    result_compression=settings.celery_compression or None,
 )
 
+# Worker profiles: queues consumed plus per-queue concurrency/prefetch.
+WORKER_PROFILES: dict[str, dict] = {
+    "interactive": {
+        "queues": [QUEUE_INTERACTIVE],
+        "concurrency": settings.celery_interactive_concurrency,
+        "prefetch_multiplier": settings.celery_interactive_prefetch_multiplier,
+    },
+    "bulk": {
+        "queues": [QUEUE_BULK, QUEUE_DEFAULT],
+        "concurrency": settings.celery_bulk_concurrency,
+        "prefetch_multiplier": settings.celery_bulk_prefetch_multiplier,
+    },
+}
@@ -0,0 +1,39 @@
+"""Start a Celery worker for one queue profile.
+
+    python -m app.workers.run interactive
+    python -m app.workers.run bulk
+
+Extra arguments are passed through to ``celery worker`` (e.g. ``--loglevel INFO``).
+"""
+from __future__ import annotations
+
+import sys
+
+from app.workers.celery_app import WORKER_PROFILES, celery_app
+
+
+def worker_argv(profile: str, extra: list[str] | None = None) -> list[str]:
+    cfg = WORKER_PROFILES[profile]
+    return [
+        "worker",
+        "-Q",
+        ",".join(cfg["queues"]),
+        "--concurrency",
+        str(cfg["concurrency"]),
+        "--prefetch-multiplier",
+        str(cfg["prefetch_multiplier"]),
+        "--hostname",
+        f"{profile}@%h",
+        *(extra or []),
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args or args[0] not in WORKER_PROFILES:
+        raise SystemExit(f"usage: python -m app.workers.run {{{'|'.join(WORKER_PROFILES)}}} [celery args...]")
+    celery_app.worker_main(worker_argv(args[0], args[1:]))
+
+
+if __name__ == "__main__":
+    main()
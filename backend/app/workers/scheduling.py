@@ -0,0 +1,251 @@
+"""Sync scheduling on top of Celery: priority, per-user limits and fair-share dispatch.
+
+- Priority: user-triggered syncs go straight to ``sync.interactive`` (own workers);
+  scheduled syncs go through a fair queue and then ``sync.bulk``.
+- Fair share: scheduled syncs are held in per-user Redis lists; the dispatcher
+  (``sync.dispatch_fair``) pops one job per user round-robin and only tops ``sync.bulk``
+  up to ``FAIR_DISPATCH_MAX_QUEUE_DEPTH``, so one tenant's backlog can't fill the queue.
+- Per-user limit: a sync holds a leased slot (Redis ZSET) while running; when the user
+  is at ``SYNC_MAX_CONCURRENT_PER_USER`` the task is deferred instead of run.
+- Due scheduling: every enabled config has a ``next_run_at`` (partial index on enabled
+  rows). ``schedule_due_syncs`` claims due configs in batches with ``SELECT ... FOR UPDATE
+  SKIP LOCKED``, parks their syncs in the fair queue and moves ``next_run_at`` forward in the
+  same transaction. Each tick costs one indexed query per batch of due configs (not a scan
+  of all configs), and concurrent schedulers claim disjoint rows.
+- Wait metrics: every message carries ``enqueued_at``; workers record queue wait per queue.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.redis_client import get_redis
+from app.core.stats import percentile
+from app.core.tracing import trace_headers
+from app.db.models import PlaylistConfig
+from app.workers.celery_app import QUEUE_BULK, QUEUE_INTERACTIVE, celery_app
+
+logger = logging.getLogger(__name__)
+
+SYNC_TASK_NAME = "sync.discover_weekly"
+# Batches claimed per scheduler tick; the rest stay due for the next tick.
+SCHEDULE_MAX_BATCHES = 20
+
+FAIR_RING_KEY = "sync:fair:ring"
+FAIR_MEMBERS_KEY = "sync:fair:members"
+FAIR_USER_PREFIX = "sync:fair:user:"
+USER_SLOTS_PREFIX = "sync:slots:user:"
+WAIT_SAMPLES_PREFIX = "sync:wait:"
+WAIT_SAMPLES_MAX = 1000
+
+# Append a job for a user; the user joins the ring tail only if not already queued.
+# At most one pending scheduled job per user (duplicates are collapsed).
+_FAIR_PUSH = """
+if redis.call('LLEN', KEYS[1]) > 0 then return 0 end
+redis.call('RPUSH', KEYS[1], ARGV[2])
+if redis.call('SADD', KEYS[3], ARGV[1]) == 1 then redis.call('RPUSH', KEYS[2], ARGV[1]) end
+return 1
+"""
+
+# Pop up to ARGV[1] jobs, one per user per round (round-robin over the ring).
+_FAIR_POP = """
+local out = {}
+local limit = tonumber(ARGV[1])
+local prefix = ARGV[2]
+while #out < limit do
+  local uid = redis.call('LPOP', KEYS[1])
+  if not uid then break end
+  local job = redis.call('LPOP', prefix .. uid)
+  if job then table.insert(out, job) end
+  if redis.call('LLEN', prefix .. uid) > 0 then
+    redis.call('RPUSH', KEYS[1], uid)
+  else
+    redis.call('SREM', KEYS[2], uid)
+  end
+end
+return out
+"""
+
+# Leased slot: drop expired leases, then take one if under the limit.
+_SLOT_ACQUIRE = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then return 0 end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class UserBusyError(Exception):
+    """The user already has the maximum number of syncs running; retry after ``countdown``."""
+
+    def __init__(self, countdown: int):
+        super().__init__("User has too many syncs in flight")
+        self.countdown = countdown
+
+
+def sync_task_kwargs(user_id: int, dry_run: bool, max_tracks: int | None, plan_id: int | None = None) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"user_id": user_id, "dry_run": dry_run, "max_tracks": max_tracks}
+    if plan_id is not None:
+        kwargs["plan_id"] = plan_id
+    return kwargs
+
+
+def enqueue_interactive_sync(
+    user_id: int, *, dry_run: bool = False, max_tracks: int | None = None, plan_id: int | None = None
+) -> str:
+    """User-triggered sync: bypasses the fair queue and goes to the interactive queue."""
+    result = celery_app.send_task(
+        SYNC_TASK_NAME,
+        kwargs=sync_task_kwargs(user_id, dry_run, max_tracks, plan_id),
+        queue=QUEUE_INTERACTIVE,
+        headers={"enqueued_at": time.time(), **trace_headers()},
+    )
+    return result.id
+
+
+def enqueue_scheduled_sync(user_id: int, *, dry_run: bool = False, max_tracks: int | None = None) -> bool:
+    """Scheduled sync: parked in the user's fair-queue list. False if one is already pending."""
+    job = json.dumps(
+        {
+            "kwargs": sync_task_kwargs(user_id, dry_run, max_tracks),
+            "enqueued_at": time.time(),
+            "trace": trace_headers(),
+        }
+    )
+    pushed = get_redis().eval(
+        _FAIR_PUSH, 3, f"{FAIR_USER_PREFIX}{user_id}", FAIR_RING_KEY, FAIR_MEMBERS_KEY, str(user_id), job
+    )
+    return bool(pushed)
+
+
+def dispatch_fair(max_jobs: int | None = None) -> int:
+    """Move scheduled jobs round-robin into ``sync.bulk``, keeping its depth bounded."""
+    settings = get_settings()
+    r = get_redis()
+    room = settings.fair_dispatch_max_queue_depth - int(r.llen(QUEUE_BULK))
+    limit = min(room, max_jobs or settings.fair_dispatch_batch_size)
+    if limit <= 0:
+        return 0
+    jobs = r.eval(_FAIR_POP, 2, FAIR_RING_KEY, FAIR_MEMBERS_KEY, str(limit), FAIR_USER_PREFIX)
+    for raw in jobs:
+        job = json.loads(raw)
+        celery_app.send_task(
+            SYNC_TASK_NAME,
+            kwargs=job["kwargs"],
+            queue=QUEUE_BULK,
+            headers={"enqueued_at": job.get("enqueued_at") or time.time(), **(job.get("trace") or {})},
+            # Fire-and-forget: nobody polls scheduled jobs; state lives on PlaylistRun.
+            ignore_result=True,
+        )
+    return len(jobs)
+
+
+def claim_due_configs(db: Session, now: datetime, limit: int, interval_seconds: int) -> list[int]:
+    """Lock up to ``limit`` due enabled configs and push their ``next_run_at`` forward.
+
+    Rows locked by another scheduler are skipped, not waited for. Returns the configs' user
+    IDs; the caller commits once the syncs are queued (a rollback leaves them due).
+    """
+    rows = db.execute(
+        select(PlaylistConfig.id, PlaylistConfig.user_id)
+        .where(PlaylistConfig.is_enabled.is_(True), PlaylistConfig.next_run_at <= now)
+        .order_by(PlaylistConfig.next_run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if rows:
+        db.execute(
+            update(PlaylistConfig)
+            .where(PlaylistConfig.id.in_([config_id for config_id, _ in rows]))
+            .values(next_run_at=now + timedelta(seconds=interval_seconds))
+            .execution_options(synchronize_session=False)
+        )
+    return [user_id for _, user_id in rows]
+
+
+def schedule_due_syncs(db: Session, now: datetime | None = None) -> int:
+    """Queue a scheduled sync for every due config (up to ``SCHEDULE_MAX_BATCHES`` batches)."""
+    settings = get_settings()
+    now = now or datetime.now(timezone.utc)
+    batch_size = settings.schedule_due_batch_size
+    queued = 0
+    for _ in range(SCHEDULE_MAX_BATCHES):
+        try:
+            user_ids = claim_due_configs(db, now, batch_size, settings.sync_schedule_interval_seconds)
+            for user_id in user_ids:
+                # False means the user already has one pending; the claim still counts.
+                queued += enqueue_scheduled_sync(user_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if len(user_ids) < batch_size:
+            break
+    if queued:
+        logger.info("Queued %d scheduled sync(s)", queued)
+    return queued
+
+
+def acquire_user_slot(user_id: int) -> str | None:
+    """Lease a per-user run slot; returns a token to release, or None if the user is at the limit."""
+    settings = get_settings()
+    token = uuid.uuid4().hex
+    ok = get_redis().eval(
+        _SLOT_ACQUIRE,
+        1,
+        f"{USER_SLOTS_PREFIX}{user_id}",
+        str(time.time()),
+        str(settings.sync_user_slot_ttl_seconds),
+        str(settings.sync_max_concurrent_per_user),
+        token,
+    )
+    return token if ok else None
+
+
+def release_user_slot(user_id: int, token: str) -> None:
+    get_redis().zrem(f"{USER_SLOTS_PREFIX}{user_id}", token)
+
+
+def record_queue_wait(queue: str | None, enqueued_at: Any) -> float | None:
+    """Store how long a message waited before a worker started it (capped sample list)."""
+    try:
+        wait = max(0.0, time.time() - float(enqueued_at))
+    except (TypeError, ValueError):
+        return None
+    key = f"{WAIT_SAMPLES_PREFIX}{queue or 'unknown'}"
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.lpush(key, f"{wait:.3f}")
+    pipe.ltrim(key, 0, WAIT_SAMPLES_MAX - 1)
+    pipe.execute()
+    return wait
+
+
+def summarize_waits(samples: list[float]) -> dict[str, float | int | None]:
+    values = sorted(samples)
+    return {
+        "samples": len(values),
+        "p50_seconds": percentile(values, 50),
+        "p95_seconds": percentile(values, 95),
+        "max_seconds": values[-1] if values else None,
+    }
+
+
+def queue_stats() -> dict[str, dict[str, Any]]:
+    """Depth and recent wait-time summary for each sync queue, plus the fair queue."""
+    r = get_redis()
+    out: dict[str, dict[str, Any]] = {}
+    for queue in (QUEUE_INTERACTIVE, QUEUE_BULK):
+        samples = [float(v) for v in r.lrange(f"{WAIT_SAMPLES_PREFIX}{queue}", 0, -1)]
+        out[queue] = {"depth": int(r.llen(queue)), **summarize_waits(samples)}
+    out["fair"] = {"users_waiting": int(r.scard(FAIR_MEMBERS_KEY))}
+    return out
@@ -2,50 +2,194 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from typing import Any
 
+import redis
 from celery import Task
+from celery.exceptions import Ignore
+from celery.signals import worker_init
+from opentelemetry.trace import SpanKind, Status, StatusCode
 
 from app.core.config import get_settings
+from app.core.metrics import TASK_QUEUE_WAIT_SECONDS, TASK_RUN_SECONDS, start_worker_exporter
+from app.core.profiling import maybe_profile
+from app.core.tracing import configure_tracing, extract_context, trace_headers, tracer
 from app.db.models import User
 from app.db.session import SessionLocal
-from app.playlists.service import SpotifyApiError, sync_discover_weekly
+from app.playlists.service import (
+    CircuitOpenError,
+    RetryBudgetExhaustedError,
+    SpotifyApiError,
+    SyncDeadlineExceededError,
+    check_spotify_available,
+    sync_discover_weekly,
+)
 from app.schemas.playlists import SyncDiscoverWeeklyRequest
 from app.workers.celery_app import celery_app
+from app.workers.scheduling import (
+    UserBusyError,
+    acquire_user_slot,
+    dispatch_fair,
+    record_queue_wait,
+    release_user_slot,
+    schedule_due_syncs,
+    sync_task_kwargs,
+)
 
 logger = logging.getLogger(__name__)
 
+SYNC_DISCOVER_WEEKLY_TASK = "sync.discover_weekly"
+SYNC_MAX_RETRIES = 5
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504, None)
+# Re-published after ``countdown`` without spending a retry.
+DEFERRABLE_ERRORS = (UserBusyError, CircuitOpenError)
+# The sync's own deadline/retry budget is final; a task retry would start a fresh budget.
+BUDGET_ERRORS = (SyncDeadlineExceededError, RetryBudgetExhaustedError)
+
 
 def _run(coro):
     return asyncio.run(coro)
 
 
-@celery_app.task(bind=True, name="sync.discover_weekly", max_retries=5)
-def sync_discover_weekly_task(self: Task, *, user_id: int, dry_run: bool = False, max_tracks: int | None = None):
-    """Run Discover Weekly sync in the background. Returns a sanitized result dict."""
+def retry_countdown(retries: int) -> int:
+    """Exponential backoff between task retries, capped at one minute."""
+    return min(60, 2**retries)
+
+
+def should_retry(exc: BaseException, retries: int, max_retries: int = SYNC_MAX_RETRIES) -> bool:
+    """Spotify errors retry only on 429/5xx/network; anything else retries until the limit.
+
+    An exhausted sync budget (deadline or retry budget) never retries.
+    """
+    if retries >= max_retries or isinstance(exc, BUDGET_ERRORS):
+        return False
+    if isinstance(exc, SpotifyApiError):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    return True
+
+
+async def run_discover_weekly_sync(
+    *,
+    user_id: int,
+    dry_run: bool = False,
+    max_tracks: int | None = None,
+    plan_id: int | None = None,
+    job_id: str | None = None,
+) -> dict[str, Any]:
+    """Shared task body for the Celery task and the asyncio worker. Returns a sanitized result dict.
+
+    Raises ``UserBusyError`` when the user already has the maximum number of syncs running and
+    ``CircuitOpenError`` while Spotify is considered down (before or during the sync).
+    """
     settings = get_settings()
+    # Redis and DB calls run in threads: the asyncio worker shares its loop with other syncs.
+    await check_spotify_available()
+    slot = await asyncio.to_thread(acquire_user_slot, user_id)
+    if slot is None:
+        raise UserBusyError(settings.sync_user_busy_defer_seconds)
     db = SessionLocal()
+    started = time.perf_counter()
+    outcome = "exception"
     try:
-        user = db.get(User, user_id)
+        user = await asyncio.to_thread(db.get, User, user_id)
         if not user:
             return {"status": "not_authenticated"}
 
-        req = SyncDiscoverWeeklyRequest(dry_run=dry_run, max_tracks=max_tracks)
+        req = SyncDiscoverWeeklyRequest(dry_run=dry_run, max_tracks=max_tracks, plan_id=plan_id)
 
-        cfg, run, added = _run(sync_discover_weekly(db, settings, user, req))
+        async with maybe_profile(SYNC_DISCOVER_WEEKLY_TASK, job_id):
+            cfg, run, added = await sync_discover_weekly(db, settings, user, req, job_id=job_id)
+        outcome = run.status
         return {"status": run.status, "run_id": run.id, "tracks_added_count": int(added)}
+    finally:
+        TASK_RUN_SECONDS.labels(SYNC_DISCOVER_WEEKLY_TASK, outcome).observe(time.perf_counter() - started)
+        await asyncio.to_thread(db.close)
+        await asyncio.to_thread(release_user_slot, user_id, slot)
+
+
+def note_queue_wait(queue: str | None, enqueued_at, retries: int) -> None:
+    """Record queue wait for first deliveries only; metrics must never fail a task."""
+    if retries or enqueued_at is None:
+        return
+    try:
+        wait = record_queue_wait(queue, enqueued_at)
+        if wait is not None:
+            TASK_QUEUE_WAIT_SECONDS.labels(queue or "unknown").observe(wait)
+    except redis.RedisError:
+        logger.debug("Could not record queue wait", exc_info=True)
+
 
-    except SpotifyApiError as e:
-        retries = getattr(self.request, "retries", 0)
-        countdown = min(60, 2 ** retries)
-        if e.status_code in (429, 500, 502, 503, 504, None) and retries < self.max_retries:
-            raise self.retry(countdown=countdown)
-        return {"status": "error"}
-    except Exception:
-        retries = getattr(self.request, "retries", 0)
-        countdown = min(60, 2 ** retries)
-        if retries < self.max_retries:
-            raise self.retry(countdown=countdown)
-        return {"status": "error"}
+@worker_init.connect
+def _start_observability(**_kwargs) -> None:
+    settings = get_settings()
+    start_worker_exporter(settings.worker_metrics_port)
+    configure_tracing(settings, service_name="worker")
+
+
+@celery_app.task(bind=True, name=SYNC_DISCOVER_WEEKLY_TASK, max_retries=SYNC_MAX_RETRIES)
+def sync_discover_weekly_task(
+    self: Task, *, user_id: int, dry_run: bool = False, max_tracks: int | None = None, plan_id: int | None = None
+):
+    """Run Discover Weekly sync in the background. Returns a sanitized result dict."""
+    delivery_info = self.request.delivery_info or {}
+    enqueued_at = getattr(self.request, "enqueued_at", None)
+    note_queue_wait(delivery_info.get("routing_key"), enqueued_at, self.request.retries)
+    with tracer.start_as_current_span(
+        SYNC_DISCOVER_WEEKLY_TASK,
+        context=extract_context(self.request),
+        kind=SpanKind.CONSUMER,
+        record_exception=False,
+        set_status_on_exception=False,
+    ) as span:
+        span.set_attribute("messaging.message.id", self.request.id or "")
+        span.set_attribute("app.retries", self.request.retries)
+        try:
+            return _run(
+                run_discover_weekly_sync(
+                    user_id=user_id, dry_run=dry_run, max_tracks=max_tracks, plan_id=plan_id, job_id=self.request.id
+                )
+            )
+        except DEFERRABLE_ERRORS as e:
+            # Defer without spending a retry: same id, same retry count, back of the same queue.
+            span.add_event("deferred", {"countdown": e.countdown})
+            self.apply_async(
+                kwargs=sync_task_kwargs(user_id, dry_run, max_tracks, plan_id),
+                task_id=self.request.id,
+                retries=self.request.retries,
+                countdown=e.countdown,
+                queue=delivery_info.get("routing_key"),
+                headers={"enqueued_at": enqueued_at, **trace_headers()},
+                ignore_result=bool(self.request.ignore_result),
+            )
+            if not self.request.ignore_result:
+                self.update_state(state="RETRY")
+            raise Ignore()
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR))
+            retries = getattr(self.request, "retries", 0)
+            if should_retry(e, retries, self.max_retries):
+                raise self.retry(countdown=retry_countdown(retries))
+            return {"status": "error"}
+
+
+@celery_app.task
+def ping_task() -> str:
+    return "pong"
+
+
+@celery_app.task(name="sync.dispatch_fair")
+def dispatch_fair_task() -> int:
+    """Periodic (beat): move scheduled syncs round-robin from the fair queue into sync.bulk."""
+    return dispatch_fair()
+
+
+@celery_app.task(name="sync.schedule_due")
+def schedule_due_task() -> int:
+    """Periodic (beat): claim due playlist configs and park their syncs in the fair queue."""
+    db = SessionLocal()
+    try:
+        return schedule_due_syncs(db)
     finally:
         db.close()
-
@@ -0,0 +1,92 @@
+"""Benchmark: log records formatted per second, legacy formatters vs the current ones.
+
+"legacy" reproduces the previous formatter: three sequential regex substitutions per
+record, ``formatTime`` on every record and stdlib ``json.dumps``. "current" is
+``app.core.logging`` as shipped (pre-check, combined pattern, cached timestamp prefix,
+orjson when installed). ``--secret-share`` sets how many messages carry a token.
+
+    python benchmarks/bench_logging.py --records 200000 --secret-share 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core import logging as app_logging  # noqa: E402
+
+_LEGACY_PATTERNS = [
+    (re.compile(r"\b(access_token|refresh_token|token|secret|password|api_key)=['\"]?[\w\-\.]+", re.I), r"\1=***"),
+    (re.compile(r"Bearer\s+[\w\-\.]+", re.I), "Bearer ***"),
+    (re.compile(r"\b[A-Za-z0-9_-]{20,}\.([A-Za-z0-9_-]{20,}\.){2}[A-Za-z0-9_-]{20,}\b"), "***"),
+]
+
+
+def _legacy_redact(msg: str) -> str:
+    for pattern, repl in _LEGACY_PATTERNS:
+        msg = pattern.sub(repl, msg)
+    return msg
+
+
+class LegacyFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        msg = _legacy_redact(record.getMessage())
+        return f"{self.formatTime(record)} {record.levelname} [{record.name}] {msg}"
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _legacy_redact(record.getMessage()),
+        }
+        return json.dumps(payload)
+
+
+def _records(n: int, secret_share: float) -> list[logging.LogRecord]:
+    every = max(1, round(1 / secret_share)) if secret_share > 0 else 0
+    records = []
+    for i in range(n):
+        if every and i % every == 0:
+            msg, args = "Refreshing token for user %d: refresh_token=%s", (i, "AQD9x-e1Fa_8k2l")
+        else:
+            msg, args = "GET %s %d in %.1fms", (f"/playlists/{i}/runs", 200, 12.5)
+        records.append(logging.LogRecord("app.http", logging.INFO, __file__, 1, msg, args, None))
+    return records
+
+
+def _rate(formatter: logging.Formatter, records: list[logging.LogRecord]) -> float:
+    start = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return len(records) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--secret-share", type=float, default=0.05)
+    args = parser.parse_args()
+    records = _records(args.records, args.secret_share)
+
+    print(f"records={args.records} secret_share={args.secret_share} orjson={app_logging.orjson is not None}")
+    for name, legacy, current in (
+        ("text", LegacyFormatter(), app_logging.RedactingFormatter()),
+        ("json", LegacyJsonFormatter(), app_logging.JsonFormatter()),
+    ):
+        before = _rate(legacy, records)
+        after = _rate(current, records)
+        print(f"{name}: legacy {before:12,.0f} rec/s  current {after:12,.0f} rec/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Redis memory report: Celery result backend usage before vs after result retention changes.
+
+Writes synthetic task results through the real Celery Redis backend into a scratch Redis DB
+and reports ``used_memory`` deltas for:
+
+- before: every sync stores STARTED + a result dict, kept for the old default (1 day)
+- after:  interactive syncs store results with ``CELERY_RESULT_EXPIRES_SECONDS``;
+          scheduled batch syncs (``ignore_result``) store nothing
+
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/redis_result_memory.py --jobs 20000 --interactive-share 0.05
+
+The scratch DB is flushed before and after; never point this at a production Redis DB.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import redis  # noqa: E402
+from celery import Celery  # noqa: E402
+
+OLD_EXPIRES = 86400
+
+
+def _used_memory(r: redis.Redis) -> int:
+    return int(r.info("memory")["used_memory"])
+
+
+def _store(app: Celery, n: int, track_started: bool) -> None:
+    backend = app.backend
+    for i in range(n):
+        task_id = str(uuid.uuid4())
+        if track_started:
+            backend.store_result(task_id, {"pid": 4242, "hostname": "celery@worker-1"}, "STARTED")
+        backend.store_result(
+            task_id, {"status": "success", "run_id": 100000 + i, "tracks_added_count": 30}, "SUCCESS"
+        )
+
+
+def _measure(url: str, n: int, expires: int, track_started: bool) -> int:
+    r = redis.Redis.from_url(url)
+    r.flushdb()
+    base = _used_memory(r)
+    app = Celery("bench", broker=url, backend=url)
+    app.conf.update(result_expires=expires, result_serializer="json")
+    _store(app, n, track_started)
+    used = _used_memory(r) - base
+    r.flushdb()
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20000, help="jobs per day to simulate")
+    parser.add_argument("--interactive-share", type=float, default=0.05)
+    parser.add_argument("--expires", type=int, default=int(os.environ.get("CELERY_RESULT_EXPIRES_SECONDS", 3600)))
+    args = parser.parse_args()
+    url = os.environ.get("REDIS_URL", "redis://localhost:6379/15")
+
+    interactive = int(args.jobs * args.interactive_share)
+    before = _measure(url, args.jobs, OLD_EXPIRES, track_started=True)
+    after = _measure(url, interactive, args.expires, track_started=True)
+    # Steady-state: results live for their TTL, so resident size scales with TTL / 1 day.
+    before_resident = before * min(1.0, OLD_EXPIRES / 86400)
+    after_resident = after * min(1.0, args.expires / 86400)
+
+    print(f"jobs/day={args.jobs} interactive={interactive} result_expires={args.expires}s")
+    print(f"before: {before / 1024:10.1f} KiB written/day  ~{before_resident / 1024:10.1f} KiB resident")
+    print(f"after:  {after / 1024:10.1f} KiB written/day  ~{after_resident / 1024:10.1f} KiB resident")
+    if before:
+        print(f"resident reduction: {100 * (1 - after_resident / before_resident):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ os.environ.setdefault("SPOTIFY_CLIENT_ID", "test_client_id")
 os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "test_client_secret")
 os.environ.setdefault("APP_SECRET", "a" * 32)
 os.environ.setdefault("BASE_URL", "http://localhost:8000")
+# Unit tests run without Redis; breaker/rate limit tests pass their own fake client.
+os.environ.setdefault("SPOTIFY_BREAKER_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
 
 from httpx import ASGITransport, AsyncClient
 from app.main import app
@@ -0,0 +1,195 @@
+"""Asyncio worker: message parsing, retry parity with the Celery task, ack-late handling."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import get_settings
+from app.playlists.service import (
+    RetryBudgetExhaustedError,
+    SpotifyApiError,
+    SyncDeadlineExceededError,
+)
+from app.workers.aio_worker import AsyncioWorker, blocking_threads, parse_task_message
+from app.workers.celery_app import celery_app
+from app.workers.tasks import SYNC_DISCOVER_WEEKLY_TASK, retry_countdown, should_retry
+
+
+class FakeMessage:
+    def __init__(self, headers):
+        self.headers = headers
+        self.events = []
+
+    def ack(self):
+        self.events.append("ack")
+
+    def reject(self):
+        self.events.append("reject")
+
+    def requeue(self):
+        self.events.append("requeue")
+
+
+class FakeBackend:
+    def __init__(self):
+        self.states = []
+
+    def mark_as_started(self, task_id):
+        self.states.append(("STARTED", task_id))
+
+    def mark_as_done(self, task_id, result):
+        self.states.append(("SUCCESS", result))
+
+    def mark_as_retry(self, task_id, exc):
+        self.states.append(("RETRY", task_id))
+
+
+class FakeApp:
+    def __init__(self):
+        self.backend = FakeBackend()
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.prefetch = []
+
+    def qos(self, prefetch_count):
+        self.prefetch.append(prefetch_count)
+
+
+def _worker(handler):
+    return AsyncioWorker(
+        FakeApp(),
+        queue_name="celery",
+        concurrency=2,
+        drain_timeout=1,
+        handlers={SYNC_DISCOVER_WEEKLY_TASK: handler},
+    )
+
+
+def test_parse_task_message_protocol2():
+    headers = {"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "abc", "retries": 2, "eta": "2030-01-01T00:00:00"}
+    name, task_id, kwargs, retries, eta = parse_task_message([[], {"user_id": 7}, {}], headers)
+    assert name == SYNC_DISCOVER_WEEKLY_TASK
+    assert task_id == "abc"
+    assert kwargs == {"user_id": 7}
+    assert retries == 2
+    assert eta == datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def test_retry_policy_matches_task():
+    assert retry_countdown(0) == 1
+    assert retry_countdown(10) == 60
+    assert should_retry(SpotifyApiError(503, "x"), 0) is True
+    assert should_retry(SpotifyApiError(404, "x"), 0) is False
+    assert should_retry(RuntimeError("x"), 4) is True
+    assert should_retry(RuntimeError("x"), 5) is False
+    assert should_retry(SyncDeadlineExceededError(), 0) is False
+    assert should_retry(RetryBudgetExhaustedError(503), 0) is False
+
+
+def test_blocking_threads_follow_db_pool():
+    s = get_settings().model_copy(update={"aio_worker_concurrency": 500, "db_pool_size": 5, "db_max_overflow": 10})
+    assert blocking_threads(s) == 15
+
+
+async def test_process_success_acks_after_result():
+    async def handler(**kwargs):
+        return {"status": "success", "user": kwargs["user_id"]}
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    msg = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t1"})
+    await worker._process([[], {"user_id": 3}, {}], msg)
+    assert worker.app.backend.states[-1] == ("SUCCESS", {"status": "success", "user": 3})
+    assert msg.events == ["ack"]
+
+
+async def test_process_non_retryable_error_records_error_and_acks():
+    async def handler(**kwargs):
+        raise SpotifyApiError(404, "missing")
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    msg = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t2", "retries": 0})
+    await worker._process([[], {"user_id": 3}, {}], msg)
+    assert worker.app.backend.states[-1] == ("SUCCESS", {"status": "error"})
+    assert msg.events == ["ack"]
+
+
+async def test_process_does_not_retry_a_sync_past_its_deadline():
+    async def handler(**kwargs):
+        raise SyncDeadlineExceededError()
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    republished = []
+    worker._republish = lambda *args: republished.append(args)
+    msg = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t6", "retries": 0})
+    await worker._process([[], {"user_id": 3}, {}], msg)
+    assert republished == []
+    assert worker.app.backend.states[-1] == ("SUCCESS", {"status": "error"})
+    assert msg.events == ["ack"]
+
+
+async def test_process_unknown_task_rejected():
+    worker = AsyncioWorker(celery_app, queue_name="celery", concurrency=1, drain_timeout=1, handlers={})
+    worker._loop = asyncio.get_running_loop()
+    msg = FakeMessage({"task": "other.task", "id": "t3"})
+    await worker._process([[], {}, {}], msg)
+    assert msg.events == ["reject"]
+
+
+async def test_process_acks_even_when_the_result_backend_fails():
+    async def handler(**kwargs):
+        return {"status": "success"}
+
+    def backend_down(*args):
+        raise ConnectionError("backend down")
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    worker.app.backend.mark_as_done = backend_down
+    msg = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t4"})
+    await worker._process([[], {"user_id": 3}, {}], msg)
+    assert msg.events == ["ack"]
+
+
+async def test_process_requeues_when_the_retry_cannot_be_published():
+    async def handler(**kwargs):
+        raise SpotifyApiError(503, "down")
+
+    def broker_down(*args):
+        raise ConnectionError("broker down")
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    worker._republish = broker_down
+    msg = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t5", "retries": 0})
+    await worker._handle([[], {"user_id": 3}, {}], msg)
+    assert msg.events == ["requeue"]
+    assert ("RETRY", "t5") not in worker.app.backend.states
+
+
+async def test_ready_message_runs_while_eta_messages_wait():
+    async def handler(**kwargs):
+        return {"status": "success"}
+
+    worker = _worker(handler)
+    worker._loop = asyncio.get_running_loop()
+    worker._consumer = FakeConsumer()
+    eta = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+    held = [FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": f"later{i}", "eta": eta}) for i in range(2)]
+    for msg in held:
+        worker._dispatch([[], {"user_id": 1}, {}], msg)
+    await asyncio.sleep(0.05)
+    # Each held message widens the prefetch window past ``concurrency`` (2).
+    assert worker._consumer.prefetch == [3, 4]
+
+    ready = FakeMessage({"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "now"})
+    await asyncio.wait_for(worker._process([[], {"user_id": 2}, {}], ready), timeout=1)
+    assert ready.events == ["ack"]
+
+    for task in list(worker._inflight):
+        task.cancel()
+    await asyncio.gather(*worker._inflight, return_exceptions=True)
+    assert [msg.events for msg in held] == [["requeue"], ["requeue"]]
+    assert worker._consumer.prefetch[-1] == 2
@@ -0,0 +1,142 @@
+"""Circuit breaker client side: local caching, batching, fail-open, fail-fast in SpotifyApi."""
+import threading
+
+import httpx
+import pytest
+import redis
+
+from app.playlists.breaker import STATE_KEY, CircuitBreaker
+from app.playlists.service import CircuitOpenError, SpotifyApi, check_spotify_available
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Returns scripted eval results: ALLOW -> ``allow``, RECORD -> ``record_state``."""
+
+    def __init__(self, allow=(1, "closed", "0"), record_state="closed"):
+        self.allow = allow
+        self.record_state = record_state
+        self.records = []
+        self.checks = 0
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        assert keys[0] == STATE_KEY
+        if numkeys == 1:
+            self.checks += 1
+            return list(self.allow)
+        self.records.append((int(argv[1]), int(argv[2])))
+        return self.record_state
+
+
+def _breaker(fake, clock):
+    return CircuitBreaker(redis_factory=lambda: fake, clock=clock)
+
+
+def test_closed_answer_is_cached_and_successes_batched():
+    fake, clock = FakeRedis(), Clock()
+    breaker = _breaker(fake, clock)
+    assert breaker.check() is None
+    for _ in range(5):
+        assert breaker.check() is None
+        breaker.record(False)
+    assert fake.checks == 1
+    assert fake.records == []
+    clock.now += 2
+    assert breaker.check() is None
+    assert fake.records == [(5, 0)]
+    assert fake.checks == 2
+
+
+def test_failure_is_written_immediately_with_pending_successes():
+    fake, clock = FakeRedis(record_state="opened"), Clock()
+    breaker = _breaker(fake, clock)
+    breaker.check()
+    breaker.record(False)
+    breaker.record(True)
+    assert fake.records == [(1, 1)]
+    fake.allow = (0, "open", "12.5")
+    assert breaker.check() == 12.5
+
+
+def test_successes_counted_from_many_threads_are_not_lost():
+    fake, clock = FakeRedis(), Clock()
+    breaker = _breaker(fake, clock)
+    breaker.check()
+
+    def record_many():
+        for _ in range(1000):
+            breaker.record(False)
+
+    threads = [threading.Thread(target=record_many) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    clock.now += 2
+    breaker.check()
+    assert fake.records == [(4000, 0)]
+
+
+async def test_task_availability_check_stays_on_the_event_loop():
+    fake, clock = FakeRedis(), Clock()
+    breaker = _breaker(fake, clock)
+    checks = []
+    breaker.check = lambda: checks.append("sync")
+    await check_spotify_available(breaker)
+    await breaker.record_async(False)
+    await check_spotify_available(breaker)
+    assert checks == [] and fake.checks == 1
+    fake.allow = (0, "open", "12.5")
+    clock.now += 2
+    with pytest.raises(CircuitOpenError):
+        await check_spotify_available(breaker)
+    assert fake.records == [(1, 0)]
+
+
+def test_fails_open_when_redis_is_down():
+    class Down:
+        def eval(self, *args):
+            raise redis.ConnectionError("down")
+
+    breaker = CircuitBreaker(redis_factory=Down, clock=Clock())
+    assert breaker.check() is None
+    breaker.record(True)
+
+
+async def test_spotify_api_fails_fast_when_open():
+    fake = FakeRedis(allow=(0, "open", "20"))
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        api = SpotifyApi("token", client, breaker=_breaker(fake, Clock()))
+        with pytest.raises(CircuitOpenError) as exc:
+            await api.request("GET", "/me")
+    assert exc.value.countdown == 20
+    assert calls == []
+
+
+async def test_spotify_api_records_5xx_but_not_429(monkeypatch):
+    from app.playlists import service
+
+    async def no_sleep(_seconds):
+        return None
+
+    monkeypatch.setattr(service.asyncio, "sleep", no_sleep)
+    fake = FakeRedis(allow=(1, "half_open", "0"), record_state="half_open")
+    responses = iter([httpx.Response(429), httpx.Response(503), httpx.Response(200, json={})])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: next(responses))) as client:
+        api = SpotifyApi("token", client, breaker=_breaker(fake, Clock()))
+        await api.request("GET", "/me")
+    assert fake.records == [(0, 1), (1, 0)]
@@ -0,0 +1,30 @@
+"""Celery configuration: single app, queue routing and worker profiles."""
+from app.workers.celery_app import QUEUE_BULK, QUEUE_INTERACTIVE, WORKER_PROFILES, celery_app
+from app.workers.run import worker_argv
+
+
+def test_single_app_registers_tasks():
+    celery_app.loader.import_default_modules()
+    assert "sync.discover_weekly" in celery_app.tasks
+    assert "app.workers.tasks.ping_task" in celery_app.tasks
+
+
+def test_sync_routes_to_bulk_by_default():
+    route = celery_app.amqp.router.route({}, "sync.discover_weekly")
+    assert route["queue"].name == QUEUE_BULK
+
+
+def test_interactive_profile_does_not_consume_bulk():
+    assert WORKER_PROFILES["interactive"]["queues"] == [QUEUE_INTERACTIVE]
+    assert QUEUE_INTERACTIVE not in WORKER_PROFILES["bulk"]["queues"]
+
+
+def test_worker_argv():
+    argv = worker_argv("interactive", ["--loglevel", "INFO"])
+    assert argv[:3] == ["worker", "-Q", QUEUE_INTERACTIVE]
+    assert "--prefetch-multiplier" in argv
+    assert argv[-2:] == ["--loglevel", "INFO"]
+
+
+def test_result_expiry_configured():
+    assert celery_app.conf.result_expires
@@ -2,11 +2,13 @@
 from datetime import datetime, timezone
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, false
 from sqlalchemy.orm import sessionmaker
 
 from app.db.session import Base
-from app.db.models import User, OAuthToken, PlaylistConfig, PlaylistRun
+from app.db.models import User, OAuthToken, PlaylistConfig, PlaylistRun, PlaylistRunTrack, Track
+from app.playlists import catalog
+from app.playlists.catalog import catalog_ids, record_run_tracks
 
 
 @pytest.fixture
@@ -36,4 +38,58 @@ def test_oauth_token_repr_does_not_contain_tokens():
 
 def test_metadata_has_all_tables():
     names = {t.name for t in Base.metadata.sorted_tables}
-    assert names >= {"users", "oauth_tokens", "playlist_configs", "playlist_runs"}
+    assert names >= {"users", "oauth_tokens", "playlist_configs", "playlist_runs", "tracks", "playlist_run_tracks"}
+
+
+def test_track_catalog_assigns_one_key_per_spotify_id(in_memory_session):
+    db = in_memory_session
+    first = catalog_ids(db, ["a", "b", "a"])
+    again = catalog_ids(db, ["b", "c"])
+    assert again["b"] == first["b"]
+    assert len({*first.values(), *again.values()}) == 3
+    assert db.query(Track).count() == 3
+
+
+def test_track_catalog_inserts_in_sorted_order(in_memory_session):
+    # Same lock order in every transaction, so concurrent syncs don't deadlock.
+    keys = catalog_ids(in_memory_session, ["c", "a", "b", "a"])
+    assert sorted(keys, key=keys.get) == ["a", "b", "c"]
+
+
+def test_track_catalog_without_on_conflict_support(in_memory_session, monkeypatch):
+    # Dialects without ON CONFLICT: existing keys are skipped instead of failing the sync.
+    monkeypatch.setattr(catalog, "_INSERT_IGNORING_CONFLICTS", {})
+    db = in_memory_session
+    first = catalog_ids(db, ["a", "b"])
+    again = catalog_ids(db, ["b", "c", "c"])
+    assert again["b"] == first["b"]
+    assert db.query(Track).count() == 3
+
+    # Lost race: the existence check misses "c", the insert conflicts and is retried.
+    real_select, selects = catalog.select, []
+
+    def racy_select(*columns):
+        selects.append(columns)
+        stmt = real_select(*columns)
+        return stmt.where(false()) if len(selects) == 1 else stmt
+
+    monkeypatch.setattr(catalog, "select", racy_select)
+    assert set(catalog_ids(db, ["c", "d"])) == {"c", "d"}
+    assert db.query(Track).count() == 4
+
+
+def test_record_run_tracks_is_idempotent(in_memory_session):
+    db = in_memory_session
+    user = User(spotify_user_id="u1")
+    db.add(user)
+    db.flush()
+    cfg = PlaylistConfig(user_id=user.id, source_playlist_id="dw", target_playlist_id="sw")
+    db.add(cfg)
+    db.flush()
+    run = PlaylistRun(playlist_config_id=cfg.id, status="running")
+    db.add(run)
+    db.flush()
+    assert record_run_tracks(db, run.id, ["a", "b"]) == 2
+    record_run_tracks(db, run.id, ["b"])
+    db.commit()
+    assert db.query(PlaylistRunTrack).filter_by(run_id=run.id).count() == 2
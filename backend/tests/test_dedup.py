@@ -0,0 +1,65 @@
+import threading
+
+from app.playlists.dedup import RESERVE_BLOCK, DedupBudget, TrackIdSet
+
+
+def test_spills_to_disk_past_memory_limit_and_keeps_contents():
+    ids = TrackIdSet(max_memory_ids=10)
+    ids.update(f"t{i}" for i in range(10))
+    assert not ids.spilled
+    ids.add("t10")
+    assert ids.spilled
+    ids.update(["t3", "t11", "t11"])
+    assert len(ids) == 12
+    assert "t0" in ids and "t11" in ids and "t12" not in ids
+    assert sorted(ids, key=lambda t: int(t[1:])) == [f"t{i}" for i in range(12)]
+    ids.clear()
+    assert (len(ids), ids.spilled) == (0, False)
+
+
+def test_worker_budget_is_shared_and_released():
+    budget = DedupBudget(max_ids=RESERVE_BLOCK * 2)
+    first = TrackIdSet(max_memory_ids=10**6, budget=budget)
+    second = TrackIdSet(max_memory_ids=10**6, budget=budget)
+    first.update(f"a{i}" for i in range(RESERVE_BLOCK * 2))
+    assert not first.spilled and budget.used == RESERVE_BLOCK * 2
+
+    second.add("b0")
+    assert second.spilled and budget.used == RESERVE_BLOCK * 2
+    first.clear()
+    assert budget.used == 0
+
+    third = TrackIdSet(max_memory_ids=10**6, budget=budget)
+    third.add("c0")
+    assert not third.spilled and budget.used == RESERVE_BLOCK
+    third.clear()
+    second.clear()
+
+
+def test_add_new_reports_first_sightings_in_memory_and_spilled():
+    ids = TrackIdSet(max_memory_ids=4)
+    assert ids.add_new(["a", "b", "a"]) == {"a", "b"}
+    assert ids.add_new(["b", "c", "d", "e"]) == {"c", "d", "e"}
+    assert ids.spilled
+    assert ids.add_new(["a", "f", "f", "e"]) == {"f"}
+    assert len(ids) == 6
+    ids.clear()
+
+
+async def test_add_new_async_runs_sqlite_off_the_event_loop(monkeypatch):
+    ids = TrackIdSet(max_memory_ids=2)
+    threads = []
+    real_add_new = ids.add_new
+
+    def tracked(track_ids):
+        threads.append(threading.get_ident())
+        return real_add_new(track_ids)
+
+    monkeypatch.setattr(ids, "add_new", tracked)
+    assert await ids.add_new_async(["a"]) == {"a"}  # reserved memory: inline
+    assert await ids.add_new_async(["b", "c"]) == {"b", "c"}  # spills
+    assert await ids.add_new_async(["c", "d"]) == {"d"}
+    assert ids.spilled
+    assert threads[0] == threading.get_ident()
+    assert threading.get_ident() not in threads[1:]
+    ids.clear()
@@ -0,0 +1,91 @@
+"""Weekly Discover Weekly archive: encoding and the /playlists/history endpoints."""
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import get_settings
+from app.core.security import SESSION_COOKIE_NAME, build_session_cookie_value
+from app.db.models import User
+from app.db.session import Base, get_db
+from app.main import app
+from app.playlists import history
+
+MON_1 = date(2026, 10, 5)
+MON_2 = date(2026, 10, 12)
+MON_3 = date(2026, 10, 19)
+
+
+def test_keys_roundtrip_sorted_and_compact():
+    keys = [300, 5, 70_000, 5, 1]
+    blob = history.encode_keys(keys)
+    assert history.decode_keys(blob) == [1, 5, 300, 70_000]
+    assert len(blob) == 1 + 1 + 2 + 3
+    assert history.decode_keys(b"") == []
+
+
+def test_week_starts_on_monday():
+    assert history.week_of(datetime(2026, 10, 25, 23, 0, tzinfo=timezone.utc)) == MON_3
+    assert history.week_of(datetime(2026, 10, 19, 0, 5, tzinfo=timezone.utc)) == MON_3
+
+
+@pytest.fixture
+def archive(monkeypatch):
+    monkeypatch.setattr(get_settings(), "http_cache_ttl_seconds", 0)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(spotify_user_id="u1")
+    db.add(user)
+    db.flush()
+    history.archive_week(db, user.id, MON_1, "s1", ["a", "b", "c"])
+    history.archive_week(db, user.id, MON_2, "s2", ["c", "d", "a"])
+    history.archive_week(db, user.id, MON_3, "s3-old", ["x"])
+    history.archive_week(db, user.id, MON_3, "s3", ["a", "e"])  # same week again: replaced
+    db.commit()
+
+    def override():
+        yield db
+
+    app.dependency_overrides[get_db] = override
+    yield db, user.id
+    app.dependency_overrides.pop(get_db, None)
+    db.close()
+
+
+def _login(client, user_id):
+    client.cookies.set(SESSION_COOKIE_NAME, build_session_cookie_value(user_id, get_settings().app_secret))
+
+
+async def test_history_endpoints_answer_from_archive(client, archive):
+    _, user_id = archive
+    _login(client, user_id)
+
+    weeks = (await client.get("/playlists/history?limit=2")).json()["items"]
+    assert [(w["week_start"], w["source_snapshot_id"], sorted(w["track_ids"])) for w in weeks] == [
+        ("2026-10-19", "s3", ["a", "e"]),
+        ("2026-10-12", "s2", ["a", "c", "d"]),
+    ]
+
+    track = (await client.get("/playlists/history/tracks/a")).json()
+    assert track["weeks"] == ["2026-10-19", "2026-10-12", "2026-10-05"]
+    assert (await client.get("/playlists/history/tracks/zzz")).json()["weeks"] == []
+
+    overlap = (await client.get("/playlists/history/overlap?week_a=2026-10-05&week_b=2026-10-12")).json()
+    assert (overlap["common_track_ids"], overlap["only_a"], overlap["only_b"], overlap["jaccard"]) == (
+        ["a", "c"],
+        1,
+        1,
+        0.5,
+    )
+    missing = await client.get("/playlists/history/overlap?week_a=2026-10-05&week_b=2026-09-28")
+    assert missing.status_code == 404
+
+    repeats = (await client.get("/playlists/history/repeats")).json()["items"]
+    assert [(r["track_id"], len(r["weeks"])) for r in repeats] == [("a", 3), ("c", 2)]
+
+
+async def test_history_requires_login(client, archive):
+    assert (await client.get("/playlists/history")).status_code == 401
@@ -0,0 +1,136 @@
+"""Conditional GETs and the short-TTL cache for /auth/me and /playlists/runs."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import http_cache
+from app.core.config import get_settings
+from app.core.security import SESSION_COOKIE_NAME, build_session_cookie_value
+from app.db.models import PlaylistConfig, User
+from app.db.session import Base, get_db
+from app.main import app
+from app.playlists import runs
+from app.playlists.runs import RunRecorder
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(http_cache, "get_redis", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def db_setup(fake_redis):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(spotify_user_id="spotify-user")
+    session.add(user)
+    session.flush()
+    cfg = PlaylistConfig(user_id=user.id, source_playlist_id="a", target_playlist_id="b")
+    session.add(cfg)
+    session.commit()
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    def override():
+        yield session
+
+    app.dependency_overrides[get_db] = override
+    yield session, user.id, cfg.id, queries
+    app.dependency_overrides.pop(get_db, None)
+    session.close()
+
+
+def _login(client, user_id):
+    client.cookies.set(SESSION_COOKIE_NAME, build_session_cookie_value(user_id, get_settings().app_secret))
+
+
+async def test_runs_etag_roundtrip_and_cache(client, db_setup):
+    db, user_id, cfg_id, queries = db_setup
+    RunRecorder(db).start(cfg_id, "job-1", user_id)
+    _login(client, user_id)
+
+    first = await client.get("/playlists/runs")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert len(first.json()["items"]) == 1
+
+    queries.clear()
+    again = await client.get("/playlists/runs")
+    assert again.json() == first.json()
+    assert queries == []
+
+    not_modified = await client.get("/playlists/runs", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+async def test_finishing_a_run_changes_etag(client, db_setup):
+    db, user_id, cfg_id, _ = db_setup
+    recorder = RunRecorder(db)
+    run = recorder.start(cfg_id, "job-2", user_id)
+    _login(client, user_id)
+    etag = (await client.get("/playlists/runs")).headers["etag"]
+
+    recorder.finish(run, "success", tracks_added=3)
+    r = await client.get("/playlists/runs", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["items"][0]["status"] == "success"
+
+
+async def test_resuming_a_run_moves_last_modified_forward(client, db_setup, monkeypatch):
+    db, user_id, cfg_id, _ = db_setup
+    clock = [datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)]
+    monkeypatch.setattr(runs, "_utc_now", lambda: clock[0])
+    recorder = RunRecorder(db)
+    run = recorder.start(cfg_id, "job-3", user_id)
+    clock[0] += timedelta(seconds=10)
+    recorder.finish(run, "error", error_message="boom")
+    _login(client, user_id)
+    last_modified = (await client.get("/playlists/runs")).headers["last-modified"]
+
+    # Resuming clears finished_at; the validator must still move forward, not back to started_at.
+    clock[0] += timedelta(seconds=10)
+    recorder.resume(run.id, cfg_id, "job-3", user_id)
+    r = await client.get("/playlists/runs", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 200
+    assert r.json()["items"][0]["status"] == "running"
+
+
+async def test_me_uses_validator_and_if_modified_since(client, db_setup):
+    _, user_id, _, queries = db_setup
+    _login(client, user_id)
+    r = await client.get("/auth/me")
+    assert r.json() == {"authenticated": True, "spotify_user_id": "spotify-user"}
+    queries.clear()
+    r2 = await client.get("/auth/me", headers={"If-Modified-Since": r.headers["last-modified"]})
+    assert r2.status_code == 304
+    assert queries == []
+
+
+async def test_unknown_user_is_unauthorized(client, db_setup):
+    _login(client, 9999)
+    r = await client.get("/playlists/runs")
+    assert r.status_code == 401
@@ -0,0 +1,117 @@
+"""Job status reads the PlaylistRun row by job_id before the Celery result backend."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import get_settings
+from app.core.security import SESSION_COOKIE_NAME, build_session_cookie_value
+from app.db.models import PlaylistConfig, PlaylistRun, User
+from app.db.session import Base, get_db
+from app.main import app
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+
+    def override():
+        yield session
+
+    app.dependency_overrides[get_db] = override
+    yield session
+    app.dependency_overrides.pop(get_db, None)
+    session.close()
+
+
+def _login_admin(client, db, monkeypatch) -> User:
+    user = User(spotify_user_id="admin")
+    db.add(user)
+    db.commit()
+    monkeypatch.setattr(get_settings(), "admin_spotify_user_ids", ["admin"])
+    client.cookies.set(SESSION_COOKIE_NAME, build_session_cookie_value(user.id, get_settings().app_secret))
+    return user
+
+
+def _add_run(db, job_id: str, status: str, tracks: int | None = None) -> PlaylistRun:
+    user = User(spotify_user_id=f"u-{job_id}")
+    db.add(user)
+    db.flush()
+    cfg = PlaylistConfig(user_id=user.id, source_playlist_id="a", target_playlist_id="b")
+    db.add(cfg)
+    db.flush()
+    run = PlaylistRun(playlist_config_id=cfg.id, status=status, job_id=job_id, tracks_added_count=tracks)
+    db.add(run)
+    db.commit()
+    return run
+
+
+async def test_job_status_from_run_row(client, db_session):
+    run = _add_run(db_session, "job-1", "success", tracks=12)
+    r = await client.get("/jobs/job-1")
+    assert r.status_code == 200
+    assert r.json() == {
+        "job_id": "job-1",
+        "state": "SUCCESS",
+        "status": "success",
+        "run_id": run.id,
+        "tracks_added_count": 12,
+    }
+
+
+async def test_job_status_running_row(client, db_session):
+    _add_run(db_session, "job-2", "running")
+    r = await client.get("/jobs/job-2")
+    assert r.json()["status"] == "running"
+    assert r.json()["state"] == "STARTED"
+
+
+async def test_run_profile_stats_percentiles(client, db_session, monkeypatch):
+    from datetime import datetime, timezone
+
+    for i, ms in enumerate([100.0, 200.0, 300.0, 400.0]):
+        run = _add_run(db_session, f"job-p{i}", "success", tracks=1)
+        run.finished_at = datetime.now(timezone.utc)
+        run.profile_json = {
+            "phases_ms": {"scan_source": ms, "access_token": 5.0},
+            "pages": i + 1,
+            "api_calls": i + 2,
+            "retries": 0,
+            "sleep_seconds": 0.0,
+            "bytes": 1000,
+        }
+    _add_run(db_session, "job-unprofiled", "running")
+    db_session.commit()
+
+    _login_admin(client, db_session, monkeypatch)
+    r = await client.get("/jobs/runs/stats")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["runs"] == 4
+    assert list(body["phases_ms"]) == ["access_token", "scan_source"]
+    assert body["phases_ms"]["scan_source"] == {"samples": 4, "p50": 200.0, "p95": 400.0}
+    assert body["counters"]["pages"]["p95"] == 4.0
+
+
+async def test_stats_need_an_admin_session(client, db_session, monkeypatch):
+    for path in ("/jobs/runs/stats", "/jobs/queues/stats"):
+        assert (await client.get(path)).status_code == 401
+    _login_admin(client, db_session, monkeypatch)
+    monkeypatch.setattr(get_settings(), "admin_spotify_user_ids", ["someone-else"])
+    for path in ("/jobs/runs/stats", "/jobs/queues/stats"):
+        assert (await client.get(path)).status_code == 403
+
+
+async def test_job_status_deferred_run(client, db_session):
+    run = _add_run(db_session, "job-deferred", "deferred")
+    r = await client.get("/jobs/job-deferred")
+    assert r.json() == {
+        "job_id": "job-deferred",
+        "state": "RETRY",
+        "status": "deferred",
+        "run_id": run.id,
+        "tracks_added_count": None,
+    }
@@ -0,0 +1,84 @@
+"""AIMD limiter: additive increase, multiplicative decrease, blocking at the limit."""
+import asyncio
+
+import httpx
+
+from app.playlists import service
+from app.playlists.limiter import AdaptiveLimiter
+from app.playlists.service import SpotifyApi
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _complete(limiter, latency=0.1, overloaded=False):
+    await limiter.acquire()
+    limiter.release(latency, overloaded)
+
+
+async def test_healthy_latency_grows_limit_additively():
+    limiter = AdaptiveLimiter(initial=4, max_limit=6)
+    for _ in range(5):
+        await _complete(limiter)
+    assert limiter.limit == 5
+    for _ in range(50):
+        await _complete(limiter)
+    assert limiter.limit == 6
+
+
+async def test_overload_halves_limit_once_per_cooldown():
+    clock = Clock()
+    limiter = AdaptiveLimiter(initial=16, cooldown=1.0, clock=clock)
+    await _complete(limiter, overloaded=True)
+    await _complete(limiter, overloaded=True)
+    assert limiter.limit == 8
+    clock.now = 2.0
+    await _complete(limiter, overloaded=True)
+    assert limiter.limit == 4
+
+
+async def test_growing_latency_cuts_limit():
+    limiter = AdaptiveLimiter(initial=10, latency_tolerance=2.0)
+    for _ in range(5):
+        await _complete(limiter, latency=0.1)
+    before = limiter.limit
+    for _ in range(10):
+        await _complete(limiter, latency=1.0)
+    assert limiter.limit < before
+
+
+async def test_cancelled_attempt_frees_slot_without_feedback():
+    limiter = AdaptiveLimiter(initial=3)
+    await limiter.acquire()
+    limiter.release(None, None)
+    assert (limiter.limit, limiter.inflight) == (3, 0)
+
+
+async def test_acquire_blocks_at_limit_until_release():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    limiter.release(0.1, False)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.inflight == 1
+
+
+async def test_spotify_api_feeds_429_into_limiter(monkeypatch):
+    responses = iter([httpx.Response(429, headers={"Retry-After": "1"}), httpx.Response(200, json={})])
+
+    async def no_sleep(_seconds):
+        return None
+
+    monkeypatch.setattr(service.asyncio, "sleep", no_sleep)
+    limiter = AdaptiveLimiter(initial=8)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: next(responses))) as client:
+        resp = await SpotifyApi("token", client, limiter=limiter).request("GET", "/me")
+    assert resp.status_code == 200
+    assert (limiter.limit, limiter.inflight) == (4, 0)
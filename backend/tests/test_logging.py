@@ -1,6 +1,20 @@
 """Tests for logging redaction (no tokens/secrets in logs)."""
+import json
+import logging
+import re
+import sys
+
 import pytest
-from app.core.logging import redact_message
+
+import app.core.logging as app_logging
+from app.core.logging import (
+    REDACT_PATTERNS,
+    JsonFormatter,
+    RedactingFormatter,
+    configure_logging,
+    redact_message,
+    stop_logging_listener,
+)
 
 
 def test_redact_token_param():
@@ -18,3 +32,82 @@ def test_redact_password():
 
 def test_redact_passthrough_safe():
     assert redact_message("User logged in") == "User logged in"
+
+
+CORPUS = [
+    "User logged in",
+    "Synced 30 tracks for user 42 in 1.2s",
+    "GET /playlists/37i9dQZEVXcJ/tracks?offset=100&limit=100 200",
+    "access_token=abc123xyz&token_type=Bearer",
+    "Authorization: bearer  abc.def-ghi",
+    "API_KEY='k-1.2.3' and Password=\"hunter2\"",
+    "jwt " + ".".join(["a" * 24, "B" * 22, "c-_" * 8, "d" * 30]) + " tail",
+    "version 1.2.3.4 released",
+    "token=",
+    "mytoken=abc",
+]
+
+
+def _sequential(msg):
+    for pattern, repl in REDACT_PATTERNS:
+        msg = pattern.sub(repl, msg)
+    return msg
+
+
+@pytest.mark.parametrize("msg", CORPUS)
+def test_combined_matches_reference_rules(msg):
+    assert redact_message(msg) == _sequential(msg)
+
+
+def test_precheck_skips_regex_for_plain_messages(monkeypatch):
+    class Boom:
+        def sub(self, *args):
+            raise AssertionError("regex should not run")
+
+    monkeypatch.setattr(app_logging, "_COMBINED", Boom())
+    assert redact_message("Synced 30 tracks for user 42") == "Synced 30 tracks for user 42"
+
+
+def _record(msg, *args):
+    return logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_redacts_and_emits_utc_timestamp():
+    line = JsonFormatter().format(_record("refreshing with %s", "refresh_token=abc"))
+    payload = json.loads(line)
+    assert payload["message"] == "refreshing with refresh_token=***"
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "app.test"
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z", payload["timestamp"])
+
+
+def test_timestamps_keep_sub_second_precision():
+    record = _record("tick")
+    record.created = 1_700_000_000.375  # 2023-11-14T22:13:20.375 UTC
+    assert json.loads(JsonFormatter().format(record))["timestamp"] == "2023-11-14T22:13:20.375000Z"
+    assert RedactingFormatter().format(record).split(" ", 2)[1].endswith(":20,375")
+
+
+def test_redacting_formatter_redacts_exception_text():
+    try:
+        raise ValueError("bad password=hunter2")
+    except ValueError:
+        record = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    out = RedactingFormatter().format(record)
+    assert "hunter2" not in out
+    assert "password=***" in out
+
+
+def test_queue_mode_formats_on_listener_thread(capsys):
+    configure_logging(level="INFO", use_queue=True)
+    try:
+        args = ["Bearer abc.def"]
+        logging.getLogger("app.test").info("header %s", args)
+        args[0] = "changed"
+    finally:
+        stop_logging_listener()
+        configure_logging(level="INFO")
+    err = capsys.readouterr().err
+    assert "header ['Bearer ***" in err
+    assert "abc.def" not in err
+    assert "changed" not in err
@@ -0,0 +1,41 @@
+"""Prometheus metrics: endpoint templates, /metrics exposition, Spotify client counters."""
+import httpx
+from prometheus_client import REGISTRY
+
+from app.core.metrics import endpoint_template
+from app.playlists import service
+from app.playlists.service import SpotifyApi
+
+
+def test_endpoint_template_hides_ids():
+    assert endpoint_template("/playlists/37i9dQZEVXcQ9xRzjv2Tn8/tracks") == "/playlists/{id}/tracks"
+    assert endpoint_template("https://api.spotify.com/v1/me/playlists?offset=50") == "/me/playlists"
+
+
+async def test_metrics_endpoint_reports_route_templates(client):
+    await client.get("/health")
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert 'route="/health"' in r.text
+    assert "spotify_request_duration_seconds" in r.text
+
+
+async def test_spotify_request_counts_429_and_sleep(monkeypatch):
+    responses = iter([httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200, json={})])
+
+    async def no_sleep(_seconds):
+        return None
+
+    monkeypatch.setattr(service.asyncio, "sleep", no_sleep)
+    before_429 = REGISTRY.get_sample_value("spotify_rate_limited_total", {"endpoint": "/me"}) or 0
+    before_sleep = (
+        REGISTRY.get_sample_value("spotify_retry_sleep_seconds_total", {"reason": "rate_limited"}) or 0
+    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: next(responses))) as client:
+        resp = await SpotifyApi("token", client).request("GET", "/me")
+    assert resp.status_code == 200
+    assert REGISTRY.get_sample_value("spotify_rate_limited_total", {"endpoint": "/me"}) == before_429 + 1
+    assert (
+        REGISTRY.get_sample_value("spotify_retry_sleep_seconds_total", {"reason": "rate_limited"})
+        == before_sleep + 2
+    )
@@ -1,4 +1,28 @@
-from app.playlists.service import _chunks, _truncate_error
+import threading
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth.apps import app_for
+from app.core.config import get_settings
+from app.db.models import PlaylistRun, PlaylistRunTrack, User
+from app.db.session import Base
+from app.playlists import history, journal, plans, service
+from app.playlists.dedup import TrackIdSet
+from app.playlists.profile import SyncProfile
+from app.playlists.service import (
+    RetryBudgetExhaustedError,
+    SpotifyApi,
+    SpotifyApiError,
+    SyncBudget,
+    SyncDeadlineExceededError,
+    _chunks,
+    _truncate_error,
+)
+from app.schemas.playlists import SyncDiscoverWeeklyRequest
 
 
 def test_chunks_100():
@@ -15,3 +39,411 @@ def test_truncate_error():
     assert len(out) == 100
     assert out.endswith("...")
 
+
+async def test_spotify_api_fills_profile_counters(monkeypatch):
+    responses = iter(
+        [
+            httpx.Response(429, headers={"Retry-After": "3"}),
+            httpx.Response(200, json={"items": [{"id": "p1"}], "next": None}),
+        ]
+    )
+
+    async def no_sleep(_seconds):
+        return None
+
+    monkeypatch.setattr(service.asyncio, "sleep", no_sleep)
+    profile = SyncProfile()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: next(responses))) as client:
+        api = SpotifyApi("token", client, profile)
+        with profile.phase("find_playlists"):
+            items = [p async for p in api.iter_my_playlists()]
+    assert items == [{"id": "p1"}]
+    out = profile.as_dict()
+    assert (out["pages"], out["api_calls"], out["retries"], out["sleep_seconds"]) == (1, 2, 1, 3)
+    assert out["bytes"] > 0
+    assert set(out["phases_ms"]) == {"find_playlists"}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _no_sleep(monkeypatch, slept=None):
+    async def fake_sleep(seconds):
+        if slept is not None:
+            slept.append(seconds)
+
+    monkeypatch.setattr(service.asyncio, "sleep", fake_sleep)
+
+
+async def test_persistent_429_stops_at_max_attempts(monkeypatch):
+    slept = []
+    _no_sleep(monkeypatch, slept)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: httpx.Response(429))) as client:
+        with pytest.raises(SpotifyApiError) as exc:
+            await SpotifyApi("token", client).request("GET", "/me", max_attempts=3)
+    assert exc.value.status_code == 429
+    assert slept == [1, 1]
+
+
+async def test_retry_budget_is_shared_across_requests(monkeypatch):
+    _no_sleep(monkeypatch)
+    responses = iter([httpx.Response(503), httpx.Response(200, json={}), httpx.Response(503)])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: next(responses))) as client:
+        api = SpotifyApi("token", client, budget=SyncBudget(retries=1))
+        assert (await api.request("GET", "/me")).status_code == 200
+        with pytest.raises(RetryBudgetExhaustedError) as exc:
+            await api.request("GET", "/me")
+    assert exc.value.status_code == 503
+
+
+async def test_retry_sleep_past_deadline_fails_without_sleeping(monkeypatch):
+    slept = []
+    _no_sleep(monkeypatch, slept)
+    clock = _Clock()
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda req: httpx.Response(429, headers={"Retry-After": "5"}))
+    ) as client:
+        api = SpotifyApi("token", client, budget=SyncBudget(4.0, clock=clock))
+        with pytest.raises(SyncDeadlineExceededError):
+            await api.request("GET", "/me")
+    assert slept == []
+
+
+async def test_attempt_timeout_capped_by_remaining_budget():
+    clock = _Clock()
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200, json={})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), timeout=10.0) as client:
+        api = SpotifyApi("token", client, budget=SyncBudget(30.0, clock=clock))
+        await api.request("GET", "/me")
+        clock.now = 28.0
+        await api.request("GET", "/me")
+        clock.now = 31.0
+        with pytest.raises(SyncDeadlineExceededError):
+            await api.request("GET", "/me")
+    assert seen == [10.0, 2.0]
+
+
+class _FakeSpotify:
+    """Just enough of the Web API for one Discover Weekly sync; logs every request."""
+
+    def __init__(self, snapshot="snap-1"):
+        self.snapshot = snapshot
+        self.target_snapshot = "sw-1"
+        self.calls = []
+
+    def __call__(self, request):
+        path, method = request.url.path.removeprefix("/v1"), request.method
+        self.calls.append((method, path))
+        if path == "/me/playlists":
+            items = [
+                {"id": "dw", "name": "Discover Weekly", "snapshot_id": self.snapshot},
+                {"id": "sw", "name": "Saved Weekly", "snapshot_id": self.target_snapshot},
+            ]
+            return httpx.Response(200, json={"items": items, "next": None})
+        if path == "/playlists/dw":
+            return httpx.Response(200, json={"snapshot_id": self.snapshot})
+        if path == "/playlists/sw":
+            return httpx.Response(200, json={"snapshot_id": self.target_snapshot})
+        if path == "/playlists/dw/tracks":
+            track = {"id": "t1", "uri": "spotify:track:t1", "is_local": False}
+            return httpx.Response(200, json={"items": [{"track": track}], "next": None})
+        if path == "/playlists/sw/tracks" and method == "GET":
+            return httpx.Response(200, json={"items": [], "next": None})
+        self.target_snapshot += "+"
+        return httpx.Response(201, json={"snapshot_id": self.target_snapshot})
+
+
+class _FakeRedis(dict):
+    """Strings and sets in a dict; pipelines run each command as it is queued."""
+
+    def set(self, key, value, ex=None):
+        self[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.pop(key, None)
+
+    def sadd(self, key, *members):
+        self.setdefault(key, set()).update(members)
+
+    def sscan_iter(self, key, count=None):
+        return iter(set(self.get(key, ())))
+
+    def expire(self, key, seconds):
+        pass
+
+    def pipeline(self, transaction=True):
+        store, results = self, []
+
+        class Pipe:
+            def __getattr__(self, name):
+                return lambda *args, **kw: results.append(getattr(store, name)(*args, **kw))
+
+            def execute(self):
+                store.__dict__.setdefault("executed", []).append(len(results))
+                return results
+
+        return Pipe()
+
+
+_AsyncClient = httpx.AsyncClient
+
+
+def _use_transport(monkeypatch, handler):
+    monkeypatch.setattr(service.httpx, "AsyncClient", lambda **kw: _AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+@pytest.fixture
+def sync_env(monkeypatch):
+    # One shared connection: the sync path runs its DB work in threads.
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(spotify_user_id="u1")
+    db.add(user)
+    db.commit()
+    spotify = _FakeSpotify()
+    _use_transport(monkeypatch, spotify)
+
+    async def token(db, user_id, settings):
+        return "token", app_for(settings, None)
+
+    store = _FakeRedis()
+    monkeypatch.setattr(plans, "get_redis", lambda: store)
+    monkeypatch.setattr(journal, "get_redis", lambda: store)
+    monkeypatch.setattr(service, "get_valid_token_async", token)
+    yield db, get_settings(), user, spotify
+    db.close()
+
+
+async def test_unchanged_snapshot_skips_sync_with_one_call(sync_env):
+    db, settings, user, spotify = sync_env
+    cfg, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert (run.status, added, cfg.source_snapshot_id) == ("success", 1, "snap-1")
+
+    spotify.calls.clear()
+    _, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert (run.status, added) == ("unchanged", 0)
+    assert spotify.calls == [("GET", "/playlists/dw")]
+
+    spotify.snapshot = "snap-2"
+    _, run, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert run.status == "success"
+    assert cfg.source_snapshot_id == "snap-2"
+    # Both snapshots fall in this week: the archive keeps the latest.
+    [week] = history.load_weeks(db, user.id)
+    assert (week.source_snapshot_id, history.spotify_ids(db, week.keys)) == ("snap-2", {week.keys[0]: "t1"})
+
+
+async def test_dry_run_does_not_record_snapshot(sync_env):
+    db, settings, user, _ = sync_env
+    cfg, run, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(dry_run=True))
+    assert run.status == "success"
+    assert cfg.source_snapshot_id is None
+
+
+async def test_apply_plan_only_posts_planned_tracks(sync_env):
+    db, settings, user, spotify = sync_env
+    _, dry, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(dry_run=True))
+    assert added == 1
+    assert plans.load_plan(dry.id, user.id).uris == ["spotify:track:t1"]
+    assert plans.load_plan(dry.id, user.id + 1) is None
+
+    spotify.calls.clear()
+    cfg, run, added = await service.sync_discover_weekly(
+        db, settings, user, SyncDiscoverWeeklyRequest(plan_id=dry.id)
+    )
+    assert (run.status, added, cfg.source_snapshot_id) == ("success", 1, "snap-1")
+    assert spotify.calls == [("GET", "/playlists/sw"), ("POST", "/playlists/sw/tracks")]
+    assert plans.load_plan(dry.id, user.id) is None
+    # Recording the snapshot makes the next sync a no-op, so the week is archived too.
+    [week] = history.load_weeks(db, user.id)
+    assert (week.source_snapshot_id, history.spotify_ids(db, week.keys)) == ("snap-1", {week.keys[0]: "t1"})
+
+
+async def test_plan_without_source_ids_does_not_record_the_snapshot(sync_env):
+    db, settings, user, _ = sync_env
+    _, dry, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(dry_run=True))
+    plan = plans.load_plan(dry.id, user.id)
+    plan.source_track_ids = None  # stored before plans carried them
+    plans.save_plan(dry.id, plan, 60)
+    cfg, run, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(plan_id=dry.id))
+    assert (run.status, cfg.source_snapshot_id) == ("success", None)
+    assert history.load_weeks(db, user.id) == []
+
+
+async def test_stale_plan_falls_back_to_full_sync(sync_env):
+    db, settings, user, spotify = sync_env
+    _, dry, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(dry_run=True))
+    spotify.target_snapshot = "sw-2"
+    spotify.calls.clear()
+    _, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(plan_id=dry.id))
+    assert (run.status, added) == ("success", 1)
+    assert ("GET", "/playlists/dw/tracks") in spotify.calls
+
+
+def test_plan_id_cannot_be_combined_with_dry_run():
+    with pytest.raises(ValueError):
+        SyncDiscoverWeeklyRequest(dry_run=True, plan_id=1)
+
+
+class _PagedSource(_FakeSpotify):
+    """Source with ``pages`` pages of 50 new tracks each."""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def __call__(self, request):
+        if request.url.path == "/v1/playlists/dw/tracks":
+            offset = int(request.url.params["offset"])
+            self.calls.append(("GET", f"/playlists/dw/tracks?offset={offset}"))
+            items = [{"track": {"id": f"t{offset + i}", "uri": f"spotify:track:t{offset + i}"}} for i in range(50)]
+            more = offset + 50 < self.pages * 50
+            return httpx.Response(200, json={"items": items, "next": "more" if more else None})
+        return super().__call__(request)
+
+
+async def test_spilled_dedup_checks_a_page_at_a_time_off_the_event_loop(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    spotify = _PagedSource(pages=3)
+    _use_transport(monkeypatch, spotify)
+    monkeypatch.setattr(service, "new_track_id_set", lambda: TrackIdSet(max_memory_ids=10))
+    calls = []
+    add_new = TrackIdSet.add_new
+
+    def tracked(self, track_ids):
+        calls.append((len(track_ids), threading.get_ident()))
+        return add_new(self, track_ids)
+
+    monkeypatch.setattr(TrackIdSet, "add_new", tracked)
+    _, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert (run.status, added) == ("success", 150)
+    assert [n for n, _ in calls] == [50, 50, 50]  # one lookup per source page (target is empty)
+    assert threading.get_ident() not in {thread for _, thread in calls}
+
+
+async def test_pipeline_posts_batches_while_source_is_still_scanned(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    spotify = _PagedSource(pages=6)
+    _use_transport(monkeypatch, spotify)
+    monkeypatch.setattr(settings, "sync_pipeline_queue_batches", 1)
+
+    _, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert (run.status, added) == ("success", 300)
+    posts = [i for i, call in enumerate(spotify.calls) if call[0] == "POST"]
+    last_page = spotify.calls.index(("GET", "/playlists/dw/tracks?offset=250"))
+    assert len(posts) == 3
+    assert posts[0] < last_page
+
+
+async def test_pipeline_stops_scanner_when_a_post_fails(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    spotify = _PagedSource(pages=20)
+
+    def failing(request):
+        if request.method == "POST":
+            return httpx.Response(403)
+        return spotify(request)
+
+    _use_transport(monkeypatch, failing)
+    monkeypatch.setattr(settings, "sync_pipeline_queue_batches", 1)
+    with pytest.raises(SpotifyApiError):
+        await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest())
+    assert ("GET", "/playlists/dw/tracks?offset=950") not in spotify.calls
+
+
+async def test_retry_resumes_run_from_last_added_batch(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    spotify = _PagedSource(pages=6)
+    posts = []
+
+    def fail_second_post(request):
+        if request.method == "POST":
+            posts.append(request)
+            if len(posts) == 2:
+                return httpx.Response(403)
+        return spotify(request)
+
+    _use_transport(monkeypatch, fail_second_post)
+    monkeypatch.setattr(settings, "sync_pipeline_queue_batches", 1)
+    with pytest.raises(SpotifyApiError):
+        await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(), job_id="job-1")
+    saved, target_ids = journal.load_journal("job-1"), set()
+    assert journal.load_target_ids("job-1", target_ids)
+    assert (saved.source_index, saved.added, len(target_ids)) == (100, 100, 100)
+
+    spotify.calls.clear()
+    _use_transport(monkeypatch, spotify)
+    _, run, added = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(), job_id="job-1")
+    assert (run.id, run.status, added) == (saved.run_id, "success", 300)
+    assert db.query(PlaylistRun).count() == 1
+    assert ("GET", "/me/playlists") not in spotify.calls
+    assert ("GET", "/playlists/sw/tracks") not in spotify.calls  # target snapshot unchanged since our add
+    source_pages = [path for _, path in spotify.calls if path.startswith("/playlists/dw/tracks")]
+    assert source_pages[0] == "/playlists/dw/tracks?offset=100"
+    assert [m for m, _ in spotify.calls].count("POST") == 2
+    assert journal.load_journal("job-1") is None
+    # Both attempts stored the tracks they added (catalog keys, one row per track).
+    assert db.query(PlaylistRunTrack).filter_by(run_id=run.id).count() == 300
+
+
+async def test_retry_after_failed_discovery_reuses_the_run(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    spotify = _PagedSource(pages=1)
+
+    def fail_discovery(request):
+        if request.url.path == "/v1/me/playlists":
+            return httpx.Response(403)
+        return spotify(request)
+
+    _use_transport(monkeypatch, fail_discovery)
+    with pytest.raises(SpotifyApiError):
+        await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(), job_id="job-1")
+    saved = journal.load_journal("job-1")
+    assert (saved.phase, saved.source_playlist_id) == (journal.PHASE_DISCOVER, None)
+
+    _use_transport(monkeypatch, spotify)
+    _, run, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(), job_id="job-1")
+    assert (run.id, run.status) == (saved.run_id, "success")
+    assert db.query(PlaylistRun).count() == 1
+    assert journal.load_journal("job-1") is None
+
+
+def test_journal_target_ids_are_sent_one_batch_per_round_trip(sync_env):
+    store = journal.get_redis()
+    saved = journal.SyncJournal(1, "dw", "dw-1", "sw", "sw-1")
+    journal.save_journal("job-1", saved, (f"t{i}" for i in range(2 * journal.ID_BATCH + 1)), 60)
+    # Three SADD+EXPIRE pipelines, then the journal itself.
+    assert store.executed == [2, 2, 2, 2]
+    assert journal.load_journal("job-1") == saved
+    assert len(store[journal.JOURNAL_PREFIX + "job-1:target"]) == 2 * journal.ID_BATCH + 1
+
+
+async def test_sync_keeps_db_and_redis_calls_off_the_event_loop(sync_env, monkeypatch):
+    db, settings, user, _ = sync_env
+    blocking_threads = set()
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *a: blocking_threads.add(threading.get_ident()))
+    set_value = journal.get_redis().set
+
+    def tracked_set(*args, **kwargs):
+        blocking_threads.add(threading.get_ident())
+        return set_value(*args, **kwargs)
+
+    monkeypatch.setattr(journal.get_redis(), "set", tracked_set)
+    _, run, _ = await service.sync_discover_weekly(db, settings, user, SyncDiscoverWeeklyRequest(), job_id="job-1")
+    assert run.status == "success"
+    assert blocking_threads
+    assert threading.get_ident() not in blocking_threads
@@ -0,0 +1,106 @@
+"""Sampling profiler: CPU stacks, await chains, folded output and the sample-rate override."""
+import asyncio
+import json
+import threading
+
+import redis
+
+from app.core import profiling
+from app.core.config import get_settings
+from app.core.profiling import StackSampler, maybe_profile, sample_rate, sample_rate_async
+
+
+def _busy_parse(n: int) -> int:
+    return sum(len(json.loads('{"items": [1, 2, 3]}')["items"]) for _ in range(n))
+
+
+async def _waiting_step(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+async def test_sampler_records_cpu_stack_and_await_chain():
+    event = asyncio.Event()
+    task = asyncio.ensure_future(_waiting_step(event))
+    await asyncio.sleep(0)
+    sampler = StackSampler(threading.get_ident(), task)
+    sampler.sample()
+    event.set()
+    await task
+    assert list(sampler.awaits) == ["test_profiling:_waiting_step;locks:Event.wait;<FutureIter>"]
+    assert any("test_sampler_records_cpu_stack_and_await_chain" in stack for stack in sampler.cpu)
+
+
+def test_write_folded_files(tmp_path):
+    sampler = StackSampler(threading.get_ident())
+    sampler.cpu["a:main;b:parse"] += 3
+    sampler.awaits["a:main;<Future>"] += 2
+    cpu, awaits = sampler.write(str(tmp_path), "sync-1")
+    assert cpu.read_text() == "a:main;b:parse 3\n"
+    assert awaits.name == "sync-1.async.folded"
+    assert awaits.read_text() == "a:main;<Future> 2\n"
+
+
+async def test_maybe_profile_writes_when_sampled(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+    get_settings.cache_clear()
+    monkeypatch.setattr(profiling, "_rate_cache", None)
+    monkeypatch.setattr(profiling, "sample_rate", lambda settings: 1.0)
+    try:
+        async with maybe_profile("sync.discover_weekly", "job-9") as sampler:
+            _busy_parse(20000)
+            await asyncio.sleep(0.01)
+    finally:
+        get_settings.cache_clear()
+    assert sampler is not None and sampler.samples > 0
+    assert sorted(p.name for p in tmp_path.iterdir())[0].startswith("sync.discover_weekly-job-9-")
+
+
+async def test_maybe_profile_skips_when_rate_zero(monkeypatch):
+    monkeypatch.setattr(profiling, "_rate_cache", None)
+    monkeypatch.setattr(profiling, "sample_rate", lambda settings: 0.0)
+    async with maybe_profile("sync.discover_weekly") as sampler:
+        pass
+    assert sampler is None
+
+
+def test_sample_rate_prefers_redis_override_and_caches(monkeypatch):
+    calls = []
+
+    class FakeRedis:
+        def get(self, key):
+            calls.append(key)
+            return "0.25"
+
+    monkeypatch.setattr(profiling, "_rate_cache", None)
+    monkeypatch.setattr(profiling, "get_redis", lambda: FakeRedis())
+    settings = get_settings()
+    assert sample_rate(settings) == 0.25
+    assert sample_rate(settings) == 0.25
+    assert calls == [profiling.RATE_KEY]
+
+
+def test_sample_rate_falls_back_to_settings_when_redis_down(monkeypatch):
+    class DownRedis:
+        def get(self, key):
+            raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(profiling, "_rate_cache", None)
+    monkeypatch.setattr(profiling, "get_redis", lambda: DownRedis())
+    assert sample_rate(get_settings()) == get_settings().profile_sample_rate
+
+
+async def test_sample_rate_async_reads_redis_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class FakeRedis:
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return "0.5"
+
+    monkeypatch.setattr(profiling, "_rate_cache", None)
+    monkeypatch.setattr(profiling, "get_redis", lambda: FakeRedis())
+    settings = get_settings()
+    assert await sample_rate_async(settings) == 0.5
+    assert await sample_rate_async(settings) == 0.5
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
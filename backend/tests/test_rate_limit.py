@@ -0,0 +1,160 @@
+"""API rate limiting: GCRA accounting, local fast path, fail-open, headers and keys."""
+import threading
+
+import redis
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api.rate_limit import (
+    KEY_PREFIX,
+    RateLimiter,
+    RateLimitMiddleware,
+    rate_limit_key,
+    trusted_networks,
+)
+from app.core.security import build_session_cookie_value
+
+SECRET = "s" * 32
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Python model of the GCRA script (no Lua here); counts eval calls."""
+
+    def __init__(self):
+        self.tat = {}
+        self.calls = 0
+        self.down = False
+
+    def eval(self, script, numkeys, key, now, interval, limit):
+        self.calls += 1
+        if self.down:
+            raise redis.ConnectionError("down")
+        now, interval, burst = float(now), float(interval), float(interval) * int(limit)
+        tat = max(self.tat.get(key, 0.0), now)
+        new_tat = tat + interval
+        if new_tat - now > burst:
+            return [0, 0, str(new_tat - now - burst), str(tat - now)]
+        self.tat[key] = new_tat
+        return [1, int((burst - (new_tat - now)) / interval + 1e-9), "0", str(new_tat - now)]
+
+
+def _limiter(fake, clock, limit=3, window=3):
+    return RateLimiter(limit, window, redis_factory=lambda: fake, clock=clock)
+
+
+def test_burst_then_refill_at_interval():
+    fake, clock = FakeRedis(), Clock()
+    limiter = _limiter(fake, clock)
+    assert [limiter.hit("ip:a").remaining for _ in range(3)] == [2, 1, 0]
+    denied = limiter.hit("ip:a")
+    assert not denied.allowed
+    assert denied.retry_after == 1.0
+    assert limiter.hit("ip:b").allowed
+    clock.now += 1
+    assert limiter.hit("ip:a").allowed
+    assert set(fake.tat) == {KEY_PREFIX + "ip:a", KEY_PREFIX + "ip:b"}
+
+
+def test_rejected_key_is_refused_locally_until_retry_after():
+    fake, clock = FakeRedis(), Clock()
+    limiter = _limiter(fake, clock, limit=1, window=10)
+    limiter.hit("ip:a")
+    limiter.hit("ip:a")
+    calls = fake.calls
+    for _ in range(50):
+        assert not limiter.hit("ip:a").allowed
+    assert fake.calls == calls
+    clock.now += 10
+    assert limiter.hit("ip:a").allowed
+    assert fake.calls == calls + 1
+
+
+def test_fails_open_and_backs_off_when_redis_is_down():
+    fake, clock = FakeRedis(), Clock()
+    fake.down = True
+    limiter = _limiter(fake, clock)
+    assert limiter.hit("ip:a") is None
+    assert limiter.hit("ip:a") is None
+    assert fake.calls == 1
+    fake.down = False
+    clock.now += 6
+    assert limiter.hit("ip:a").allowed
+
+
+def _app(limiter):
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    # httpx's ASGITransport connects from 127.0.0.1.
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, secret=SECRET, trusted_proxies=["127.0.0.1"])
+    return app
+
+
+async def test_middleware_headers_and_429():
+    limiter = _limiter(FakeRedis(), Clock(), limit=2, window=60)
+    async with AsyncClient(transport=ASGITransport(app=_app(limiter)), base_url="http://test") as client:
+        first = await client.get("/ping")
+        assert first.status_code == 200
+        assert first.headers["ratelimit-limit"] == "2"
+        assert first.headers["ratelimit-remaining"] == "1"
+        assert first.headers["ratelimit-reset"] == "30"
+        assert first.headers["ratelimit-policy"] == "2;w=60"
+        await client.get("/ping")
+        denied = await client.get("/ping")
+        assert denied.status_code == 429
+        assert denied.json() == {"detail": "Too many requests"}
+        assert denied.headers["retry-after"] == "30"
+        assert (await client.get("/health")).status_code == 200
+
+
+async def test_session_and_ip_keys_are_separate_buckets():
+    fake = FakeRedis()
+    limiter = _limiter(fake, Clock(), limit=1, window=60)
+    async with AsyncClient(transport=ASGITransport(app=_app(limiter)), base_url="http://test") as client:
+        assert (await client.get("/ping", headers={"x-forwarded-for": "10.0.0.1"})).status_code == 200
+        assert (await client.get("/ping", headers={"x-forwarded-for": "10.0.0.1"})).status_code == 429
+        client.cookies.set("spotify_session", build_session_cookie_value(7, SECRET))
+        assert (await client.get("/ping", headers={"x-forwarded-for": "10.0.0.1"})).status_code == 200
+    assert set(fake.tat) == {KEY_PREFIX + "ip:10.0.0.1", KEY_PREFIX + "user:7"}
+
+
+async def test_redis_check_runs_off_the_event_loop():
+    fake = FakeRedis()
+    threads = []
+    real_eval = fake.eval
+    fake.eval = lambda *args: threads.append(threading.current_thread()) or real_eval(*args)
+    limiter = _limiter(fake, Clock(), limit=1, window=60)
+    assert (await limiter.hit_async("ip:a")).allowed
+    assert not (await limiter.hit_async("ip:a")).allowed
+    assert not (await limiter.hit_async("ip:a")).allowed  # local fast path, no thread
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def _scope(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"type": "http", "headers": headers, "client": (peer, 50000)}
+
+
+def test_forwarded_for_is_only_read_from_trusted_proxies():
+    proxies = trusted_networks(["10.0.0.0/8", "192.0.2.1"])
+    assert rate_limit_key(_scope("203.0.113.5", "1.2.3.4"), SECRET, proxies) == "ip:203.0.113.5"
+    assert rate_limit_key(_scope("10.1.2.3", "1.2.3.4"), SECRET) == "ip:10.1.2.3"
+    # A client-supplied first entry is skipped: the rightmost untrusted hop is the client.
+    spoofed = "1.2.3.4, 198.51.100.7, 192.0.2.1"
+    assert rate_limit_key(_scope("10.1.2.3", spoofed), SECRET, proxies) == "ip:198.51.100.7"
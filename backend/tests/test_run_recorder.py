@@ -0,0 +1,67 @@
+"""RunRecorder: bulk "running" inserts and one-commit terminal updates."""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import PlaylistConfig, PlaylistRun, User
+from app.db.session import Base
+from app.playlists.runs import RunRecorder
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(spotify_user_id="u1")
+    session.add(user)
+    session.flush()
+    session.add_all(
+        [PlaylistConfig(user_id=user.id, source_playlist_id="a", target_playlist_id="b") for _ in range(3)]
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+def _count_commits(session):
+    counter = {"n": 0}
+
+    @event.listens_for(session, "after_commit")
+    def _after_commit(_session):
+        counter["n"] += 1
+
+    return counter
+
+
+def test_start_many_commits_running_markers_once(db):
+    commits = _count_commits(db)
+    records = RunRecorder(db).start_many([(1, "j1"), (2, "j2"), (3, None)])
+    assert commits["n"] == 1
+    assert [r.playlist_config_id for r in records] == [1, 2, 3]
+    rows = {r.id: r for r in db.query(PlaylistRun).all()}
+    assert {rows[r.id].status for r in records} == {"running"}
+    assert rows[records[0].id].job_id == "j1"
+
+
+def test_finish_writes_terminal_state_in_one_commit(db):
+    recorder = RunRecorder(db)
+    records = recorder.start_many([(1, None), (2, None)])
+    commits = _count_commits(db)
+    recorder.finish(records[0], "success", tracks_added=5)
+    recorder.finish(records[1], "error", error_message="boom")
+    assert commits["n"] == 2
+    db.expire_all()
+    first = db.get(PlaylistRun, records[0].id)
+    second = db.get(PlaylistRun, records[1].id)
+    assert (first.status, first.tracks_added_count, first.finished_at is not None) == ("success", 5, True)
+    assert (second.status, second.error_message) == ("error", "boom")
+
+
+def test_finish_stores_profile(db):
+    recorder = RunRecorder(db)
+    record = recorder.start(1)
+    profile = {"phases_ms": {"scan_source": 12.5}, "pages": 2, "api_calls": 3, "retries": 1, "sleep_seconds": 1.0, "bytes": 10}
+    recorder.finish(record, "success", tracks_added=0, profile=profile)
+    db.expire_all()
+    assert db.get(PlaylistRun, record.id).profile_json == profile
@@ -0,0 +1,118 @@
+"""Scheduling helpers: wait-time summaries and deferral (user busy, circuit open) in the asyncio worker."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import PlaylistConfig, User
+from app.db.session import Base
+from app.playlists.service import CircuitOpenError
+from app.workers import aio_worker, scheduling
+from app.workers.aio_worker import AsyncioWorker
+from app.workers.scheduling import UserBusyError, percentile, summarize_waits
+from app.workers.tasks import SYNC_DISCOVER_WEEKLY_TASK
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_waits():
+    out = summarize_waits([3.0, 1.0, 2.0])
+    assert out == {"samples": 3, "p50_seconds": 2.0, "p95_seconds": 3.0, "max_seconds": 3.0}
+
+
+@pytest.mark.parametrize("exc", [UserBusyError(15), CircuitOpenError(14.2)])
+async def test_deferred_task_is_republished_without_spending_a_retry(monkeypatch, exc):
+    published = []
+
+    class Backend:
+        def mark_as_started(self, task_id):
+            pass
+
+        def store_result(self, task_id, result, state):
+            published.append(("state", state))
+
+    class App:
+        backend = Backend()
+
+    class Message:
+        headers = {"task": SYNC_DISCOVER_WEEKLY_TASK, "id": "t1", "retries": 2}
+        acked = False
+
+        def ack(self):
+            self.acked = True
+
+    async def handler(**kwargs):
+        raise exc
+
+    worker = AsyncioWorker(App(), queue_name="sync.bulk", concurrency=1, drain_timeout=1, handlers={SYNC_DISCOVER_WEEKLY_TASK: handler})
+    worker._loop = asyncio.get_running_loop()
+    monkeypatch.setattr(
+        aio_worker.AsyncioWorker,
+        "_republish",
+        lambda self, name, task_id, kwargs, retries, countdown, enqueued_at, ignore_result=False: published.append((retries, countdown)),
+    )
+    msg = Message()
+    await worker._process([[], {"user_id": 1}, {}], msg)
+    assert published == [(2, 15), ("state", "RETRY")]
+    assert msg.acked
+
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def test_schedule_due_syncs_claims_only_due_enabled_configs(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    due_at = {"due": NOW - timedelta(hours=1), "later": NOW + timedelta(hours=1), "disabled": NOW, "due2": NOW}
+    for name, next_run_at in due_at.items():
+        user = User(spotify_user_id=name)
+        db.add(user)
+        db.flush()
+        db.add(
+            PlaylistConfig(
+                user_id=user.id,
+                source_playlist_id="dw",
+                target_playlist_id="sw",
+                is_enabled=name != "disabled",
+                next_run_at=next_run_at,
+            )
+        )
+    db.commit()
+    queued = []
+    monkeypatch.setattr(scheduling, "enqueue_scheduled_sync", lambda user_id: queued.append(user_id) or True)
+    monkeypatch.setattr(scheduling.get_settings(), "schedule_due_batch_size", 1)
+
+    assert scheduling.schedule_due_syncs(db, now=NOW) == 2
+    names = dict(db.execute(select(User.id, User.spotify_user_id)).tuples().all())
+    assert [names[user_id] for user_id in queued] == ["due", "due2"]
+    runs = db.execute(select(PlaylistConfig.user_id, PlaylistConfig.next_run_at)).tuples().all()
+    # SQLite hands back naive datetimes.
+    moved = {names[uid] for uid, at in runs if at.replace(tzinfo=timezone.utc) == NOW + timedelta(days=1)}
+    assert moved == {"due", "due2"}
+
+    queued.clear()
+    assert scheduling.schedule_due_syncs(db, now=NOW) == 0
+    db.close()
+
+
+def test_due_claim_skips_rows_locked_by_other_schedulers():
+    captured = []
+
+    class Db:
+        def execute(self, stmt):
+            captured.append(stmt)
+            return type("Result", (), {"all": lambda self: []})()
+
+    scheduling.claim_due_configs(Db(), NOW, 10, 60)
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY playlist_configs.next_run_at" in sql
@@ -8,6 +8,7 @@ from app.core.security import (
     get_safe_success_redirect,
     is_safe_redirect_url,
     parse_session_cookie,
+    state_app_key,
     verify_state,
 )
 
@@ -33,6 +34,16 @@ def test_verify_state_tampered_query():
     assert verify_state(SECRET, state, "other") is False
 
 
+def test_state_carries_signed_app_key():
+    state = generate_state(SECRET, "client-b")
+    assert verify_state(SECRET, state, state) is True
+    assert state_app_key(state) == "client-b"
+    assert state_app_key(generate_state(SECRET)) is None
+    raw, sig = state.split(".")
+    forged = raw.replace("client-b", "client-a") + "." + sig
+    assert verify_state(SECRET, forged, forged) is False
+
+
 def test_verify_state_tampered_cookie():
     state = generate_state(SECRET)
     parts = state.split(".")
@@ -0,0 +1,95 @@
+"""Spotify app pool: parsing, assignment at login and per-user refresh credentials."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth import spotify_client
+from app.auth.apps import app_for, app_pool, pick_app
+from app.core.config import Settings, get_settings
+from app.db.models import OAuthToken, User
+from app.db.session import Base
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "spotify_extra_apps", ["id-1:secret-1", "id-2:secret-2"])
+    return settings
+
+
+@pytest.fixture
+def db():
+    # One shared connection: the sync path runs its DB work in threads.
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _token(db, name, client_id, expires_in=3600):
+    user = User(spotify_user_id=name)
+    db.add(user)
+    db.flush()
+    db.add(
+        OAuthToken(
+            user_id=user.id,
+            access_token=f"access-{name}",
+            refresh_token=f"refresh-{name}",
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+            client_id=client_id,
+        )
+    )
+    db.commit()
+    return user
+
+
+def test_extra_apps_must_be_id_secret_pairs(monkeypatch):
+    monkeypatch.setenv("SPOTIFY_EXTRA_APPS", "id-1:secret-1, id-2")
+    with pytest.raises(ValueError):
+        Settings()
+    monkeypatch.setenv("SPOTIFY_EXTRA_APPS", "id-1:secret-1,id-2:secret-2")
+    assert Settings().spotify_extra_apps == ["id-1:secret-1", "id-2:secret-2"]
+
+
+def test_pool_lookup(settings):
+    names = [app.name for app in app_pool(settings)]
+    assert names == ["default", "app1", "app2"]
+    assert app_for(settings, None).client_id == settings.client_id
+    assert app_for(settings, "id-2").client_secret == "secret-2"
+    assert app_for(settings, "removed") is None
+    assert "secret-2" not in repr(app_for(settings, "id-2"))
+
+
+def test_login_picks_least_used_app(settings, db):
+    _token(db, "legacy", None)  # issued before the pool: counts for the primary app
+    _token(db, "a", "id-1")
+    assert pick_app(db, settings).name == "app2"
+    _token(db, "b", "id-2")
+    _token(db, "c", "id-1")
+    assert pick_app(db, settings).name == "default"  # ties go to the first app in the pool
+
+
+async def test_refresh_uses_the_users_app(settings, db, monkeypatch):
+    user = _token(db, "a", "id-2", expires_in=0)
+    used = []
+
+    async def refresh(refresh_token, app):
+        used.append(app.client_id)
+        return {"access_token": "fresh", "expires_in": 3600}
+
+    monkeypatch.setattr(spotify_client, "refresh_tokens", refresh)
+    # SQLite hands back naive datetimes.
+    naive_now = datetime.now(timezone.utc).replace(tzinfo=None)
+    monkeypatch.setattr(spotify_client, "_utc_now", lambda: naive_now)
+    access_token, app = await spotify_client.get_valid_token_async(db, user.id, settings)
+    assert (access_token, app.name, used) == ("fresh", "app2", ["id-2"])
+
+    db.query(OAuthToken).update({"client_id": "removed"})
+    db.commit()
+    assert await spotify_client.get_valid_token_async(db, user.id, settings) is None
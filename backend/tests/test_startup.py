@@ -0,0 +1,40 @@
+"""Cold-start budget: importing the API must not load worker-only code or build the engine."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+WORKER_ONLY = ("celery", "kombu", "httpx", "opentelemetry.sdk", "psycopg2", "app.workers")
+
+# Generous default for slow CI machines; tighten locally with IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "3000"))
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import app.main
+elapsed = (time.perf_counter() - t) * 1000
+import app.db.session as session
+print(json.dumps({
+    "ms": elapsed,
+    "modules": sorted(sys.modules),
+    "engine_built": session.get_engine.cache_info().currsize > 0,
+}))
+"""
+
+
+def _cold_import() -> dict:
+    env = {**os.environ, "PYTHONPATH": str(BACKEND)}
+    proc = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, env=env, cwd=BACKEND, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_is_lazy_and_within_budget():
+    result = _cold_import()
+    loaded = [m for m in result["modules"] if any(m == p or m.startswith(p + ".") for p in WORKER_ONLY)]
+    assert loaded == []
+    assert result["engine_built"] is False
+    assert result["ms"] < IMPORT_BUDGET_MS, f"import app.main took {result['ms']:.0f} ms"
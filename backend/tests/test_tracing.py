@@ -0,0 +1,46 @@
+"""Trace context propagation through message headers and the JSONL file exporter."""
+import json
+from types import SimpleNamespace
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.core.tracing import extract_context, trace_headers
+from app.core.tracing_sdk import JsonLinesSpanExporter
+
+
+def _provider():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider, exporter
+
+
+def test_headers_roundtrip_links_worker_span_to_enqueue_span():
+    provider, exporter = _provider()
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("sync.enqueue") as parent:
+        headers = trace_headers()
+    assert "traceparent" in headers
+
+    # Celery exposes custom headers as request attributes; the asyncio worker sees a dict.
+    for source in (headers, SimpleNamespace(**headers)):
+        with tracer.start_as_current_span("sync.discover_weekly", context=extract_context(source)) as child:
+            assert child.get_span_context().trace_id == parent.get_span_context().trace_id
+            assert child.parent.span_id == parent.get_span_context().span_id
+
+
+def test_trace_headers_empty_without_active_span():
+    assert trace_headers() == {}
+
+
+def test_jsonl_exporter_writes_one_line_per_span(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(JsonLinesSpanExporter(str(path))))
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("a"), tracer.start_as_current_span("b"):
+        pass
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["b", "a"]